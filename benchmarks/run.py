@@ -0,0 +1,216 @@
+"""Reproducible benchmarks for index building, layout generation, numbering and fill.
+
+Every grid is generated and filled with a fixed seed on the bundled synthetic word list (see
+`benchmarks.synthetic`), and fills are bounded by a node budget rather than a time limit, so two runs
+of the same commit do the same work and only their timings differ. Results are written as JSON, e.g.
+
+    python -m benchmarks.run --output results.json
+    python -m benchmarks.run --sizes 5 7 --seeds 0 1 --engines mrv
+"""
+from __future__ import annotations
+import argparse
+import dataclasses
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Sequence
+
+from benchmarks.synthetic import PATH as WORDS_PATH
+from crossword_generator.clue_processor import ClueProcessor, build_index
+from crossword_generator.grid import Grid
+from crossword_generator.word_index import WordIndex
+
+SIZES = (5, 7, 11, 13, 15)
+SEEDS = (0, 1, 2)
+ENGINES = ('dfs', 'mrv', 'local')
+MAX_NODES = 2_000
+
+
+def measure(f: Callable, *args, **kwargs) -> tuple[object, float, int]:
+    """Calls f, tracing allocations.
+
+    Returns:
+        The result, the elapsed seconds, and the peak traced memory in bytes.
+    """
+    tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        res = f(*args, **kwargs)
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return res, elapsed, peak
+
+
+def bench_index(words_path: str = WORDS_PATH) -> tuple[dict, WordIndex]:
+    """Benchmarks building the index from the word list and `ClueProcessor` on an equivalent clue csv.
+
+    Returns:
+        The results, and the index for the other benchmarks.
+    """
+    with open(words_path) as f:
+        words = f.read().split()
+
+    index, index_time, index_peak = measure(build_index, words_path)
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, 'clues.csv')
+        with open(csv_path, 'w') as f:
+            f.write('clue,answer\n')
+            f.writelines(f'Clue {i} ({len(word)}),{word.lower()}\n' for i, word in enumerate(words))
+        _, clue_processor_time, clue_processor_peak = measure(ClueProcessor, csv_path)
+
+    return {
+        'words': len(index),
+        'build_index': {'seconds': index_time, 'peak_bytes': index_peak},
+        'clue_processor': {'seconds': clue_processor_time, 'peak_bytes': clue_processor_peak},
+    }, index
+
+
+def bench_layout(n: int, seed: int) -> dict:
+    """Benchmarks `Grid.generate_layout` and `Grid.number_cells` for one size and seed."""
+    g = Grid(n, set_layout=False)
+    start = time.perf_counter()
+    g.generate_layout(seed)
+    layout_time = time.perf_counter() - start
+    start = time.perf_counter()
+    g.number_cells()
+    numbering_time = time.perf_counter() - start
+    return {
+        'size': n,
+        'seed': seed,
+        'layout_seconds': layout_time,
+        'number_cells_seconds': numbering_time,
+        'walls': sum(g.cell(r, c).is_wall() for r in range(1, n + 1) for c in range(1, n + 1)),
+        'entries': len(g.entries),
+    }
+
+
+def bench_fill(index: WordIndex, n: int, seed: int, engine: str, max_nodes: int | None = MAX_NODES,
+               time_limit: float | None = None, num_attempts=5, num_sample_strings=50) -> dict:
+    """Benchmarks `Grid.fill` for one size, seed and engine. The layout is the one `bench_layout` times."""
+    g = Grid(n, rng=seed)
+    res = g.fill(index, num_attempts=num_attempts, num_sample_strings=num_sample_strings, engine=engine,
+                 time_limit=time_limit, max_nodes=max_nodes, rng=seed)
+    return {
+        'size': n,
+        'seed': seed,
+        'engine': engine,
+        'success': res.success,
+        'filled_slots': res.filled_slots,
+        'num_slots': res.num_slots,
+        'seconds': res.elapsed,
+        'nodes_per_second': res.nodes_per_second,
+        'stopped': res.stopped,
+        'stats': dataclasses.asdict(res.stats),
+    }
+
+
+def summarize(runs: list[dict], key: str, group: Sequence[str]) -> list[dict]:
+    """Returns the median, min and max of key over the runs grouped by the fields in group."""
+    groups: dict[tuple, list[dict]] = {}
+    for run in runs:
+        groups.setdefault(tuple(run[field] for field in group), []).append(run)
+    summary = []
+    for values, members in groups.items():
+        samples = [run[key] for run in members]
+        row = dict(zip(group, values))
+        row.update(median=statistics.median(samples), min=min(samples), max=max(samples), runs=len(samples))
+        if 'success' in members[0]:
+            row['success_rate'] = sum(run['success'] for run in members) / len(members)
+        summary.append(row)
+    return summary
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(__file__)).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(sizes: Sequence[int] = SIZES, seeds: Sequence[int] = SEEDS, engines: Sequence[str] = ENGINES,
+        max_nodes: int | None = MAX_NODES, time_limit: float | None = None, words_path: str = WORDS_PATH,
+        verbose=False) -> dict:
+    """Runs all benchmarks.
+
+    Args:
+        sizes: Grid sizes.
+        seeds: Seeds; every size is generated and filled once per seed.
+        engines: Fill engines.
+        max_nodes: Node budget per fill.
+        time_limit: Time budget per fill, in seconds. Off by default, as it makes results machine-dependent.
+        words_path: Word list to build the index from.
+        verbose: Whether to print progress.
+
+    Returns:
+        The results, JSON-serializable.
+    """
+    index_results, index = bench_index(words_path)
+    if verbose:
+        print(f"index: {index_results['words']} words in {index_results['build_index']['seconds']:.2f}s",
+              file=sys.stderr)
+
+    layouts = [bench_layout(n, seed) for n in sizes for seed in seeds]
+    fills = []
+    for n in sizes:
+        for engine in engines:
+            for seed in seeds:
+                fills.append(bench_fill(index, n, seed, engine, max_nodes=max_nodes, time_limit=time_limit))
+                if verbose:
+                    fill = fills[-1]
+                    print(f"fill n={n} engine={engine} seed={seed}: success={fill['success']} "
+                          f"slots={fill['filled_slots']}/{fill['num_slots']} {fill['seconds']:.2f}s", file=sys.stderr)
+
+    return {
+        'meta': {
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'sizes': list(sizes),
+            'seeds': list(seeds),
+            'engines': list(engines),
+            'max_nodes': max_nodes,
+            'time_limit': time_limit,
+            'words_path': os.path.relpath(words_path),
+        },
+        'index': index_results,
+        'layout': layouts,
+        'fill': fills,
+        'summary': {
+            'layout': summarize(layouts, 'layout_seconds', ('size',)),
+            'number_cells': summarize(layouts, 'number_cells_seconds', ('size',)),
+            'fill': summarize(fills, 'seconds', ('size', 'engine')),
+        },
+    }
+
+
+def main(argv: Sequence[str] | None = None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES)
+    parser.add_argument('--seeds', type=int, nargs='+', default=SEEDS)
+    parser.add_argument('--engines', nargs='+', default=ENGINES)
+    parser.add_argument('--max-nodes', type=int, default=MAX_NODES)
+    parser.add_argument('--time-limit', type=float, default=None)
+    parser.add_argument('--words', default=WORDS_PATH, help='word list to build the index from')
+    parser.add_argument('--output', '-o', default=None, help='JSON output path; defaults to stdout')
+    args = parser.parse_args(argv)
+
+    results = run(args.sizes, args.seeds, args.engines, args.max_nodes, args.time_limit, args.words, verbose=True)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+
+
+if __name__ == '__main__':
+    main()
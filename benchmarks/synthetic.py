@@ -0,0 +1,43 @@
+"""Generates the synthetic word list bundled with the benchmarks (`data/words.txt`).
+
+The words are random strings drawn from English-like letter frequencies, so they have no meaning, but
+their density per length is close enough to a real word list for layout and fill timings to be
+representative. The list is bundled so that benchmarks run offline and on identical data; run
+`python -m benchmarks.synthetic` to regenerate it.
+"""
+from __future__ import annotations
+import os
+import random
+
+from crossword_generator.word_index import MAX_LENGTH, MIN_LENGTH
+
+PATH = os.path.join(os.path.dirname(__file__), 'data', 'words.txt')
+
+LETTER_WEIGHTS = {
+    'E': 12, 'A': 9, 'R': 7, 'I': 7, 'O': 7, 'T': 7, 'N': 7, 'S': 7, 'L': 5,
+    'C': 3, 'U': 3, 'D': 3, 'P': 2, 'M': 2, 'H': 2, 'G': 2, 'B': 1, 'Y': 1,
+}
+# number of draws per length; short words collide, so lengths 3 and 4 end up with fewer distinct words
+DRAWS = {3: 3000, 4: 6000, 5: 8000, 6: 6000, 7: 4000}
+DEFAULT_DRAWS = 1500
+
+
+def generate_words(seed=0) -> list[str]:
+    """Returns the sorted, distinct synthetic words for a seed."""
+    rng = random.Random(seed)
+    letters, weights = zip(*LETTER_WEIGHTS.items())
+    words = set()
+    for length in range(MIN_LENGTH, MAX_LENGTH + 1):
+        for _ in range(DRAWS.get(length, DEFAULT_DRAWS)):
+            words.add(''.join(rng.choices(letters, weights, k=length)))
+    return sorted(words)
+
+
+def main():
+    os.makedirs(os.path.dirname(PATH), exist_ok=True)
+    with open(PATH, 'w') as f:
+        f.writelines(word + '\n' for word in generate_words())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,3 @@
+from crossword_generator.batch import main
+
+main()
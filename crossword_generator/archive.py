@@ -0,0 +1,323 @@
+from __future__ import annotations
+import datetime
+import json
+import mmap
+import os
+import struct
+from array import array
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Iterator, Mapping, Sequence
+
+from crossword_generator.catalog import cells, layout_mask
+from crossword_generator.grid import BLANK_CODE, WALL_CODE, Cell, Direction, Grid
+
+if TYPE_CHECKING:
+    from crossword_generator.clue_index import ClueIndex
+
+# puzzle archive file layout (little-endian):
+#   header:   magic, format version, puzzle count, index offset (0 while the archive is being written),
+#             metadata length, then the metadata as JSON (title, author, and the number of clues of the
+#             clue index that clue ids refer to)
+#   records:  per puzzle, RECORD (record length, size, flags, date as a proleptic Gregorian ordinal or 0,
+#             number of entries, number of the puzzle among those of its size and date), ceil(size ** 2 / 8)
+#             bytes of wall bitmask (see `catalog.Layout.mask`), the letters of the open cells row by row as
+#             5-bit codes (0 for blank, 1 to 26 for A to Z) in ceil(5 * open cells / 8) bytes, and a uint32
+#             clue id (into `ClueIndex.clues`) per entry in slot order, NO_CLUE if it has none
+#   index:    count uint64 record offsets
+# Records are appended as puzzles are generated and the index is written on close; an archive that was
+# not closed (e.g. after a crash) is read and resumed by scanning its records instead.
+MAGIC = b'CWPA'
+VERSION = 2
+HEADER = struct.Struct('<4sIQQI')
+RECORD = struct.Struct('<IBBIHI')
+OFFSET = struct.Struct('<Q')
+NO_CLUE = 0xFFFFFFFF
+DAILY = 1  # record flag: published as a daily puzzle
+SUFFIX = '.cwpa'
+
+
+@dataclass
+class PuzzleRecord:
+    """
+    An archived puzzle, decoded up to its letters.
+        n: Size of the grid.
+        mask: Wall bitmask (see `catalog.Layout.mask`).
+        codes: Letters of the open cells row by row, packed as 5-bit codes.
+        clue_ids: Clue id of each entry in slot order, NO_CLUE for entries without a clue.
+        date: Date as YYYY-MM-DD, or None.
+        daily: Whether the puzzle is published as a daily puzzle.
+        number: Number of the puzzle among the puzzles of its size and date.
+    """
+
+    n: int
+    mask: int
+    codes: int
+    clue_ids: array
+    date: str | None
+    daily: bool
+    number: int = 0
+
+    def grid(self) -> Grid:
+        """Returns the numbered grid."""
+        n, width = self.n, self.n + 2
+        g = Grid(n, set_layout=False)
+        letters = g.letters
+        for r, c in cells(n, self.mask):
+            letters[(r + 1) * width + c + 1] = WALL_CODE
+        codes = self.codes
+        for cell in range(n * n):
+            if not self.mask >> cell & 1:
+                code = codes & 31
+                codes >>= 5
+                r, c = divmod(cell, n)
+                letters[(r + 1) * width + c + 1] = code + 64 if code else BLANK_CODE
+        g.number_cells()
+        return g
+
+
+def encode(grid: Grid, clue_ids: Mapping[int, int], date: str | None = None, daily=True, number=0) -> bytes:
+    """Returns the record of a grid.
+
+    Args:
+        grid: The numbered grid.
+        clue_ids: Dictionary mapping slots to clue ids. Entries left out have no clue.
+        date: Date, as YYYY-MM-DD.
+        daily: Whether the puzzle is published as a daily puzzle.
+        number: Number of the puzzle among the puzzles of its size and date.
+
+    Returns:
+        The record, as written to an archive.
+    """
+    n, width = grid.n, grid.n + 2
+    mask = layout_mask(grid)
+    codes = 0
+    shift = 0
+    for r in range(n):
+        for c in range(n):
+            letter = grid.letters[(r + 1) * width + c + 1]
+            if letter != WALL_CODE:
+                codes |= (0 if letter == BLANK_CODE else letter - 64) << shift
+                shift += 5
+    ids = array('I', (clue_ids.get(slot, NO_CLUE) for slot in range(len(grid.entries))))
+    body = mask.to_bytes((n * n + 7) // 8, 'little') + codes.to_bytes((shift + 7) // 8, 'little') + ids.tobytes()
+    ordinal = datetime.date.fromisoformat(date).toordinal() if date else 0
+    return RECORD.pack(RECORD.size + len(body), n, DAILY if daily else 0, ordinal, len(ids), number) + body
+
+
+def decode(buffer, offset: int) -> PuzzleRecord:
+    """Decodes the record at an offset of a buffer (e.g. an mmap of an archive)."""
+    _, n, flags, ordinal, num_slots, number = RECORD.unpack_from(buffer, offset)
+    offset += RECORD.size
+    mask_size = (n * n + 7) // 8
+    mask = int.from_bytes(buffer[offset:offset + mask_size], 'little')
+    offset += mask_size
+    codes_size = (5 * (n * n - mask.bit_count()) + 7) // 8
+    codes = int.from_bytes(buffer[offset:offset + codes_size], 'little')
+    offset += codes_size
+    clue_ids = array('I')
+    clue_ids.frombytes(buffer[offset:offset + 4 * num_slots])
+    date = datetime.date.fromordinal(ordinal).isoformat() if ordinal else None
+    return PuzzleRecord(n, mask, codes, clue_ids, date, bool(flags & DAILY), number)
+
+
+def read_header(f) -> tuple[int, int, dict, int]:
+    """Reads the header of an archive file.
+
+    Returns:
+        The puzzle count, the index offset, the metadata and the offset of the first record.
+    """
+    magic, version, count, index_offset, meta_size = HEADER.unpack(f.read(HEADER.size))
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f'Not a version {VERSION} puzzle archive')
+    return count, index_offset, json.loads(f.read(meta_size)), HEADER.size + meta_size
+
+
+def scan(buffer, start: int, end: int) -> list[int]:
+    """Returns the offsets of the complete records between start and end.
+
+    Scanning stops at the first bytes that are not a complete record whose length matches its contents,
+    e.g. an incomplete record, or an index written by a close that crashed before updating the header.
+    """
+    offsets = []
+    offset = start
+    while offset + RECORD.size <= end:
+        length, n, flags, _, num_slots, _ = RECORD.unpack_from(buffer, offset)
+        mask_size = (n * n + 7) // 8
+        body = offset + RECORD.size
+        if not n or flags & ~DAILY or body + mask_size > end:
+            break
+        walls = int.from_bytes(buffer[body:body + mask_size], 'little').bit_count()
+        if length != RECORD.size + mask_size + (5 * (n * n - walls) + 7) // 8 + 4 * num_slots \
+                or offset + length > end:
+            break
+        offsets.append(offset)
+        offset += length
+    return offsets
+
+
+class ArchiveWriter:
+    """
+    Appends puzzles to an archive, creating it or resuming it.
+        path: Path of the archive.
+        meta: Metadata of the archive; for an existing archive, the one it was created with.
+        offsets: Offsets of the records.
+
+    The index is only written by `close`; until then the header marks the archive as being written, so
+    a crashed run that flushed its records loses at most its last, incomplete one.
+    """
+
+    def __init__(self, path: str, title='Crossword', author='crossword-generator', clue_count=0):
+        self.path = path
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            self.file = open(path, 'r+b')
+            count, index_offset, self.meta, start = read_header(self.file)
+            with mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                if index_offset:
+                    index = data[index_offset:index_offset + count * OFFSET.size]
+                    self.offsets = [offset for offset, in OFFSET.iter_unpack(index)]
+                    end = index_offset
+                else:
+                    self.offsets = scan(data, start, len(data))
+                    end = self.offsets[-1] + RECORD.unpack_from(data, self.offsets[-1])[0] if self.offsets else start
+            self.file.truncate(end)  # drop the index, or an incomplete record
+        else:
+            self.file = open(path, 'w+b')
+            self.meta = {'title': title, 'author': author, 'clue_count': clue_count}
+            self.offsets = []
+            end = self.write_header(0)
+        self.file.seek(0)
+        self.write_header(0)
+        self.file.seek(end)
+
+    def write_header(self, index_offset: int) -> int:
+        """Writes the header at the current position. Returns its size."""
+        meta = json.dumps(self.meta).encode()
+        self.file.write(HEADER.pack(MAGIC, VERSION, len(self.offsets), index_offset, len(meta)) + meta)
+        return HEADER.size + len(meta)
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def append(self, grid: Grid, clue_ids: Mapping[int, int], date: str | None = None,
+               publish_type='Daily', number=0) -> int:
+        """Appends a puzzle (see `encode`). Returns its id."""
+        self.offsets.append(self.file.tell())
+        self.file.write(encode(grid, clue_ids, date, publish_type == 'Daily', number))
+        return len(self.offsets) - 1
+
+    def append_document(self, document: dict, clue_index: ClueIndex) -> int:
+        """Appends a puzzle document (see `batch.puzzle_document`), referring to its clues by their ids in
+        clue_index. Returns its id."""
+        meta, data = document['puzzle_meta'], document['puzzle_data']
+        n, width = meta['height'], meta['height'] + 2
+        g = Grid(n, set_layout=False)
+        for cell, (open_cell, answer) in enumerate(zip(data['layout'], data['answers'])):
+            r, c = divmod(cell, n)
+            g.letters[(r + 1) * width + c + 1] = ord(answer or Cell.BLANK) if open_cell else WALL_CODE
+        g.number_cells()
+
+        clues = {(Direction.ACROSS if key == 'A' else Direction.DOWN, clue['clueNum']): clue['value']
+                 for key, clue_list in data['clues'].items() for clue in clue_list}
+        clue_ids = {}
+        for slot, entry in enumerate(g.entries):
+            clue_id = clue_index.find(g.slots.word(g.letters, slot), clues.get((entry.direction, entry.id), ''))
+            if clue_id is not None:
+                clue_ids[slot] = clue_id
+        return self.append(g, clue_ids, meta['dailyDate'], meta['publishType'], meta.get('number', 0))
+
+    def flush(self) -> None:
+        self.file.flush()
+
+    def close(self) -> None:
+        """Writes the index and the header, and closes the file.
+
+        The index is on disk before the header points at it, so a crash in between leaves an archive that
+        is still read (and resumed) by scanning its records.
+        """
+        if self.file.closed:
+            return
+        index_offset = self.file.tell()
+        self.file.write(array('Q', self.offsets).tobytes())
+        self.sync()
+        self.file.seek(0)
+        self.write_header(index_offset)
+        self.sync()
+        self.file.close()
+
+    def sync(self) -> None:
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def __enter__(self) -> ArchiveWriter:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class PuzzleArchive(Sequence[dict]):
+    """
+    Random access to the puzzles of an archive, memory-mapped and decoded on access.
+        path: Path of the archive.
+        meta: Metadata of the archive.
+        clue_index: The clue index that the clue ids refer to, or None to leave clues out of documents.
+
+    `archive[i]` is the document of puzzle i in the schema of the server's puzzle collection (see
+    `batch.puzzle_document`), and `archive.grid(i)` its grid.
+    """
+
+    def __init__(self, path: str, clue_index: ClueIndex | None = None):
+        self.path = path
+        with open(path, 'rb') as f:
+            count, self.index_offset, self.meta, start = read_header(f)
+            self.buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.count = count
+        self.offsets: list[int] | None = None
+        if not self.index_offset:  # not closed: find the records by scanning
+            self.offsets = scan(self.buffer, start, len(self.buffer))
+            self.count = len(self.offsets)
+        if clue_index is not None and len(clue_index) != self.meta['clue_count']:
+            raise ValueError(f"The archive's clue ids refer to a clue index of {self.meta['clue_count']} clues, "
+                             f'not {len(clue_index)}')
+        self.clue_index = clue_index
+
+    def __len__(self):
+        return self.count
+
+    def offset(self, i: int) -> int:
+        if not -self.count <= i < self.count:
+            raise IndexError('puzzle id out of range')
+        i %= self.count
+        if self.offsets is not None:
+            return self.offsets[i]
+        return OFFSET.unpack_from(self.buffer, self.index_offset + i * OFFSET.size)[0]
+
+    def record(self, i: int) -> PuzzleRecord:
+        return decode(self.buffer, self.offset(i))
+
+    def records(self) -> Iterator[PuzzleRecord]:
+        for i in range(self.count):
+            yield self.record(i)
+
+    def grid(self, i: int) -> Grid:
+        return self.record(i).grid()
+
+    def __getitem__(self, i: int) -> dict:
+        from crossword_generator.batch import puzzle_document  # batch depends on this module
+
+        record = self.record(i)
+        clues = {}
+        if self.clue_index is not None:
+            clues = {slot: self.clue_index.clues[clue_id] for slot, clue_id in enumerate(record.clue_ids)
+                     if clue_id != NO_CLUE}
+        return puzzle_document(record.grid(), clues, record.date or '', self.meta['title'], self.meta['author'],
+                               'Daily' if record.daily else 'Free', record.number)
+
+    def close(self) -> None:
+        self.buffer.close()
+
+    def __enter__(self) -> PuzzleArchive:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -0,0 +1,334 @@
+"""Batch puzzle generation: layout, fill and clue assignment in a process pool, streamed to JSONL.
+
+Each line of the output is one puzzle document in the schema the server stores and the client renders
+(`puzzle_meta` and `puzzle_data`), or, for an output ending in .cwpa, one record of a binary puzzle archive
+(see `archive`). A run is resumable: puzzles already in the output, identified by size, date and number, are
+not generated again, and a truncated last puzzle (e.g. from a crash) is dropped. E.g.
+
+    python -m crossword_generator clues.csv -o puzzles.jsonl --sizes 5 11 13 --start 2024-01-01 --end 2024-01-31
+"""
+from __future__ import annotations
+import argparse
+import datetime
+import json
+import multiprocessing
+import os
+import random
+import statistics
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import Iterator, Sequence
+
+from crossword_generator.archive import SUFFIX, ArchiveWriter, PuzzleArchive
+from crossword_generator.clue_index import ClueIndex, assign_clues
+from crossword_generator.grid import Direction, Grid
+from crossword_generator.prescreen import screened_grid
+from crossword_generator.word_index import WordIndex
+
+SIZES = (5, 11, 13)
+STAGES = ('layout', 'fill', 'clues')
+
+Task = tuple[int, str, int, str, dict]  # size, date, number (among puzzles of that size and date), seed, options
+
+
+@dataclass
+class BatchStats:
+    """
+    Throughput of a batch run.
+        puzzles: Number of puzzles written.
+        failures: Number of puzzles given up on (no layout could be filled).
+        skipped: Number of puzzles already in the output when the run started.
+        elapsed: Wall-clock seconds spent generating.
+        stages: Dictionary mapping stage names (see STAGES) to the seconds each puzzle spent in it.
+    """
+
+    puzzles: int = 0
+    failures: int = 0
+    skipped: int = 0
+    elapsed: float = 0.0
+    stages: dict[str, list[float]] = field(default_factory=lambda: {stage: [] for stage in STAGES})
+
+    def puzzles_per_second(self) -> float:
+        return self.puzzles / self.elapsed if self.elapsed else 0.0
+
+    def summary(self) -> dict:
+        """Returns the counts, puzzles per second, and the mean, median and 95th percentile latency of
+        each stage."""
+        latencies = {}
+        for stage, seconds in self.stages.items():
+            if seconds:
+                latencies[stage] = {
+                    'mean': statistics.fmean(seconds),
+                    'median': statistics.median(seconds),
+                    'p95': statistics.quantiles(seconds, n=20)[-1] if len(seconds) > 1 else seconds[0],
+                }
+        return {
+            'puzzles': self.puzzles,
+            'failures': self.failures,
+            'skipped': self.skipped,
+            'elapsed': self.elapsed,
+            'puzzles_per_second': self.puzzles_per_second(),
+            'stages': latencies,
+        }
+
+
+def puzzle_document(grid: Grid, clues: dict[int, str], date: str, title='Crossword', author='crossword-generator',
+                    publish_type='Daily', number=0) -> dict:
+    """Returns the document of a filled grid, in the schema of the server's puzzle collection.
+
+    Cells are numbered row by row from 0 over the n x n grid, without the border of walls.
+
+    Args:
+        grid: The filled grid.
+        clues: Dictionary mapping slots to their clues.
+        date: Date, as YYYY-MM-DD.
+        title: Title.
+        author: Author.
+        publish_type: 'Daily' for a daily puzzle.
+        number: Number of the puzzle among the puzzles of its size and date.
+
+    Returns:
+        The document.
+    """
+    n, width = grid.n, grid.n + 2
+
+    def flat(cell: int) -> int:
+        r, c = divmod(cell, width)
+        return (r - 1) * n + c - 1
+
+    layout, answers = [], []
+    for r in range(1, n + 1):
+        for c in range(1, n + 1):
+            cell = grid.cell(r, c)
+            layout.append(0 if cell.is_wall() else 1)
+            answers.append('' if cell.is_wall() else cell.label)
+
+    directions = {'A': [], 'D': []}
+    for slot, entry in enumerate(grid.entries):
+        cells = grid.slots.cells[slot]
+        directions['A' if entry.direction is Direction.ACROSS else 'D'].append({
+            'clueStart': flat(cells[0]),
+            'clueEnd': flat(cells[-1]),
+            'clueNum': entry.id,
+            'value': clues.get(slot, ''),
+        })
+    for clue_list in directions.values():
+        clue_list.sort(key=lambda clue: clue['clueNum'])
+
+    return {
+        'puzzle_meta': {
+            'title': title,
+            'author': author,
+            'publishType': publish_type,
+            'dailyDate': date,
+            'printDate': date,
+            'height': n,
+            'width': n,
+            'number': number,
+        },
+        'puzzle_data': {
+            'layout': layout,
+            'answers': answers,
+            'clues': directions,
+        },
+    }
+
+
+# set once per worker process by init_worker
+_index: WordIndex | None = None
+_clues: ClueIndex | None = None
+
+
+def init_worker(index: WordIndex, clues: ClueIndex) -> None:
+    """Sets the index and clues used by `generate_puzzle` in this process."""
+    global _index, _clues
+    _index, _clues = index, clues
+
+
+def generate_puzzle(task: Task) -> tuple[Task, dict | None, dict[str, float]]:
+    """Generates one puzzle in a worker process: screens layouts, fills them until one fills, and picks a
+    clue for each entry.
+
+    Returns:
+        The task, the document (None if no layout could be filled), and the seconds spent in each stage.
+    """
+    n, date, number, seed, options = task
+    options = dict(options)
+    max_layouts = options.pop('max_layouts')
+    metadata = {key: options.pop(key) for key in ('title', 'author', 'publish_type')}
+    rng = random.Random(seed)
+    timings = dict.fromkeys(STAGES, 0.0)
+
+    for _ in range(max_layouts):
+        start = time.perf_counter()
+        g, _ = screened_grid(n, _index, rng=rng)
+        timings['layout'] += time.perf_counter() - start
+
+        start = time.perf_counter()
+        res = g.fill(_index, rng=rng, **options)
+        timings['fill'] += time.perf_counter() - start
+        if res.success:
+            break
+    else:
+        return task, None, timings
+
+    start = time.perf_counter()
+    document = puzzle_document(g, assign_clues(g, _clues, rng), date, number=number, **metadata)
+    timings['clues'] += time.perf_counter() - start
+    return task, document, timings
+
+
+def dates(start: datetime.date, end: datetime.date) -> Iterator[str]:
+    """Yields the dates from start to end inclusive, as YYYY-MM-DD."""
+    for day in range((end - start).days + 1):
+        yield (start + datetime.timedelta(days=day)).isoformat()
+
+
+def finished_puzzles(path: str) -> set[tuple[int, str, int]]:
+    """Returns the (size, date, number) of the puzzles of an existing output, dropping a truncated last
+    puzzle. Puzzles are written as they finish, so the numbers of a size and date need not be consecutive."""
+    finished: set[tuple[int, str, int]] = set()
+    if not os.path.exists(path):
+        return finished
+    if path.endswith(SUFFIX):  # ArchiveWriter drops an incomplete last record
+        with PuzzleArchive(path) as archive:
+            finished.update((record.n, record.date, record.number) for record in archive.records())
+        return finished
+    with open(path, 'rb+') as f:
+        complete = 0  # length of the complete lines
+        for line in f:
+            try:
+                meta = json.loads(line)['puzzle_meta']
+            except (ValueError, KeyError):
+                break
+            if not line.endswith(b'\n'):
+                break
+            finished.add((meta['height'], meta['dailyDate'], meta['number']))
+            complete += len(line)
+        f.truncate(complete)
+    return finished
+
+
+def run(index: WordIndex, clues: ClueIndex, output: str, sizes: Sequence[int] = SIZES, count=1,
+        start: datetime.date | None = None, end: datetime.date | None = None, workers: int | None = None,
+        seed=0, max_layouts=20, title='Crossword', author='crossword-generator', verbose=False,
+        **options) -> BatchStats:
+    """Generates count puzzles per size per date and appends them to a JSONL file, or to a puzzle archive
+    if output ends in .cwpa.
+
+    Puzzles are generated in a process pool (in process if workers is 1), which memory-maps one shared
+    copy of the index (see `WordIndex.share`). Each puzzle is written and flushed as soon as it is done,
+    so a crashed run can be resumed with the same arguments. Puzzle i of a size and date is seeded from
+    (seed, size, date, i), so resuming produces the puzzles a complete run would.
+
+    Args:
+        index: The word index.
+        clues: The clue index.
+        output: Path of the JSONL output or puzzle archive.
+        sizes: Grid sizes.
+        count: Number of puzzles per size per date.
+        start: First date. Defaults to today.
+        end: Last date. Defaults to start.
+        workers: Number of worker processes. Defaults to the number of CPUs.
+        seed: Base seed.
+        max_layouts: Number of layouts to try per puzzle before giving up on it.
+        title: Title of every puzzle.
+        author: Author of every puzzle.
+        verbose: Whether to print progress to stderr.
+        **options: Options for `Grid.fill`, e.g. engine or time_limit.
+
+    Returns:
+        The run's statistics.
+    """
+    start = start or datetime.date.today()
+    end = end or start
+    stats = BatchStats()
+    finished = finished_puzzles(output)
+    options.update(max_layouts=max_layouts, title=title, author=author, publish_type='Daily')
+    tasks = []
+    for date in dates(start, end):
+        for n in sizes:
+            for number in range(count):
+                if (n, date, number) in finished:
+                    stats.skipped += 1
+                else:
+                    tasks.append((n, date, number, f'{seed}-{n}-{date}-{number}', options))
+
+    began = time.monotonic()
+    archive = output.endswith(SUFFIX)
+    with ArchiveWriter(output, title, author, len(clues)) if archive else open(output, 'a') as f:
+        if workers == 1:
+            init_worker(index, clues)
+            results = map(generate_puzzle, tasks)
+            pool = None
+        else:
+            if index.path is None:  # publish the index once, for the workers to map rather than copy
+                index = index.share()
+            pool = multiprocessing.Pool(workers, initializer=init_worker, initargs=(index, clues))
+            results = pool.imap_unordered(generate_puzzle, tasks)
+        try:
+            for (n, date, number, _, _), document, timings in results:
+                for stage, seconds in timings.items():
+                    stats.stages[stage].append(seconds)
+                if document is None:
+                    stats.failures += 1
+                    if verbose:
+                        print(f'gave up on puzzle {number} of size {n} for {date}', file=sys.stderr)
+                    continue
+                if archive:
+                    f.append_document(document, clues)
+                else:
+                    f.write(json.dumps(document) + '\n')
+                f.flush()
+                stats.puzzles += 1
+                if verbose:
+                    stats.elapsed = time.monotonic() - began
+                    print(f'{stats.puzzles}/{len(tasks)} puzzles, {stats.puzzles_per_second():.2f}/s',
+                          file=sys.stderr)
+        finally:
+            if pool is not None:
+                pool.terminate()
+            if index.shared:
+                index.unlink()
+    stats.elapsed = time.monotonic() - began
+    return stats
+
+
+def main(argv: Sequence[str] | None = None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('clues', help='clue csv with clue and answer columns')
+    parser.add_argument('--output', '-o', default='puzzles.jsonl',
+                        help='JSONL output path, or puzzle archive path ending in .cwpa; appended to')
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES)
+    parser.add_argument('--count', type=int, default=1, help='puzzles per size per date')
+    parser.add_argument('--start', type=datetime.date.fromisoformat, default=None, help='YYYY-MM-DD; defaults to today')
+    parser.add_argument('--end', type=datetime.date.fromisoformat, default=None, help='YYYY-MM-DD; defaults to start')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--engine', default='dfs')
+    parser.add_argument('--time-limit', type=float, default=30.0, help='seconds per fill')
+    parser.add_argument('--max-layouts', type=int, default=20, help='layouts to try per puzzle')
+    parser.add_argument('--num-sample-strings', type=int, default=100)
+    parser.add_argument('--title', default='Crossword')
+    parser.add_argument('--author', default='crossword-generator')
+    parser.add_argument('--stats', default=None, help='JSON path for the run statistics; defaults to stderr')
+    args = parser.parse_args(argv)
+
+    from crossword_generator.clue_processor import ClueProcessor  # pandas is only needed here
+
+    clue_processor = ClueProcessor(args.clues)
+    stats = run(clue_processor.index, clue_processor.clue_index, args.output, args.sizes, args.count,
+                args.start, args.end, args.workers, args.seed, args.max_layouts, args.title, args.author,
+                verbose=True, engine=args.engine, time_limit=args.time_limit,
+                num_sample_strings=args.num_sample_strings)
+    if args.stats:
+        with open(args.stats, 'w') as f:
+            json.dump(stats.summary(), f, indent=2)
+    else:
+        json.dump(stats.summary(), sys.stderr, indent=2)
+        print(file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,254 @@
+from __future__ import annotations
+import os
+import random
+import struct
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Iterator
+
+from crossword_generator.grid import WALL_CODE, Grid, as_rng
+from crossword_generator.sampling import AliasTable
+
+if TYPE_CHECKING:
+    from crossword_generator.fill import FillResult
+
+# layout catalog file layout (little-endian):
+#   header:     magic, format version, number of sizes
+#   size table: (size, layout count) per size
+#   layouts:    per size, per layout: ceil(size ** 2 / 8) bytes of wall bitmask, then the stats record
+MAGIC = b'CWLC'
+VERSION = 1
+HEADER = struct.Struct('<4sII')
+SIZE_ENTRY = struct.Struct('<II')
+STATS = struct.Struct('<HHIId')  # num_words, num_walls, fills, successes, fill_seconds
+
+DEFAULT_PATH = os.path.join(os.path.dirname(__file__), 'data', 'layouts.cat')
+DEFAULT_COUNT = 200
+
+
+@dataclass
+class Layout:
+    """
+    A catalogued layout and its fill history.
+        n: Size of the grid.
+        mask: Wall bitmask in canonical orientation; bit (r - 1) * n + (c - 1) is set iff cell (r, c) is a wall.
+        num_words: Number of entries.
+        num_walls: Number of walls.
+        fills: Number of recorded fills.
+        successes: Number of recorded fills that succeeded.
+        fill_seconds: Total seconds of the recorded fills.
+    """
+
+    n: int
+    mask: int
+    num_words: int
+    num_walls: int
+    fills: int = 0
+    successes: int = 0
+    fill_seconds: float = 0.0
+
+    def success_rate(self) -> float:
+        """Returns the fill success rate, smoothed towards 1/2 so that new layouts are not ruled out."""
+        return (self.successes + 1) / (self.fills + 2)
+
+    def weight(self) -> float:
+        """Returns the sampling weight: the smoothed success rate, discounted by the mean fill time."""
+        mean_seconds = self.fill_seconds / self.fills if self.fills else 0.0
+        return self.success_rate() / (1 + mean_seconds)
+
+    def grid(self, symmetry=0) -> Grid:
+        """Returns a numbered blank grid with this layout, transformed by one of the 8 `symmetries`."""
+        g = Grid(self.n, set_layout=False)
+        for r, c in cells(self.n, transform(self.n, self.mask, symmetry)):
+            g.letters[(r + 1) * (self.n + 2) + c + 1] = WALL_CODE
+        g.number_cells()
+        return g
+
+
+def cells(n: int, mask: int) -> Iterator[tuple[int, int]]:
+    """Yields the 0-indexed (row, col) of the set bits of a layout bitmask."""
+    while mask:
+        low = mask & -mask
+        bit = low.bit_length() - 1
+        yield divmod(bit, n)
+        mask ^= low
+
+
+def layout_mask(grid: Grid) -> int:
+    """Returns the wall bitmask of a grid (see `Layout.mask`)."""
+    n, width = grid.n, grid.n + 2
+    mask = 0
+    for r in range(n):
+        for c in range(n):
+            if grid.letters[(r + 1) * width + c + 1] == WALL_CODE:
+                mask |= 1 << (r * n + c)
+    return mask
+
+
+# the 8 symmetries of the square, as maps of 0-indexed (row, col) given the last index m = n - 1
+SYMMETRIES = (
+    lambda r, c, m: (r, c),
+    lambda r, c, m: (c, m - r),
+    lambda r, c, m: (m - r, m - c),
+    lambda r, c, m: (m - c, r),
+    lambda r, c, m: (r, m - c),
+    lambda r, c, m: (m - r, c),
+    lambda r, c, m: (c, r),
+    lambda r, c, m: (m - c, m - r),
+)
+
+
+def transform(n: int, mask: int, symmetry: int) -> int:
+    """Applies one of the 8 `SYMMETRIES` to a layout bitmask."""
+    if symmetry == 0:
+        return mask
+    f = SYMMETRIES[symmetry]
+    res = 0
+    for r, c in cells(n, mask):
+        r, c = f(r, c, n - 1)
+        res |= 1 << (r * n + c)
+    return res
+
+
+def canonical_mask(n: int, mask: int) -> int:
+    """Returns the smallest bitmask among the rotations and reflections of a layout."""
+    return min(transform(n, mask, symmetry) for symmetry in range(len(SYMMETRIES)))
+
+
+class LayoutCatalog:
+    """
+    Deduplicated layouts per grid size, with fill statistics.
+        layouts: Dictionary mapping sizes to lists of Layouts.
+
+    Layouts are stored once per equivalence class under rotations and reflections. Sampling is
+    O(1) with an alias table over the layout weights, rebuilt only after weights change.
+    """
+
+    def __init__(self):
+        self.layouts: dict[int, list[Layout]] = {}
+        self.ids: dict[tuple[int, int], int] = {}  # (n, canonical mask) -> position in layouts[n]
+        self.tables: dict[int, AliasTable] = {}
+
+    def __len__(self):
+        return sum(len(layouts) for layouts in self.layouts.values())
+
+    def add(self, grid: Grid) -> Layout:
+        """Adds the layout of a numbered grid, unless an equivalent layout is already catalogued.
+
+        Returns:
+            The catalogued layout.
+        """
+        n = grid.n
+        mask = canonical_mask(n, layout_mask(grid))
+        if (n, mask) in self.ids:
+            return self.layouts[n][self.ids[(n, mask)]]
+        layout = Layout(n, mask, len(grid.entries), mask.bit_count())
+        return self._insert(layout)
+
+    def _insert(self, layout: Layout) -> Layout:
+        layouts = self.layouts.setdefault(layout.n, [])
+        self.ids[(layout.n, layout.mask)] = len(layouts)
+        layouts.append(layout)
+        self.tables.pop(layout.n, None)
+        return layout
+
+    def get(self, grid: Grid) -> Layout | None:
+        """Returns the catalogued layout of a grid, in any orientation, or None."""
+        i = self.ids.get((grid.n, canonical_mask(grid.n, layout_mask(grid))))
+        return None if i is None else self.layouts[grid.n][i]
+
+    def generate(self, n: int, count: int, rng: random.Random | int | None = None, max_tries: int | None = None) -> int:
+        """Generates layouts with `Grid.generate_layout` until the catalog holds count layouts of size n.
+
+        Small sizes have few distinct layouts, so generation also stops after max_tries layouts
+        (default 10 * count).
+
+        Returns:
+            The number of layouts added.
+        """
+        rng = as_rng(rng)
+        max_tries = 10 * count if max_tries is None else max_tries
+        added = 0
+        for _ in range(max_tries):
+            if len(self.layouts.get(n, ())) >= count:
+                break
+            before = len(self)
+            self.add(Grid(n, rng=rng))
+            added += len(self) - before
+        return added
+
+    def record(self, grid: Grid, result: FillResult) -> Layout:
+        """Records the outcome of filling a grid, adding its layout if it is not catalogued yet."""
+        layout = self.get(grid) or self.add(grid)
+        layout.fills += 1
+        layout.successes += result.success
+        layout.fill_seconds += result.elapsed
+        self.tables.pop(grid.n, None)
+        return layout
+
+    def sample(self, n: int, rng: random.Random | int | None = None) -> Layout:
+        """Samples a layout of size n, with probability proportional to `Layout.weight`."""
+        if not self.layouts.get(n):
+            raise KeyError(f'No layouts of size {n} in the catalog')
+        if n not in self.tables:
+            self.tables[n] = AliasTable([layout.weight() for layout in self.layouts[n]])
+        return self.layouts[n][self.tables[n].sample(as_rng(rng))]
+
+    def save(self, path: str) -> None:
+        """Writes the catalog to a file, which can be read with `load`."""
+        sizes = sorted(self.layouts)
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, VERSION, len(sizes)))
+            for n in sizes:
+                f.write(SIZE_ENTRY.pack(n, len(self.layouts[n])))
+            for n in sizes:
+                for layout in self.layouts[n]:
+                    f.write(layout.mask.to_bytes((n * n + 7) // 8, 'little'))
+                    f.write(STATS.pack(layout.num_words, layout.num_walls, layout.fills, layout.successes,
+                                       layout.fill_seconds))
+        os.replace(tmp_path, path)  # never leave a truncated catalog behind
+
+    @classmethod
+    def load(cls, path: str) -> LayoutCatalog:
+        """Reads a catalog written by `save`."""
+        with open(path, 'rb') as f:
+            data = f.read()
+        magic, version, num_sizes = HEADER.unpack_from(data, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f'Not a version {VERSION} layout catalog')
+
+        catalog = cls()
+        table = [SIZE_ENTRY.unpack_from(data, HEADER.size + i * SIZE_ENTRY.size) for i in range(num_sizes)]
+        offset = HEADER.size + num_sizes * SIZE_ENTRY.size
+        for n, count in table:
+            mask_size = (n * n + 7) // 8
+            for _ in range(count):
+                mask = int.from_bytes(data[offset:offset + mask_size], 'little')
+                offset += mask_size
+                catalog._insert(Layout(n, mask, *STATS.unpack_from(data, offset)))
+                offset += STATS.size
+        return catalog
+
+
+_default_catalog: LayoutCatalog | None = None
+
+
+def default_catalog() -> LayoutCatalog:
+    """Returns the process-wide catalog: the one saved at DEFAULT_PATH if any, or else an empty catalog
+    that `Grid.from_catalog` fills on demand."""
+    global _default_catalog
+    if _default_catalog is None:
+        _default_catalog = LayoutCatalog.load(DEFAULT_PATH) if os.path.exists(DEFAULT_PATH) else LayoutCatalog()
+    return _default_catalog
+
+
+if __name__ == '__main__':
+    import sys
+
+    # usage: python -m crossword_generator.catalog [count] [sizes...]
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_COUNT
+    catalog = LayoutCatalog.load(DEFAULT_PATH) if os.path.exists(DEFAULT_PATH) else LayoutCatalog()
+    for n in map(int, sys.argv[2:]) if len(sys.argv) > 2 else (5, 7, 11, 13, 15):
+        print(f'{n}: {catalog.generate(n, count)} layouts added')
+    catalog.save(DEFAULT_PATH)
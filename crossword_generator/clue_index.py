@@ -0,0 +1,98 @@
+from __future__ import annotations
+import random
+from typing import TYPE_CHECKING, Iterable
+
+from crossword_generator.grid import Direction, Grid
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+class ClueIndex:
+    """
+    Answer-to-clue lookup.
+        clues: Clue texts, grouped by answer; a clue's id is its position.
+        spans: Dictionary mapping answers to the (start, stop) range of their clue ids.
+
+    Clues are grouped once when the index is built, so looking up or choosing a clue is O(1).
+    """
+
+    def __init__(self, clues: list[str], spans: dict[str, tuple[int, int]]):
+        self.clues = clues
+        self.spans = spans
+
+    @classmethod
+    def from_pairs(cls, pairs: Iterable[tuple[str, str]]) -> ClueIndex:
+        """Builds an index from (answer, clue) pairs."""
+        grouped: dict[str, list[str]] = {}
+        for answer, clue in pairs:
+            grouped.setdefault(answer, []).append(clue)
+        clues: list[str] = []
+        spans = {}
+        for answer, answer_clues in grouped.items():
+            spans[answer] = (len(clues), len(clues) + len(answer_clues))
+            clues.extend(answer_clues)
+        return cls(clues, spans)
+
+    @classmethod
+    def from_clues(cls, clues: pd.DataFrame) -> ClueIndex:
+        """Builds an index from a DataFrame with 'clue' and 'answer' columns (e.g. `ClueProcessor.clues`)."""
+        clues = clues.sort_values('answer', kind='stable')
+        answers = clues['answer'].to_numpy()
+        starts = [0] + [i for i in range(1, len(answers)) if answers[i] != answers[i - 1]]
+        stops = starts[1:] + [len(answers)]
+        return cls(clues['clue'].tolist(), {answers[start]: (start, stop) for start, stop in zip(starts, stops)})
+
+    def __len__(self):
+        return len(self.clues)
+
+    def __contains__(self, answer: str) -> bool:
+        return answer in self.spans
+
+    def lookup(self, answer: str) -> list[str]:
+        """Returns the clues of an answer."""
+        start, stop = self.spans.get(answer, (0, 0))
+        return self.clues[start:stop]
+
+    def find(self, answer: str, clue: str) -> int | None:
+        """Returns the id of a clue of an answer, or None if the answer has no such clue."""
+        start, stop = self.spans.get(answer, (0, 0))
+        for clue_id in range(start, stop):
+            if self.clues[clue_id] == clue:
+                return clue_id
+        return None
+
+    def choose(self, answer: str, rng: random.Random | None = None) -> str | None:
+        """Returns a uniformly random clue of an answer, or None if it has none."""
+        span = self.spans.get(answer)
+        if span is None:
+            return None
+        return self.clues[(rng or random).randrange(*span)]
+
+
+def extract_words(grid: Grid) -> dict[Direction, dict[int, str]]:
+    """Returns the words of a numbered grid, as dictionaries mapping clue numbers to words per direction,
+    in one pass over its slots."""
+    words: dict[Direction, dict[int, str]] = {Direction.ACROSS: {}, Direction.DOWN: {}}
+    for slot, entry in enumerate(grid.entries):
+        words[entry.direction][entry.id] = grid.slots.word(grid.letters, slot)
+    return words
+
+
+def assign_clues(grid: Grid, clue_index: ClueIndex, rng: random.Random | None = None) -> dict[int, str]:
+    """Chooses a clue for every entry of a filled grid.
+
+    Args:
+        grid: The filled grid.
+        clue_index: The clue index.
+        rng: Random number generator. Defaults to the global random module.
+
+    Returns:
+        Dictionary mapping slots to clues. Entries whose answers have no clue are left out.
+    """
+    clues = {}
+    for slot in range(len(grid.entries)):
+        clue = clue_index.choose(grid.slots.word(grid.letters, slot), rng)
+        if clue is not None:
+            clues[slot] = clue
+    return clues
@@ -1,36 +1,109 @@
+from __future__ import annotations
+from typing import Iterator, Sequence
+
 import pandas as pd
 
+from crossword_generator.clue_index import ClueIndex
+from crossword_generator.word_index import MAX_LENGTH, MIN_LENGTH, WordIndex, WordIndexBuilder
+from crossword_generator.word_store import WordStore
+
+CHUNKSIZE = 100_000
+
 
 class ClueProcessor:
     """
     Processes clue data from a csv.
         clues: DataFrame storing clues and answers.
-        words: Dictionary mapping lengths to dictionaries, which map (pos, char) pairs to lists.
+        words: The distinct answers, as a trie per length, for pattern queries such as `words.match('P..Y')`.
+        index: Bitset index over the same words, used by Grid.fill. Words are weighted by their number of clues.
+            Its words are packed into one buffer of ASCII bytes (see `WordIndex.packed`).
+        clue_index: Answer-to-clue lookup, used to assign clues to filled grids.
 
     TODO: currently only processes words for which there exists an associated
     old clue. update this if/when we generate clues ourselves.
     """
 
     def __init__(self, path):
-        clues = pd.read_csv(path)
-        clues = clues[['clue', 'answer']]
-        clues['clue'] = clues['clue'].astype(str).apply(lambda s: s.split("(")[0].strip())
-        clues['answer'] = clues['answer'].astype(str).apply(
-            lambda s: s.replace(" ", "").replace("-", "").strip().upper())
-        clues = clues[clues['answer'].str.contains(r'^[A-Z]*$')]
-        clues['len'] = clues['answer'].apply(lambda s: len(s))
-        clues = clues[(clues['len'] >= 3) & (clues['len'] <= 15)]
-
-        words = {i: {} for i in range(3, 16)}
-        for i in range(3, 16):
-            words[i]['all'] = set()
-            for j in range(i):
-                for c in 'ABCDEFGHIJKLMNOPQRSTUVWXYZ':
-                    words[i][(j, c)] = set()
-        for word in clues['answer'].unique():
-            words[len(word)]['all'].add(word)
-            for i in range(len(word)):
-                words[len(word)][(i, word[i])].add(word)
-
+        clues = normalize_clues(pd.read_csv(path, usecols=['clue', 'answer'], dtype=str))
         self.clues = clues
-        self.words = words
+        counts = clues['answer'].value_counts()
+        index = WordIndex.from_words(counts.index, counts.to_numpy())
+        self.words = WordStore.from_index(index)
+        self.index = index.packed()
+        self.clue_index = ClueIndex.from_clues(clues)
+
+
+def normalize_answers(answers: pd.Series) -> pd.Series:
+    """Uppercases answers and strips spaces and hyphens from them. Missing answers become empty strings."""
+    return (answers.fillna('').astype(str)
+            .str.replace(' ', '', regex=False)
+            .str.replace('-', '', regex=False)
+            .str.strip()
+            .str.upper())
+
+
+def normalize_clues(clues: pd.DataFrame) -> pd.DataFrame:
+    """Normalizes a DataFrame of clues and answers, dropping answers that cannot be entries.
+
+    Clues lose their enumeration (e.g. '(5)'), and answers are normalized with `normalize_answers` and
+    kept only if they consist of MIN_LENGTH to MAX_LENGTH letters.
+
+    Args:
+        clues: DataFrame with 'clue' and 'answer' columns.
+
+    Returns:
+        DataFrame with 'clue', 'answer' and 'len' columns.
+    """
+    clues = clues[['clue', 'answer']].copy()
+    clues['clue'] = clues['clue'].fillna('').astype(str).str.partition('(')[0].str.strip()
+    clues['answer'] = normalize_answers(clues['answer'])
+    clues['len'] = clues['answer'].str.len()
+    return clues[clues['answer'].str.fullmatch(r'[A-Z]*')
+                 & (clues['len'] >= MIN_LENGTH) & (clues['len'] <= MAX_LENGTH)]
+
+
+def read_answers(path: str, chunksize: int = CHUNKSIZE) -> Iterator[pd.Series]:
+    """Streams the normalized, valid answers of a clue csv or word list, one chunk at a time.
+
+    Files ending in '.csv' are read as clue csvs with an 'answer' column. Anything else is read as a
+    word list with one word per line, optionally followed by ';' and a score (the crosswordnexus format).
+
+    Args:
+        path: Path to the file.
+        chunksize: Number of rows per chunk.
+
+    Returns:
+        An iterator of Series of answers.
+    """
+    if path.endswith('.csv'):
+        reader = pd.read_csv(path, usecols=['answer'], dtype={'answer': str}, chunksize=chunksize)
+    else:
+        # no usecols: pandas rejects it when no line has a score
+        reader = pd.read_csv(path, sep=';', header=None, names=['answer', 'score'], dtype={'answer': str},
+                             chunksize=chunksize, quoting=3, keep_default_na=False)
+    for chunk in reader:
+        answers = normalize_answers(chunk['answer'])
+        lengths = answers.str.len()
+        yield answers[answers.str.fullmatch(r'[A-Z]*') & (lengths >= MIN_LENGTH) & (lengths <= MAX_LENGTH)]
+
+
+def build_index(paths: str | Sequence[str], chunksize: int = CHUNKSIZE) -> WordIndex:
+    """Builds a word index from one or more clue csvs / word lists, merging their answers. Each word is
+    weighted by its number of occurrences (e.g. its number of clues).
+
+    Files are streamed in chunks, so peak memory is bounded by the chunk size and the
+    number of distinct answers rather than by the size of the files.
+
+    Args:
+        paths: Path(s) to the files (see `read_answers`).
+        chunksize: Number of rows per chunk.
+
+    Returns:
+        The index.
+    """
+    builder = WordIndexBuilder()
+    for path in [paths] if isinstance(paths, str) else paths:
+        for answers in read_answers(path, chunksize):
+            counts = answers.value_counts()
+            builder.add(counts.index, counts.to_numpy())
+    return builder.build()
@@ -0,0 +1,753 @@
+from __future__ import annotations
+import heapq
+import random
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Callable, Iterable, Mapping, Sequence
+
+import numpy as np
+
+from crossword_generator.grid import BLANK_CODE
+from crossword_generator.pattern_cache import PatternCache, shared_cache
+from crossword_generator.word_index import ALPHABET, WordIndex
+
+if TYPE_CHECKING:
+    from crossword_generator.grid import Grid
+
+
+@dataclass
+class FillStats:
+    """Search counters of a fill.
+        nodes: Number of search nodes expanded (iterations, for local search).
+        restarts: Number of restarts (attempts) used.
+        backtracks: Number of undone placements, indexed by depth (number of entries placed before).
+        candidates_sampled: Number of candidate words sampled for scoring.
+        candidates_pruned: Number of sampled candidates rejected by scoring (e.g. for emptying a crossing).
+        nogood_hits: Number of slots failed by a recorded nogood without being expanded.
+        cache_hits: Pattern cache hits.
+        cache_misses: Pattern cache misses.
+        cache_size: Number of patterns in the cache at the end.
+        heuristic_time: Seconds spent sampling and scoring candidates.
+        search_time: Seconds spent in the search otherwise (placing, propagating, recursing).
+    """
+
+    nodes: int = 0
+    restarts: int = 0
+    backtracks: list[int] = field(default_factory=list)
+    candidates_sampled: int = 0
+    candidates_pruned: int = 0
+    nogood_hits: int = 0
+    cache_hits: int = 0
+    cache_misses: int = 0
+    cache_size: int = 0
+    heuristic_time: float = 0.0
+    search_time: float = 0.0
+
+    def backtrack(self, depth: int) -> None:
+        if depth >= len(self.backtracks):
+            self.backtracks.extend([0] * (depth + 1 - len(self.backtracks)))
+        self.backtracks[depth] += 1
+
+    def cache_hit_rate(self) -> float:
+        lookups = self.cache_hits + self.cache_misses
+        return self.cache_hits / lookups if lookups else 0.0
+
+    def merge(self, other: FillStats) -> None:
+        """Adds the counters of other (e.g. another attempt) to self."""
+        self.backtracks.extend([0] * (len(other.backtracks) - len(self.backtracks)))
+        for depth, count in enumerate(other.backtracks):
+            self.backtracks[depth] += count
+        for name in ('nodes', 'restarts', 'candidates_sampled', 'candidates_pruned', 'nogood_hits',
+                     'cache_hits', 'cache_misses', 'heuristic_time', 'search_time'):
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+        self.cache_size = max(self.cache_size, other.cache_size)
+
+
+@dataclass
+class FillResult:
+    """Outcome of a fill.
+        success: Whether the grid was completely filled.
+        letters: The filled grid's letters if successful, or else the best partial fill found (the one
+            with the most entries filled), in the layout of `Grid.letters`.
+        filled_slots: Number of completely filled entries in `letters`.
+        num_slots: Number of entries in the grid.
+        elapsed: Wall-clock seconds spent.
+        stats: Search counters.
+        stopped: 'time' or 'nodes' if the search was cut short by its budget, else None.
+    """
+
+    success: bool
+    letters: bytes
+    filled_slots: int
+    num_slots: int
+    elapsed: float
+    stats: FillStats
+    stopped: str | None = None
+
+    @property
+    def nodes(self) -> int:
+        return self.stats.nodes
+
+    @property
+    def attempts(self) -> int:
+        return self.stats.restarts
+
+    @property
+    def nodes_per_second(self) -> float:
+        return self.nodes / self.elapsed if self.elapsed else 0.0
+
+    def __bool__(self):
+        return self.success
+
+
+class Progress:
+    """Node counting, budget checks, statistics and best-partial-fill tracking shared by the engines.
+
+    If on_progress is given, it is called with the live stats every progress_every nodes.
+    """
+
+    def __init__(self, grid: Grid, time_limit: float | None = None, max_nodes: int | None = None,
+                 on_progress: Callable[[FillStats], None] | None = None, progress_every=1000):
+        self.grid = grid
+        self.start = time.monotonic()
+        self.deadline = self.start + time_limit if time_limit is not None else None
+        self.max_nodes = max_nodes
+        self.on_progress = on_progress
+        self.progress_every = progress_every
+        self.stats = FillStats()
+        self.stopped: str | None = None
+        self.best = bytes(grid.letters)
+        self.best_depth = -1
+
+    @property
+    def nodes(self) -> int:
+        return self.stats.nodes
+
+    def step(self) -> bool:
+        """Counts a node. Returns False once the budget is exhausted."""
+        self.stats.nodes += 1
+        if self.on_progress and self.stats.nodes % self.progress_every == 0:
+            self.on_progress(self.stats)
+        if self.max_nodes is not None and self.stats.nodes > self.max_nodes:
+            self.stopped = 'nodes'
+        elif self.deadline is not None and time.monotonic() > self.deadline:
+            self.stopped = 'time'
+        return self.stopped is None
+
+    def record(self, depth: int, letters: bytearray) -> None:
+        """Keeps a snapshot of letters if depth (number of entries placed) is the deepest so far."""
+        if depth > self.best_depth:
+            self.best_depth = depth
+            self.best = bytes(letters)
+
+    def result(self, solution: bytes | None) -> FillResult:
+        letters = solution or self.best
+        slots = self.grid.slots
+        filled_slots = sum(all(letters[cell] != BLANK_CODE for cell in cells) for cells in slots.cells)
+        elapsed = time.monotonic() - self.start
+        self.stats.search_time = max(elapsed - self.stats.heuristic_time, 0.0)
+        return FillResult(solution is not None, letters, filled_slots, len(slots.cells), elapsed, self.stats,
+                          self.stopped)
+
+
+# (slot, (cell, letter) pairs sorted by cell)
+Nogood = tuple[int, tuple[tuple[int, str], ...]]
+
+
+class NogoodStore:
+    """Bounded store of nogoods: letters of some cells under which a slot, and the slots after it in the
+    fill order, cannot be filled.
+        maxsize: Maximum number of nogoods kept.
+        patterns: The nogoods, least recently used first.
+        scopes: Dictionary mapping slots to the cell tuples of their nogoods, with the number of nogoods of each.
+
+    Membership tests refresh an entry, and the least recently used entry is evicted when the store is full.
+    """
+
+    def __init__(self, maxsize=100_000):
+        self.maxsize = maxsize
+        self.patterns: OrderedDict[Nogood, None] = OrderedDict()
+        self.scopes: dict[int, dict[tuple[int, ...], int]] = {}
+
+    def add(self, nogood: Nogood) -> None:
+        if nogood in self.patterns:
+            self.patterns.move_to_end(nogood)
+            return
+        self.patterns[nogood] = None
+        slot, assignment = nogood
+        scopes = self.scopes.setdefault(slot, {})
+        scope = tuple(cell for cell, _ in assignment)
+        scopes[scope] = scopes.get(scope, 0) + 1
+        if len(self.patterns) > self.maxsize:
+            slot, assignment = self.patterns.popitem(last=False)[0]
+            scopes = self.scopes[slot]
+            scope = tuple(cell for cell, _ in assignment)
+            scopes[scope] -= 1
+            if not scopes[scope]:
+                del scopes[scope]
+
+    def match(self, slot: int, letters: bytes | bytearray) -> tuple[int, ...] | None:
+        """Returns the cells of a nogood of slot that letters (in the layout of `Grid.letters`) hold, or None."""
+        for scope in self.scopes.get(slot, ()):
+            if (slot, tuple((cell, chr(letters[cell])) for cell in scope)) in self:
+                return scope
+        return None
+
+    def __contains__(self, nogood) -> bool:
+        if nogood in self.patterns:
+            self.patterns.move_to_end(nogood)
+            return True
+        return False
+
+    def __len__(self):
+        return len(self.patterns)
+
+
+# (position in a slot, bitmap of the crossing slot's words, buckets of its length, position in the crossing slot)
+Crossing = tuple[int, int, Mapping[tuple[int, str], int], int]
+
+
+def crossing_counts(words: Sequence[str], length: int, crossings: Sequence[Crossing]) -> np.ndarray:
+    """Counts, for every candidate word of a slot and every crossing, the words that the crossing slot
+    has left once the candidate is placed.
+
+    A crossing's count only depends on the candidate's letter at the crossing, so it is computed once
+    per distinct letter (at most 26 bitmap ANDs) and gathered for all candidates, instead of once per
+    candidate.
+
+    Args:
+        words: Candidate words for the slot.
+        length: Length of the slot.
+        crossings: The crossings to count for.
+
+    Returns:
+        Array of shape (len(words), len(crossings)). The product of a row is the candidate's score; counts
+        are floats so that products over long slots do not overflow.
+    """
+    codes = np.frombuffer(''.join(words).encode('ascii'), dtype=np.uint8).reshape(len(words), length)
+    counts = np.empty((len(words), len(crossings)), dtype=np.float64)
+    table = np.zeros(128, dtype=np.float64)  # count per letter (ASCII code)
+    for column, (i, domain, buckets, offset) in enumerate(crossings):
+        letters = codes[:, i]
+        for code in np.flatnonzero(np.bincount(letters, minlength=len(table))).tolist():
+            table[code] = (domain & buckets.get((offset, chr(code)), 0)).bit_count()
+        counts[:, column] = table[letters]
+    return counts
+
+
+def dfs(grid: Grid, index: WordIndex, num_attempts=10, num_sample_strings=20, num_test_strings=10,
+        verbosity=0, time_limit: float | None = None, max_nodes: int | None = None,
+        on_progress: Callable[[FillStats], None] | None = None, rng: random.Random | None = None,
+        nogoods: NogoodStore | None = None, cache: PatternCache | None = None,
+        region: Iterable[int] | None = None) -> FillResult:
+    """Fills in the grid, roughly* in order of decreasing word length.
+
+    *We actually want words to be entered in order of the number of blank cells; see `mrv`.
+
+    Dead ends are handled with conflict-directed backjumping: each failure reports the cells whose letters
+    explain it, and the search unwinds straight to the deepest placement that wrote one of them instead of
+    retrying siblings that cannot help. When a slot fails after trying every word that fits it (and the
+    failures below it were proven the same way, not cut short by sampling), the letters of its conflict
+    cells are a nogood: with them, the slot and the slots after it cannot be filled. Nogoods are recorded
+    in a bounded store that is kept across restarts, and a slot whose grid holds one of its nogoods fails
+    without being expanded.
+
+    Args:
+        grid: The grid. Its letters are restored before returning.
+        index: The word index.
+        num_attempts: Number of times grid tries filling from scratch.
+        num_sample_strings: Number of strings to sample per entry. A subset of this sample will be taken for testing.
+        num_test_strings: Number of strings grid tests per entry.
+        verbosity: Proportion of the time things will print.
+        time_limit: Seconds after which the search gives up, or None for no limit.
+        max_nodes: Number of nodes after which the search gives up, or None for no limit.
+        on_progress: Called with the live FillStats every 1000 nodes.
+        rng: Random number generator. Defaults to the global random module.
+        nogoods: Nogood store, e.g. to share one across fills of the same layout and region (nogoods are
+            keyed by slot and hold for its fill order). Defaults to a new store.
+        cache: Pattern cache. Defaults to the index's shared cache, so patterns stay cached across fills.
+        region: Slots to fill, e.g. the region of a re-fill. Letters of the other slots are held as they are.
+            Defaults to all slots.
+
+    Returns:
+        The result. Its letters are the fill, or the best partial fill if no fill was found.
+    """
+
+    res: bytes | None = None
+    rng = rng or random
+    progress = Progress(grid, time_limit, max_nodes, on_progress)
+    stats = progress.stats
+    print_every = int(1 / verbosity) if verbosity else 0
+
+    letters = grid.letters
+    slots = grid.slots
+    nogoods = NogoodStore() if nogoods is None else nogoods
+    owner = [-1] * len(letters)  # depth of the placement that wrote each cell; -1 for blank and preset cells
+    # fill order; the search holds a position in it rather than slices
+    order = list(range(len(slots.cells))) if region is None else sorted(set(region))
+    trail: list[int] = []  # cells written so far, undone back to a marker (a length of the trail)
+
+    cache = shared_cache(index) if cache is None else cache
+    constraints_mask = cache.mask
+    hits, misses = cache.hits, cache.misses
+    buckets = index.buckets
+
+    def get_pattern(slot: int) -> tuple[int, tuple[tuple[int, str], ...]]:
+        return len(slots.cells[slot]), slots.constraints(letters, slot)
+
+    def get_mask(slot: int) -> int:
+        """Returns the bitmap of all possible words that fit the constraints of the slot.
+
+        Args:
+            slot: the slot, an index into `slots`
+
+        Returns:
+            The bitmap of ids (in `index.words[length]`) of words that fit the constraints of the slot.
+        """
+        return constraints_mask(*get_pattern(slot))
+
+    def get_filled(slot: int) -> set[int]:
+        """Returns the filled cells of the slot."""
+        return {cell for cell in slots.cells[slot] if letters[cell] != BLANK_CODE}
+
+    def write(cells: list[int], word: str, depth: int) -> None:
+        """Writes word into the blank cells, pushing them onto the trail."""
+        for i, cell in enumerate(cells):
+            if letters[cell] == BLANK_CODE:
+                trail.append(cell)
+                letters[cell] = ord(word[i])
+                owner[cell] = depth
+
+    def unwind(marker: int) -> None:
+        """Blanks the cells written since the trail had length marker."""
+        while len(trail) > marker:
+            cell = trail.pop()
+            letters[cell] = BLANK_CODE
+            owner[cell] = -1
+
+    def helper(position: int, depth: int) -> tuple[set[int], bool] | None:
+        """Fills in one word at a time, proceeding by DFS from order[position].
+
+        Returns:
+            None on success, or else the conflict set (the cells whose letters the failure depends on) and
+            whether the failure was proven exhaustively, i.e. every word that fits was tried at every level.
+        """
+
+        nonlocal res
+        if res:  # if solution already exists
+            return None
+
+        if progress.stopped or not progress.step():
+            return set(), False  # unwinds to the top, as no placement is involved
+        progress.record(depth, letters)
+
+        # verbose information
+        if verbosity and progress.nodes % print_every == 0:
+            print(grid)
+            print()
+
+        if position == len(order):  # if all entries have been previously processed
+            res = bytes(letters)
+            return None
+
+        # process word candidates for next entry
+        slot = order[position]
+        cells = slots.cells[slot]
+        crossings = slots.crossings[slot]
+        pattern = get_pattern(slot)
+        nogood = nogoods.match(slot, letters)
+        if nogood is not None:
+            stats.nogood_hits += 1
+            return set(nogood), True
+        conflicts = get_filled(slot)
+        heuristic_start = time.perf_counter()
+        words = index.sample(len(cells), constraints_mask(*pattern), num_sample_strings, rng, pattern[1])
+        stats.candidates_sampled += len(words)
+        slot_cells = set(cells)
+
+        # score every word at once: the product of the crossing slots' candidate counts once it is placed
+        crossing_slots = [(i, orthogonal) for i, (orthogonal, _) in enumerate(crossings) if orthogonal != -1]
+        counts = crossing_counts(words, len(cells), [
+            (i, get_mask(orthogonal), buckets[len(slots.cells[orthogonal])], crossings[i][1])
+            for i, orthogonal in crossing_slots])
+        scores = counts.prod(axis=1)
+        heuristic_scores = [(score, word) for score, word in zip(scores.tolist(), words) if score]
+        pruned = scores == 0
+        stats.candidates_pruned += int(pruned.sum())
+        # a pruned word is explained by the letters of the first crossing slot it empties
+        for column in np.unique(np.argmax(counts[pruned] == 0, axis=1)).tolist():
+            conflicts |= get_filled(crossing_slots[column][1]) - slot_cells
+        stats.heuristic_time += time.perf_counter() - heuristic_start
+
+        # every word that fits is tested only if the sample and the test subset hold all of them
+        exhaustive = constraints_mask(*pattern).bit_count() <= num_sample_strings \
+            and len(heuristic_scores) <= num_test_strings
+
+        # dfs
+        marker = len(trail)
+        for heuristic_score, word in heapq.nlargest(num_test_strings, heuristic_scores):
+            write(cells, word, depth)
+            failure = helper(position + 1, depth + 1)
+            if failure is not None:
+                child_conflicts, child_exhaustive = failure
+                involved = {cell for cell in child_conflicts if owner[cell] == depth}
+            unwind(marker)
+
+            if failure is None:  # solved
+                return None
+            stats.backtrack(depth)
+            if not involved:  # backjump: no sibling of this word can fix the failure
+                return failure
+            conflicts |= child_conflicts - involved
+            exhaustive = exhaustive and child_exhaustive
+
+        if exhaustive and not progress.stopped:
+            nogoods.add((slot, tuple(sorted((cell, chr(letters[cell])) for cell in conflicts))))
+        return conflicts, exhaustive
+
+    for _ in range(num_attempts):
+        progress.stats.restarts += 1
+        helper(0, 0)
+        if res or progress.stopped:
+            break
+    stats.cache_hits, stats.cache_misses, stats.cache_size = cache.hits - hits, cache.misses - misses, len(cache)
+    return progress.result(res)
+
+
+def mrv(grid: Grid, index: WordIndex, num_attempts=10, num_sample_strings=20, num_test_strings=10,
+        verbosity=0, time_limit: float | None = None, max_nodes: int | None = None,
+        on_progress: Callable[[FillStats], None] | None = None, rng: random.Random | None = None,
+        cache: PatternCache | None = None, region: Iterable[int] | None = None) -> FillResult:
+    """Fills in the grid by DFS with dynamic variable ordering and constraint propagation.
+
+    Every slot keeps a live domain: the bitmap of words that fit its cells and survive propagation.
+    The unfilled slot with the smallest domain is filled next (minimum remaining values). After each
+    placement, the domains of crossing slots are narrowed to words with the placed letters (forward
+    checking), and the narrowing is propagated along crossings until no domain changes (AC-3). A
+    placement is undone as soon as any domain becomes empty.
+
+    Args:
+        grid: The grid. Its letters are restored before returning.
+        index: The word index.
+        num_attempts: Number of times grid tries filling from scratch.
+        num_sample_strings: Number of strings to sample per entry. A subset of this sample will be taken for testing.
+        num_test_strings: Number of strings grid tests per entry.
+        verbosity: Proportion of the time things will print.
+        time_limit: Seconds after which the search gives up, or None for no limit.
+        max_nodes: Number of nodes after which the search gives up, or None for no limit.
+        on_progress: Called with the live FillStats every 1000 nodes.
+        rng: Random number generator. Defaults to the global random module.
+        cache: Pattern cache for the initial domains. Defaults to the index's shared cache.
+        region: Slots to fill, e.g. the region of a re-fill. Letters of the other slots are held as they are.
+            Defaults to all slots.
+
+    Returns:
+        The result. Its letters are the fill, or the best partial fill if no fill was found.
+    """
+
+    res: bytes | None = None
+    rng = rng or random
+    progress = Progress(grid, time_limit, max_nodes, on_progress)
+    stats = progress.stats
+    print_every = int(1 / verbosity) if verbosity else 0
+
+    letters = grid.letters
+    slots = grid.slots
+    cache = shared_cache(index) if cache is None else cache
+    num_slots = len(slots.cells)
+    lengths = [len(cells) for cells in slots.cells]
+    buckets = [index.buckets.get(length, {}) for length in lengths]
+
+    active = range(num_slots) if region is None else set(region)
+    domains: list[int] = []
+    unfilled: set[int] = set()
+    trail: list[tuple[int, int]] = []  # (slot, previous domain), for undoing propagation
+    cell_trail: list[int] = []  # cells written so far, for undoing placements
+
+    def allowed(slot: int, offset: int) -> int:
+        """Returns the bitmap of words of a crossing slot compatible with the letters still possible at
+        (slot, offset)."""
+        crossing, crossing_offset = slots.crossings[slot][offset]
+        domain = domains[slot]
+        crossing_buckets = buckets[crossing]
+        mask = 0
+        for c in ALPHABET:
+            if domain & buckets[slot].get((offset, c), 0):
+                mask |= crossing_buckets.get((crossing_offset, c), 0)
+        return mask
+
+    def narrow(slot: int, domain: int) -> None:
+        trail.append((slot, domains[slot]))
+        domains[slot] = domain
+
+    def propagate(queue: list[int]) -> bool:
+        """Runs AC-3 from the slots in queue. Returns False if some domain becomes empty."""
+        queued = set(queue)
+        while queue:
+            slot = queue.pop()
+            queued.discard(slot)
+            for offset, (crossing, crossing_offset) in enumerate(slots.crossings[slot]):
+                if crossing not in unfilled:
+                    continue
+                domain = domains[crossing] & allowed(slot, offset)
+                if domain != domains[crossing]:
+                    if not domain:
+                        return False
+                    narrow(crossing, domain)
+                    if crossing not in queued:
+                        queue.append(crossing)
+                        queued.add(crossing)
+        return True
+
+    def place(slot: int, word: str) -> bool:
+        """Writes word into slot, pushing the newly written cells onto the cell trail, and propagates.
+
+        Returns:
+            Whether all domains are still nonempty.
+        """
+        for i, cell in enumerate(slots.cells[slot]):
+            if letters[cell] == BLANK_CODE:
+                cell_trail.append(cell)
+                letters[cell] = ord(word[i])
+        unfilled.discard(slot)
+
+        queue = []
+        for i, (crossing, crossing_offset) in enumerate(slots.crossings[slot]):
+            if crossing in unfilled:
+                domain = domains[crossing] & buckets[crossing].get((crossing_offset, word[i]), 0)
+                if not domain:
+                    return False
+                if domain != domains[crossing]:
+                    narrow(crossing, domain)
+                    queue.append(crossing)
+        return propagate(queue)
+
+    def undo(slot: int, marker: int, cell_marker: int) -> None:
+        """Undoes a placement of slot, given the lengths of the trails before it."""
+        while len(cell_trail) > cell_marker:
+            letters[cell_trail.pop()] = BLANK_CODE
+        while len(trail) > marker:
+            prev_slot, domain = trail.pop()
+            domains[prev_slot] = domain
+        unfilled.add(slot)
+
+    def score(slot: int, words: list[str]) -> list[float]:
+        """Least-constraining-value heuristic: product of the crossing domain sizes after placing each word."""
+        counts = crossing_counts(words, lengths[slot], [
+            (i, domains[crossing], buckets[crossing], crossing_offset)
+            for i, (crossing, crossing_offset) in enumerate(slots.crossings[slot]) if crossing in unfilled])
+        return counts.prod(axis=1).tolist()
+
+    def helper() -> None:
+        nonlocal res
+        if res:
+            return
+
+        if progress.stopped or not progress.step():
+            return
+        progress.record(num_slots - len(unfilled), letters)
+
+        if verbosity and progress.nodes % print_every == 0:
+            print(grid)
+            print()
+
+        if not unfilled:
+            res = bytes(letters)
+            return
+
+        depth = num_slots - len(unfilled)
+        heuristic_start = time.perf_counter()
+        slot = min(unfilled, key=lambda s: (domains[s].bit_count(), rng.random()))
+        words = index.sample(lengths[slot], domains[slot], num_sample_strings, rng)
+        heuristic_scores = list(zip(score(slot, words), words))
+        stats.candidates_sampled += len(words)
+        stats.candidates_pruned += sum(1 for heuristic_score, _ in heuristic_scores if heuristic_score == 0)
+        stats.heuristic_time += time.perf_counter() - heuristic_start
+
+        for heuristic_score, word in heapq.nlargest(num_test_strings, heuristic_scores):
+            if heuristic_score == 0:
+                break
+            marker, cell_marker = len(trail), len(cell_trail)
+            if place(slot, word):
+                helper()
+            undo(slot, marker, cell_marker)
+            if res or progress.stopped:
+                return
+            stats.backtrack(depth)
+
+    for _ in range(num_attempts):
+        progress.stats.restarts += 1
+        domains = [cache.mask(lengths[slot], slots.constraints(letters, slot)) for slot in range(num_slots)]
+        unfilled = {slot for slot in active if BLANK_CODE in (letters[cell] for cell in slots.cells[slot])}
+        trail.clear()
+        cell_trail.clear()
+        if not all(domains[slot] for slot in active) or not propagate(list(unfilled)):
+            break
+        helper()
+        if res or progress.stopped:
+            break
+    return progress.result(res)
+
+
+def local_search(grid: Grid, index: WordIndex, num_attempts=10, num_sample_strings=20, num_test_strings=10,
+                 verbosity=0, time_limit: float | None = None, max_nodes: int | None = None,
+                 on_progress: Callable[[FillStats], None] | None = None, rng: random.Random | None = None,
+                 cache: PatternCache | None = None, region: Iterable[int] | None = None, max_iterations=10_000,
+                 tabu_tenure=5, noise=0.05) -> FillResult:
+    """Fills in the grid by min-conflicts local search with a tabu list.
+
+    Every slot always holds a word that fits its preset letters; a conflict is a crossing where the
+    two slots' words disagree. Each iteration takes the conflicted slot with the most conflicts that
+    is not tabu (changed within the last tabu_tenure iterations), and gives it the word agreeing with
+    the most of its current crossing letters, found with bitset counters over the index buckets. With
+    probability noise, a random conflicted slot gets a random word instead, to escape local minima.
+    The search succeeds at zero conflicts. Each iteration counts as one node.
+
+    Args:
+        grid: The grid. Its letters are not modified.
+        index: The word index.
+        num_attempts: Number of restarts from a random assignment.
+        num_sample_strings: Unused; accepted so that engines are interchangeable.
+        num_test_strings: Unused; accepted so that engines are interchangeable.
+        verbosity: Proportion of the time things will print.
+        time_limit: Seconds after which the search gives up, or None for no limit.
+        max_nodes: Number of iterations after which the search gives up, or None for no limit.
+        on_progress: Called with the live FillStats every 1000 iterations.
+        rng: Random number generator. Defaults to the global random module.
+        cache: Pattern cache for the slot domains. Defaults to the index's shared cache.
+        region: Slots to fill, e.g. the region of a re-fill. Letters of the other slots are held as they are.
+            Defaults to all slots.
+        max_iterations: Number of iterations per attempt.
+        tabu_tenure: Number of iterations a changed slot stays tabu.
+        noise: Probability of a random move.
+
+    Returns:
+        The result. Its letters are the fill, or else the letters of the largest set of conflict-free
+        entries found.
+    """
+
+    res: bytes | None = None
+    rng = rng or random
+    progress = Progress(grid, time_limit, max_nodes, on_progress)
+    stats = progress.stats
+    print_every = int(1 / verbosity) if verbosity else 0
+
+    slots = grid.slots
+    crossings = slots.crossings
+    cache = shared_cache(index) if cache is None else cache
+    num_slots = len(slots.cells)
+    lengths = [len(cells) for cells in slots.cells]
+    buckets = [index.buckets.get(length, {}) for length in lengths]
+    active = list(range(num_slots)) if region is None else sorted(set(region))
+    is_active = [region is None] * num_slots
+    for slot in active:
+        is_active[slot] = True
+    domains = [cache.mask(lengths[slot], slots.constraints(grid.letters, slot)) if is_active[slot] else 0
+               for slot in range(num_slots)]
+    if not all(domains[slot] for slot in active):
+        return progress.result(None)
+
+    words: list[str] = []
+    ids: list[int] = []
+    conflicts: list[int] = []
+
+    def snapshot(only_consistent: bool) -> bytearray:
+        """Returns the grid's letters with the words of all slots, or only of the conflict-free ones."""
+        letters = bytearray(grid.letters)
+        for slot in active:
+            if not only_consistent or not conflicts[slot]:
+                for cell, c in zip(slots.cells[slot], words[slot]):
+                    letters[cell] = ord(c)
+        return letters
+
+    def count_conflicts(slot: int) -> int:
+        # crossings outside the region never conflict: their letters are constraints of the domains
+        word = words[slot]
+        return sum(crossing != -1 and is_active[crossing] and words[crossing][offset] != word[i]
+                   for i, (crossing, offset) in enumerate(crossings[slot]))
+
+    def assign(slot: int, word_id: int) -> None:
+        """Puts the word with id word_id into slot, updating the conflict counts of the slot and its crossings."""
+        word = index.words[lengths[slot]][word_id]
+        old = words[slot]
+        for i, (crossing, offset) in enumerate(crossings[slot]):
+            if crossing != -1 and is_active[crossing]:
+                delta = (words[crossing][offset] != word[i]) - (words[crossing][offset] != old[i])
+                conflicts[slot] += delta
+                conflicts[crossing] += delta
+        words[slot] = word
+        ids[slot] = word_id
+
+    def best_word(slot: int) -> int | None:
+        """Returns the id of a word other than the current one agreeing with the most crossing letters, or None."""
+        candidates = domains[slot] & ~(1 << ids[slot])
+        if not candidates:
+            return None
+        # bit-sliced counters: bit w of planes[j] is bit j of the number of crossing letters word w agrees with
+        planes: list[int] = []
+        for i, (crossing, offset) in enumerate(crossings[slot]):
+            if crossing == -1 or not is_active[crossing]:
+                continue
+            carry = buckets[slot].get((i, words[crossing][offset]), 0) & candidates
+            for j, plane in enumerate(planes):
+                if not carry:
+                    break
+                planes[j], carry = plane ^ carry, plane & carry
+            if carry:
+                planes.append(carry)
+        for plane in reversed(planes):  # keep the words with the largest count, bit by bit
+            if candidates & plane:
+                candidates &= plane
+        return index.sample_ids(lengths[slot], candidates, 1, rng)[0]
+
+    for _ in range(num_attempts):
+        stats.restarts += 1
+        words = [slots.word(grid.letters, slot) for slot in range(num_slots)]
+        ids = [-1] * num_slots
+        for slot in active:
+            ids[slot] = index.sample_ids(lengths[slot], domains[slot], 1, rng)[0]
+            words[slot] = index.words[lengths[slot]][ids[slot]]
+        conflicts = [count_conflicts(slot) for slot in range(num_slots)]
+        tabu = [0] * num_slots  # iteration until which each slot is tabu
+
+        for iteration in range(max_iterations):
+            if not progress.step():
+                break
+            conflicted = [slot for slot in active if conflicts[slot]]
+            if len(active) - len(conflicted) > progress.best_depth:
+                progress.record(len(active) - len(conflicted), snapshot(only_consistent=True))
+
+            if verbosity and progress.nodes % print_every == 0:
+                print(f'iteration {iteration}: {len(conflicted)} conflicted entries')
+
+            if not conflicted:
+                res = bytes(snapshot(only_consistent=False))
+                break
+
+            heuristic_start = time.perf_counter()
+            if rng.random() < noise:
+                slot = rng.choice(conflicted)
+                word_id = index.sample_ids(lengths[slot], domains[slot], 1, rng)[0]
+            else:
+                allowed = [slot for slot in conflicted if tabu[slot] <= iteration] or conflicted
+                most = max(conflicts[slot] for slot in allowed)
+                slot = rng.choice([slot for slot in allowed if conflicts[slot] == most])
+                word_id = best_word(slot)
+            stats.candidates_sampled += 1
+            stats.heuristic_time += time.perf_counter() - heuristic_start
+
+            if word_id is not None:
+                assign(slot, word_id)
+            tabu[slot] = iteration + tabu_tenure
+
+        if res or progress.stopped:
+            break
+    return progress.result(res)
+
+
+ENGINES = {
+    'dfs': dfs,
+    'mrv': mrv,
+    'local': local_search,
+}
@@ -3,9 +3,16 @@ from dataclasses import dataclass, field
 from enum import Enum, auto
 import random
 from functools import cache, lru_cache
-from typing import ClassVar
+from types import ModuleType
+from typing import TYPE_CHECKING, ClassVar
 
-from crossword_generator.clue_processor import ClueProcessor
+from crossword_generator.word_index import WordIndex, as_index
+
+if TYPE_CHECKING:
+    from crossword_generator.catalog import LayoutCatalog
+    from crossword_generator.clue_processor import ClueProcessor
+    from crossword_generator.fill import FillResult
+    from crossword_generator.prescreen import Prescreen
 
 
 @dataclass()
@@ -37,10 +44,15 @@ class Direction(Enum):
 
 
 class Grid:
-    """1-indexed N x N grid of Cells"""
+    """1-indexed N x N grid of Cells.
+
+    Letters are stored in `letters`, a flat bytearray over the (n + 2) x (n + 2) grid including the
+    border of walls; cell (r, c) has flat index r * (n + 2) + c. Cells are views into it.
+    """
 
-    def __init__(self, n, set_layout=True):
+    def __init__(self, n, set_layout=True, rng: random.Random | int | None = None):
         self.n = n
+        self.letters = bytearray(Cell.BLANK.encode() * (n + 2) ** 2)
         self.grid = tuple(tuple(Cell(self, r, c) for c in range(n + 2)) for r in range(n + 2))
         for i in range(self.n + 2):
             self.grid[i][0].make_wall()
@@ -52,19 +64,66 @@ class Grid:
         self.down = {}
         self.ids = {}
         self.entries = []
+        self.slots: SlotTable | None = None
         if set_layout:
-            self.generate_layout()
+            self.generate_layout(rng)
             self.number_cells()
 
+    @classmethod
+    def from_letters(cls, n: int, letters: bytes | bytearray) -> Grid:
+        """Returns a numbered grid with the given `letters` (walls included)."""
+        g = cls(n, set_layout=False)
+        g.letters[:] = letters
+        g.number_cells()
+        return g
+
+    @classmethod
+    def from_catalog(cls, n: int, rng: random.Random | int | None = None,
+                     catalog: LayoutCatalog | None = None) -> Grid:
+        """Returns a numbered blank grid with a layout sampled from a layout catalog, favoring layouts that
+        have filled quickly before, in a random orientation.
+
+        Args:
+            n: The size.
+            rng: Random number generator or seed. Defaults to the global random module.
+            catalog: The catalog. Defaults to `catalog.default_catalog()`, which is stocked with generated
+                layouts the first time a size is requested.
+
+        Returns:
+            The grid. Pass it with its fill result to `LayoutCatalog.record` to update the layout's stats.
+        """
+        # catalog depends on this module
+        from crossword_generator.catalog import DEFAULT_COUNT, SYMMETRIES, default_catalog
+
+        rng = as_rng(rng)
+        if catalog is None:
+            catalog = default_catalog()
+            if not catalog.layouts.get(n):
+                catalog.generate(n, DEFAULT_COUNT, rng)
+        return catalog.sample(n, rng).grid(rng.randrange(len(SYMMETRIES)))
+
     def cell(self, r: int, c: int) -> Cell | None:
         if r < 0 or r >= len(self.grid) or c < 0 or c >= len(self.grid[0]):
             return None
         return self.grid[r][c]
 
-    def generate_layout(self) -> None:
+    def generate_layout(self, rng: random.Random | int | None = None) -> None:
         """Generates a 2D array of Cells, subject to requirements on the number of 
         walls and words and lengths of words it contains. Implemented via repeatedly 
-        adding walls that satisfy these requirements."""
+        adding walls that satisfy these requirements.
+
+        Candidate walls are drawn uniformly from the cells not yet rejected since the last wall was added,
+        and every check on a candidate and its symmetric partner takes constant time. The lengths of the
+        across and down runs of white cells on each side of every cell are kept up to date, so the minimum
+        word length is checked by table lookups. Walls are kept in a union-find of 8-connected groups, the
+        border being one group: a wall disconnects the white cells exactly when two of the runs of walls
+        around it (which separate its white neighbors locally) are already in the same group, closing a
+        loop through it. Generation stops early if no cell can take a wall.
+
+        Args:
+            rng: Random number generator or seed. Defaults to the global random module.
+        """
+        rng = as_rng(rng)
 
         # TODO: make cleaner bounds
         MAX_WALL = int(0.17 * self.n ** 2 + 0.066 * self.n - 1.1)
@@ -72,49 +131,111 @@ class Grid:
         MIN_WORD_LENGTH = 3
         SYMMETRIC_SIZES = (11, 12, 13, 14, 15)
 
-        curr_wall = 0
-        curr_words = 2 * self.n
-        available_cells = [(i, j) for i in range(1, self.n + 1) for j in
-                           range(1, self.n + 1)]  # TODO: optimize to use set instead of list
-
-        def num_added_words(r: int, c: int) -> int:
-            """Returns the number of additional words that would be obtained by adding a wall at (r, c).
-
-            Args:
-                r: The row.
-                c: The column.
+        n, width = self.n, self.n + 2
+        letters = self.letters
+        tables = layout_tables(n, n in SYMMETRIC_SIZES, MIN_WORD_LENGTH)
+        partner, aligned, pair_bit, short = tables.partner, tables.aligned, tables.pair_bit, tables.short
+        separators, ring_walls, ring_updates = tables.separators, tables.ring_walls, tables.ring_updates
+        orthogonal_walls, ascending, descending = tables.orthogonal_walls, tables.ascending, tables.descending
+        ring = tables.ring[:]
+        parent = tables.parent[:]
+        before_across, after_across, before_down, after_down = (runs[:] for runs in tables.runs)
+        available = tables.available[:]
+        position = dict(tables.position)
+        rejected = []
+        random_unit = rng.random
 
-            Returns:
-                The number of additional words that would be obtained by adding a wall at (r, c).
-            """
-            return 2 - sum(
-                self.grid[r + direction.value.row][c + direction.value.col].is_wall() for direction in Cardinal)
-
-        def add_wall(r: int, c: int) -> None:
+        curr_wall = 0
+        curr_words = 2 * n
+
+        def find(cell: int) -> int:
+            while parent[cell] != cell:
+                parent[cell] = cell = parent[parent[cell]]  # path halving
+            return cell
+
+        def fits_pair(cell: int, other: int) -> bool:
+            """Returns whether walls at two cells in one row or column leave runs of 0 or at least
+            MIN_WORD_LENGTH cells."""
+            low, high = min(cell, other), max(cell, other)
+            for step, before, after in ((1, before_across, after_across), (width, before_down, after_down)):
+                if (high - low) % step == 0 and (high - low) // step <= after[low]:  # one run, split in three
+                    if short[before[low]] or short[(high - low) // step - 1] or short[after[high]]:
+                        return False
+                elif short[before[low]] or short[after[low]] or short[before[high]] or short[after[high]]:
+                    return False
+            return True
+
+        def add_wall(cell: int) -> None:
             nonlocal curr_wall, curr_words
-            self.cell(r, c).make_wall()
+            letters[cell] = WALL_CODE
             curr_wall += 1
-            curr_words += num_added_words(r, c)
-            available_cells.remove((r, c))
-
-        illegal_cells = []
-        if self.n in SYMMETRIC_SIZES and self.n % 2 == 1:
-            for i in range(int(-(MIN_WORD_LENGTH + 1) / 2), int((MIN_WORD_LENGTH + 1) / 2)):
-                illegal_cells.append((i + (self.n + 1) / 2, (self.n + 1) / 2))
-                illegal_cells.append(((self.n + 1) / 2, i + (self.n + 1) / 2))
-
-        while curr_wall < MAX_WALL and curr_words < MAX_WORDS:
-            r, c = available_cells[random.randint(0, len(available_cells) - 1)]
-            if all(self.cell(r, c).get_neighbor(dir).is_wall()
-                   or len(self.cell(r, c).in_direction(dir)) > MIN_WORD_LENGTH for dir in Cardinal):
-                if (r, c) not in illegal_cells:
-                    add_wall(r, c)
-                    if self.n in SYMMETRIC_SIZES:
-                        add_wall(self.n + 1 - r, self.n + 1 - c)
+            mask = ring[cell]
+            curr_words += 2 - orthogonal_walls[mask]
+            for offset in ring_walls[mask]:  # cell is a root until it joins a group
+                other = find(cell + offset)
+                if other != cell:
+                    parent[other] = cell
+            for offset, bit in ring_updates:
+                ring[cell + offset] |= bit
+            # the runs through the cell end at it
+            before, after = before_across[cell], after_across[cell]
+            after_across[cell - before:cell] = descending[before]
+            before_across[cell + 1:cell + after + 1] = ascending[after]
+            before, after = before_down[cell], after_down[cell]
+            after_down[cell - before * width:cell:width] = descending[before]
+            before_down[cell + width:cell + (after + 1) * width:width] = ascending[after]
+            # remove cell from available in O(1) by swapping it with the last cell
+            i = position.pop(cell)
+            moved = available.pop()
+            if moved != cell:
+                available[i] = moved
+                position[moved] = i
+
+        while curr_wall < MAX_WALL and curr_words < MAX_WORDS and available:
+            cell = available[int(random_unit() * len(available))]
+            other = partner[cell]  # the cell itself if the layout is not symmetric
+
+            # the partner of an available cell is unavailable if it is illegal or the pair was already rejected
+            if aligned[cell]:
+                legal = other in position and fits_pair(cell, other)
+            else:
+                legal = not (short[before_across[cell]] or short[after_across[cell]] or short[before_down[cell]]
+                             or short[after_down[cell]])
+                if legal and other != cell:
+                    legal = other in position and not (
+                        short[before_across[other]] or short[after_across[other]] or short[before_down[other]]
+                        or short[after_down[other]])
+            if legal:
+                walls = separators[ring[cell]]
+                legal = not walls or len({find(cell + offset) for offset in walls}) == len(walls)
+            if legal and other != cell:
+                walls = separators[ring[other] | pair_bit[other]]  # as if cell were a wall already
+                if walls:
+                    merged = {find(cell + offset) for offset in ring_walls[ring[cell]]}
+                    merged.add(cell)
+                    roots = {-1 if root in merged else root for root in (find(other + offset) for offset in walls)}
+                    legal = len(roots) == len(walls)
+
+            if not legal:
+                i = position.pop(cell)
+                moved = available.pop()
+                if moved != cell:
+                    available[i] = moved
+                    position[moved] = i
+                rejected.append(cell)
+                continue
+
+            add_wall(cell)
+            if other != cell:
+                add_wall(other)
+            for cell in rejected:  # walls can make rejected cells legal again
+                position[cell] = len(available)
+                available.append(cell)
+            rejected.clear()
 
     def number_cells(self) -> None:
         """Assigns clue numbers to cells. Specifically, assigns `across`,
-        `down`, `ids`, and `entries`."""
+        `down`, `ids`, `entries` and `slots`."""
         identifier = 1
         for r in range(1, self.n + 1):
             for c in range(1, self.n + 1):
@@ -134,138 +255,83 @@ class Grid:
                 if is_entry:
                     identifier += 1
         self.entries.sort(key=lambda e: -e.length)
+        self.slots = SlotTable.from_entries(self)
 
     def is_filled(self) -> bool:
-        return all(not (self.cell(r, c).is_blank()) for c in range(1, self.n + 1) for r in range(1, self.n + 1))
+        return BLANK_CODE not in self.letters
 
-    def fill(self, clue_processor: ClueProcessor, num_attempts=10, num_sample_strings=20, num_test_strings=10,
-             verbosity=0) -> None:
-        """Fills in the grid, roughly* in order of decreasing word length. TODO: make this faster!
+    def prescreen(self, clue_processor: ClueProcessor | WordIndex) -> Prescreen:
+        """Computes cheap fillability signals, to reject hopeless layouts before `fill`. See
+        `prescreen.prescreen`."""
+        from crossword_generator.prescreen import prescreen  # prescreen depends on this module
 
-        *We actually want words to be entered in order of the number of blank cells. However,
-        this is pretty annoying (and probably slow) to implement.
+        return prescreen(self, as_index(clue_processor))
+
+    def fill(self, clue_processor: ClueProcessor | WordIndex, num_attempts=10, num_sample_strings=20, num_test_strings=10,
+             verbosity=0, engine='dfs', time_limit=None, max_nodes=None, rng: random.Random | int | None = None,
+             **options) -> FillResult:
+        """Fills in the grid with one of the engines in `crossword_generator.fill`.
+
+        The grid is only modified if it is filled completely; otherwise the returned result holds the
+        best partial fill, e.g. `Grid.from_letters(n, result.letters)`.
 
         Args:
-            clue_processor: The clue processor.
+            clue_processor: The clue processor, or a word index (e.g. from `word_index.load_index`).
             num_attempts: Number of times grid tries filling from scratch.
             num_sample_strings: Number of strings to sample per entry. A subset of this sample will be taken for testing.
             num_test_strings: Number of strings grid tests per entry.
             verbosity: Proportion of the time things will print.
+            engine: 'dfs' to fill entries in order of decreasing length, 'mrv' to always fill the entry
+                with the fewest candidates next while pruning the candidates of crossing entries, or 'local'
+                to repair a complete assignment of words by min-conflicts local search (for large grids).
+            time_limit: Seconds after which filling gives up, or None for no limit.
+            max_nodes: Number of search nodes after which filling gives up, or None for no limit.
+            rng: Random number generator or seed. Defaults to the global random module.
+            **options: Engine options, e.g. `on_progress` to receive the live `FillStats` every 1000 nodes,
+                `nogoods` for 'dfs', or `region` to fill only some slots (see `refill`).
 
         Returns:
-            None
+            The result: success, best (partial) fill, elapsed time and search statistics (`result.stats`).
         """
+        from crossword_generator.fill import ENGINES  # fill depends on this module
+
+        res = ENGINES[engine](self, as_index(clue_processor), num_attempts=num_attempts,
+                              num_sample_strings=num_sample_strings, num_test_strings=num_test_strings,
+                              verbosity=verbosity, time_limit=time_limit, max_nodes=max_nodes, rng=as_rng(rng),
+                              **options)
+        if res.success:
+            self.letters[:] = res.letters
+        return res
+
+    def fill_parallel(self, clue_processor: ClueProcessor | WordIndex, num_attempts=32, workers=None, timeout=None,
+                      seed=None, engine='dfs', **options) -> FillResult:
+        """Fills in the grid by running independent randomized attempts in a process pool; the first
+        complete fill wins and the remaining attempts are cancelled. See `parallel.parallel_fill`."""
+        from crossword_generator.parallel import parallel_fill  # parallel depends on this module
+
+        res = parallel_fill(self, as_index(clue_processor), num_attempts=num_attempts, workers=workers,
+                            timeout=timeout, seed=seed, engine=engine, **options)
+        if res.success:
+            self.letters[:] = res.letters
+        return res
+
+    def refill(self, clue_processor: ClueProcessor | WordIndex, presets: dict[int, str] | None = None,
+               pinned=(), **options) -> FillResult:
+        """Writes preset words (e.g. theme entries) into slots and re-fills only the entries they affect,
+        keeping pinned slots as they are. See `refill.refill`."""
+        from crossword_generator.refill import refill  # refill depends on this module
+
+        return refill(self, clue_processor, presets, pinned, **options)
 
-        res: Grid | None = None
-        counter = 0
-        print_every = int(1 / verbosity) if verbosity else 0
-
-        def intersection(sets: tuple[set, ...]):
-            if len(sets) == 1:
-                return sets[0]
-            return sets[0].intersection(*sets[1:])
-
-        # TODO: make faster
-        @lru_cache(maxsize=None)
-        def constraints_intersection(length: int, constraints: tuple[tuple[int, str]]):
-            return tuple(
-                intersection(tuple(clue_processor.words[length][constraint] for constraint in constraints))
-                if len(constraints) > 0 else clue_processor.words[length]['all']
-            )
-
-        def get_candidates(entry: Entry) -> tuple[str, ...]:
-            """Returns a tuple of all possible words that fit the constraints of the entry.
-
-            Args:
-                entry: the entry
-
-            Returns:
-                A tuple of all possible words that fit the constraints of the entry.
-            """
-            constraints = tuple((i, entry.cells[i].label) for i in range(entry.length) if not entry.cells[i].is_blank())
-            return constraints_intersection(entry.length, constraints)
-
-        def helper(grid: Grid, entries: tuple[Entry, ...] | list[Entry, ...]) -> None:
-            """Fills in one word at a time, proceeding by DFS. TODO: set to list cast is slow!"""
-
-            # TODO: memoize get_across(), get_down() after layout is set
-
-            nonlocal res
-            if res:  # if solution already exists
-                return
-
-            # verbose information
-            nonlocal counter
-            counter += 1
-            if verbosity and counter % print_every == 0:
-                print(grid)
-                print()
-
-            if not entries:  # if all entries have been previously processed
-                res = grid.copy()
-                return
-
-            # process word candidates for next entry
-            entry = entries[0]
-            candidates = get_candidates(entry)
-            words = random.sample(candidates, min(num_sample_strings, len(candidates)))
-
-            # calculate heuristics for each word
-            heuristic_scores: list[tuple[int, str]] = []
-
-            # compute heuristics
-            for word in words:
-                previously_blank_cells = []
-                heuristic_score = 1
-
-                for i in range(entry.length):
-                    # fill cell
-                    if entry.cells[i].label == Cell.BLANK:
-                        previously_blank_cells.append(entry.cells[i])
-                        entry.cells[i].label = word[i]
-
-                    # calculate heuristic score
-                    orthogonal = Entry(grid, entry.cells[i].get_entry_list(entry.direction.opposite()))
-                    heuristic_score *= len(get_candidates(orthogonal))
-                    if heuristic_score == 0:  # optimization
-                        break
-
-                if heuristic_score != 0:
-                    heuristic_scores.append((heuristic_score, word))
-
-                # backtrack
-                for cell in previously_blank_cells:
-                    cell.label = Cell.BLANK
-
-            # dfs
-            for heuristic_score, word in sorted(heuristic_scores, reverse=True)[:num_test_strings]:
-                previously_blank_cells = []
-
-                # fill word
-                for i in range(entry.length):
-                    if entry.cells[i].label == Cell.BLANK:
-                        previously_blank_cells.append(entry.cells[i])
-                        entry.cells[i].label = word[i]
-
-                helper(grid, entries[1:])
-
-                # backtrack
-                for cell in previously_blank_cells:
-                    cell.label = Cell.BLANK
-
-        for _ in range(num_attempts):
-            helper(self, self.entries)
-            if res and res.is_filled():
-                self.__dict__.update(res.__dict__)
-                return
+    def find_slot(self, id: int, direction: Direction) -> int:
+        """Returns the slot of the entry with a clue number and direction."""
+        for slot, entry in enumerate(self.entries):
+            if entry.id == id and entry.direction is direction:
+                return slot
+        raise KeyError(f'no {direction.name.lower()} entry {id}')
 
     def copy(self) -> Grid:
-        g = Grid(self.n, set_layout=False)
-        for r in range(1, self.n + 1):
-            for c in range(1, self.n + 1):
-                g.cell(r, c).label = self.cell(r, c).label
-        g.number_cells()
-        return g
+        return Grid.from_letters(self.n, self.letters)
 
     def __str__(self):
         return '\n'.join(' '.join(self.cell(i, j).label for j in range(1, self.n + 1)) for i in range(1, self.n + 1))
@@ -282,11 +348,20 @@ class Cell:
     grid: Grid
     row: int
     col: int
-    label: str = BLANK
+    index: int = field(init=False)
 
     def __post_init__(self):
+        self.index = self.row * (self.grid.n + 2) + self.col
         self.get_entry_list = lru_cache(maxsize=4)(self.get_entry_list)  # allow memoization without memory leaks
 
+    @property
+    def label(self) -> str:
+        return chr(self.grid.letters[self.index])
+
+    @label.setter
+    def label(self, label: str) -> None:
+        self.grid.letters[self.index] = ord(label)
+
     def get_neighbor(self, cardinal_direction: Cardinal) -> Cell:
         return self.grid.cell(self.row + cardinal_direction.value.row, self.col + cardinal_direction.value.col)
 
@@ -332,6 +407,20 @@ class Cell:
         return f'Cell({self.row}, {self.col})'
 
 
+BLANK_CODE = ord(Cell.BLANK)
+WALL_CODE = ord(Cell.WALL)
+
+
+def as_rng(rng: random.Random | int | None) -> random.Random | ModuleType:
+    """Returns rng if it is a random number generator, a generator seeded with rng if it is a seed, or
+    else the global random module."""
+    if rng is None:
+        return random
+    if isinstance(rng, int):
+        return random.Random(rng)
+    return rng
+
+
 @dataclass()
 class Entry:
     grid: Grid
@@ -353,3 +442,157 @@ class Entry:
 
     def __repr__(self):
         return f"{self.id}-{self.direction.value}"
+
+
+@dataclass(frozen=True)
+class SlotTable:
+    """Flat-index view of the entries of a numbered grid, computed once by `Grid.number_cells`.
+
+    Slot i is `grid.entries[i]`. Cells are flat indices into `grid.letters`.
+        cells: Cells of each slot, in order.
+        across: Across slot of each cell, or -1 (e.g. for walls).
+        down: Down slot of each cell, or -1.
+        across_offset: Offset of each cell within its across slot, or -1.
+        down_offset: Offset of each cell within its down slot, or -1.
+        crossings: For each slot and offset, the (slot, offset) of the crossing entry, or (-1, -1).
+    """
+
+    cells: tuple[tuple[int, ...], ...]
+    across: tuple[int, ...]
+    down: tuple[int, ...]
+    across_offset: tuple[int, ...]
+    down_offset: tuple[int, ...]
+    crossings: tuple[tuple[tuple[int, int], ...], ...]
+
+    @classmethod
+    def from_entries(cls, grid: Grid) -> SlotTable:
+        size = len(grid.letters)
+        cells = tuple(tuple(cell.index for cell in entry.cells) for entry in grid.entries)
+        slot_of = {Direction.ACROSS: [-1] * size, Direction.DOWN: [-1] * size}
+        offset_of = {Direction.ACROSS: [-1] * size, Direction.DOWN: [-1] * size}
+        for slot, entry in enumerate(grid.entries):
+            for offset, cell in enumerate(cells[slot]):
+                slot_of[entry.direction][cell] = slot
+                offset_of[entry.direction][cell] = offset
+
+        crossings = tuple(
+            tuple((slot_of[entry.direction.opposite()][cell], offset_of[entry.direction.opposite()][cell])
+                  for cell in cells[slot])
+            for slot, entry in enumerate(grid.entries)
+        )
+        return cls(cells, tuple(slot_of[Direction.ACROSS]), tuple(slot_of[Direction.DOWN]),
+                   tuple(offset_of[Direction.ACROSS]), tuple(offset_of[Direction.DOWN]), crossings)
+
+    def constraints(self, letters: bytearray | bytes, slot: int) -> tuple[tuple[int, str], ...]:
+        """Returns the (pos, char) pairs of the filled cells of a slot."""
+        return tuple((i, chr(letters[cell])) for i, cell in enumerate(self.cells[slot]) if letters[cell] != BLANK_CODE)
+
+    def word(self, letters: bytearray | bytes, slot: int) -> str:
+        cells = self.cells[slot]
+        return letters[cells[0]:cells[-1] + 1:cells[1] - cells[0]].decode()  # a slot's cells are evenly spaced
+
+
+# the 8 cells around a cell, clockwise from north, as (row, column) offsets; orthogonal cells are at even positions
+RING = ((-1, 0), (-1, 1), (0, 1), (1, 1), (1, 0), (1, -1), (0, -1), (-1, -1))
+
+
+def ring_separators(mask: int) -> tuple[int, ...]:
+    """Returns the positions in RING of one wall of each run of walls that separates the white orthogonal
+    neighbors of a cell locally, given the walls around it as a bitmask over RING. Returns none if those
+    neighbors are connected through the ring."""
+    white = [not mask >> i & 1 for i in range(8)]
+    orthogonal = [i for i in range(0, 8, 2) if white[i]]
+    separators = []
+    for k, i in enumerate(orthogonal):
+        j = orthogonal[(k + 1) % len(orthogonal)]
+        if j != (i + 2) % 8 or not white[i + 1]:  # not linked to the next one through the diagonal between them
+            separators.append(next(p % 8 for p in range(i + 1, i + 8) if not white[p % 8]))
+    return tuple(separators) if len(separators) > 1 else ()
+
+
+@dataclass(frozen=True)
+class LayoutTables:
+    """Precomputed tables for `Grid.generate_layout` on grids of one size; cells are flat indices into
+    `Grid.letters`, and the lists that change during generation are copied by each call.
+        available: Cells that can take a wall, in order.
+        position: Position of each cell in available.
+        partner: Cell that gets a wall along with each cell (itself if the layout is not symmetric).
+        aligned: Whether each cell is in the row or column of its partner (and is not its own partner).
+        pair_bit: Bit of each cell's partner in its RING bitmask, or 0 if they are not neighbors.
+        short: Whether a run of each number of white cells is too short for an entry (0 is not).
+        ring: Bitmask over RING of the walls around each cell, on a blank grid.
+        parent: Union-find parent of each cell, on a blank grid: border cells are one set.
+        runs: Number of white cells before and after each cell across, then before and after it down.
+        ascending: Tuple (0, ..., k - 1) for each k, to assign runs by slice.
+        descending: Tuple (k - 1, ..., 0) for each k.
+        separators: Flat offsets of the walls returned by `ring_separators` for each bitmask.
+        ring_walls: Flat offsets of the walls of each bitmask.
+        orthogonal_walls: Number of orthogonal walls in each bitmask.
+        ring_updates: (flat offset, bit) of each cell around a cell, bit being that of the cell in its bitmask.
+    """
+
+    available: list[int]
+    position: dict[int, int]
+    partner: list[int]
+    aligned: list[bool]
+    pair_bit: list[int]
+    short: list[bool]
+    ring: list[int]
+    parent: list[int]
+    runs: tuple[list[int], list[int], list[int], list[int]]
+    ascending: tuple[tuple[int, ...], ...]
+    descending: tuple[tuple[int, ...], ...]
+    separators: tuple[tuple[int, ...], ...]
+    ring_walls: tuple[tuple[int, ...], ...]
+    orthogonal_walls: tuple[int, ...]
+    ring_updates: tuple[tuple[int, int], ...]
+
+
+@cache
+def layout_tables(n: int, symmetric: bool, min_word_length: int) -> LayoutTables:
+    width = n + 2
+    size = width ** 2
+    offsets = [dr * width + dc for dr, dc in RING]
+    interior = [r * width + c for r in range(1, n + 1) for c in range(1, n + 1)]
+    border = set(range(size)) - set(interior)
+
+    illegal = set()
+    if symmetric and n % 2 == 1:
+        center = (n + 1) // 2
+        for i in range(-((min_word_length + 1) // 2), (min_word_length + 1) // 2):
+            illegal.add((center + i) * width + center)
+            illegal.add(center * width + center + i)
+    available = [cell for cell in interior if cell not in illegal]
+
+    partner = list(range(size))
+    pair_bit = [0] * size
+    ring = [0] * size
+    for cell in interior:
+        if symmetric:
+            partner[cell] = (n + 1) * (width + 1) - cell
+        for i, offset in enumerate(offsets):
+            if cell + offset == partner[cell]:
+                pair_bit[cell] = 1 << i
+            if cell + offset in border:
+                ring[cell] |= 1 << i
+    runs = ([cell % width - 1 for cell in range(size)], [n - cell % width for cell in range(size)],
+            [cell // width - 1 for cell in range(size)], [n - cell // width for cell in range(size)])
+
+    return LayoutTables(
+        available=available,
+        position={cell: i for i, cell in enumerate(available)},
+        partner=partner,
+        aligned=[other != cell and (other // width == cell // width or other % width == cell % width)
+                 for cell, other in enumerate(partner)],
+        pair_bit=pair_bit,
+        short=[0 < length < min_word_length for length in range(n + 1)],
+        ring=ring,
+        parent=[0 if cell in border else cell for cell in range(size)],
+        runs=runs,
+        ascending=tuple(tuple(range(k)) for k in range(n + 1)),
+        descending=tuple(tuple(range(k - 1, -1, -1)) for k in range(n + 1)),
+        separators=tuple(tuple(offsets[i] for i in ring_separators(mask)) for mask in range(256)),
+        ring_walls=tuple(tuple(offset for i, offset in enumerate(offsets) if mask >> i & 1) for mask in range(256)),
+        orthogonal_walls=tuple((mask & 0b01010101).bit_count() for mask in range(256)),
+        ring_updates=tuple((offset, 1 << (i + 4) % 8) for i, offset in enumerate(offsets)),
+    )
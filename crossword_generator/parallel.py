@@ -0,0 +1,84 @@
+from __future__ import annotations
+import multiprocessing
+import random
+import time
+from typing import TYPE_CHECKING
+
+from crossword_generator.fill import ENGINES, FillResult, FillStats, Progress
+from crossword_generator.grid import Grid
+from crossword_generator.pattern_cache import shared_cache
+from crossword_generator.word_index import WordIndex
+
+if TYPE_CHECKING:
+    from multiprocessing.context import BaseContext
+
+# set once per worker process by _init_worker, so the index is not re-sent with every task
+_index: WordIndex | None = None
+
+
+def _init_worker(index: WordIndex, warm_cache: str | None = None) -> None:
+    global _index
+    _index = index
+    if warm_cache:
+        shared_cache(index).load(warm_cache)
+
+
+def _attempt(task: tuple[int, bytes, int, str, float | None, dict]) -> FillResult:
+    """Runs one randomized fill attempt in a worker process."""
+    n, letters, seed, engine, timeout, options = task
+    return ENGINES[engine](Grid.from_letters(n, letters), _index, num_attempts=1, time_limit=timeout,
+                           rng=random.Random(seed), **options)
+
+
+def parallel_fill(grid: Grid, index: WordIndex, num_attempts=32, workers=None, timeout=None, seed=None,
+                  engine='dfs', context: BaseContext | None = None, warm_cache: str | None = None,
+                  **options) -> FillResult:
+    """Fills in the grid by running independent randomized attempts in a process pool.
+
+    The index is sent to each worker once, when the worker starts (a memory-mapped index, e.g. one
+    published with `WordIndex.share`, is re-mapped from its file rather than copied). Each attempt runs
+    one restart of the engine with its own seed, and the pool is terminated as soon as one attempt
+    returns a complete fill.
+
+    Args:
+        grid: The grid. Its letters are not modified.
+        index: The word index.
+        num_attempts: Total number of attempts.
+        workers: Number of worker processes. Defaults to the number of CPUs.
+        timeout: Seconds after which a single attempt gives up, or None for no limit.
+        seed: Base seed; attempt i is seeded with seed + i. Defaults to a random seed.
+        engine: Name of the engine in `fill.ENGINES`.
+        context: multiprocessing context. Defaults to the default context.
+        warm_cache: Path of patterns saved with `PatternCache.save`, loaded into each worker's cache at start.
+        **options: Options for the engine, e.g. num_sample_strings.
+
+    Returns:
+        The result of the first successful attempt, or else the best partial fill over all attempts (the
+        grid as it is, unsuccessful, if no attempt finished). Elapsed time and stats cover every finished
+        attempt.
+
+    Raises:
+        ValueError: If num_attempts is less than 1.
+    """
+    if num_attempts < 1:
+        raise ValueError(f'num_attempts must be at least 1, not {num_attempts}')
+    start = time.monotonic()
+    seed = random.randrange(1 << 32) if seed is None else seed
+    tasks = ((grid.n, bytes(grid.letters), seed + i, engine, timeout, options) for i in range(num_attempts))
+
+    best: FillResult | None = None
+    stats = FillStats()
+    context = context or multiprocessing.get_context()
+    with context.Pool(workers, initializer=_init_worker, initargs=(index, warm_cache)) as pool:
+        for res in pool.imap_unordered(_attempt, tasks):
+            stats.merge(res.stats)
+            if best is None or res.success or res.filled_slots > best.filled_slots:
+                best = res
+            if res.success:
+                break  # leaving the with block terminates the other workers
+
+    if best is None:
+        best = Progress(grid).result(None)
+    best.elapsed = time.monotonic() - start
+    best.stats = stats
+    return best
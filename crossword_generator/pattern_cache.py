@@ -0,0 +1,110 @@
+from __future__ import annotations
+import json
+import os
+import sys
+from collections import OrderedDict
+from typing import TYPE_CHECKING
+
+from crossword_generator.word_index import WordIndex, as_index
+
+if TYPE_CHECKING:
+    from crossword_generator.clue_processor import ClueProcessor
+
+Pattern = tuple[int, tuple[tuple[int, str], ...]]  # (length, constraints)
+
+MAX_BYTES = 128 * 2 ** 20
+ENTRY_OVERHEAD = 200  # approximate bytes of an entry besides its mask: key tuples, strings, dict slot
+
+
+class PatternCache:
+    """
+    Bounded LRU cache of pattern bitmaps over a word index.
+        index: The word index.
+        max_bytes: Approximate memory cap; least recently used patterns are evicted beyond it.
+        hits: Number of lookups answered from the cache.
+        misses: Number of lookups computed from the index.
+        evictions: Number of patterns evicted.
+
+    Unlike a per-fill lru_cache, one cache is meant to be shared by all fills over the same index (see
+    `shared_cache`), so warm patterns survive from one grid to the next.
+    """
+
+    def __init__(self, index: WordIndex, max_bytes: int = MAX_BYTES):
+        self.index = index
+        self.max_bytes = max_bytes
+        self.entries: OrderedDict[Pattern, int] = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, pattern: Pattern) -> bool:
+        return pattern in self.entries
+
+    def mask(self, length: int, constraints: tuple[tuple[int, str], ...]) -> int:
+        """Returns `index.mask(length, constraints)`, from the cache if possible."""
+        pattern = (length, constraints)
+        mask = self.entries.get(pattern)
+        if mask is not None:
+            self.hits += 1
+            self.entries.move_to_end(pattern)
+            return mask
+
+        self.misses += 1
+        mask = self.index.mask(length, constraints)
+        self.put(pattern, mask)
+        return mask
+
+    def put(self, pattern: Pattern, mask: int) -> None:
+        if pattern in self.entries:
+            self.bytes -= entry_bytes(self.entries.pop(pattern))
+        self.entries[pattern] = mask
+        self.bytes += entry_bytes(mask)
+        while self.bytes > self.max_bytes and self.entries:
+            _, evicted = self.entries.popitem(last=False)
+            self.bytes -= entry_bytes(evicted)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        self.entries.clear()
+        self.bytes = 0
+
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def save(self, path: str, limit: int | None = None) -> None:
+        """Writes the most recently used patterns (all, or the limit hottest) to a file, to warm up another
+        cache over the same word list with `load`. Only patterns are written; bitmaps are recomputed."""
+        patterns = list(reversed(self.entries))[:limit]
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump([[length, [list(constraint) for constraint in constraints]]
+                       for length, constraints in patterns], f)
+        os.replace(tmp_path, path)
+
+    def load(self, path: str) -> int:
+        """Computes and caches the patterns saved with `save`, hottest last, and returns their number.
+        Does not count towards hits or misses."""
+        with open(path) as f:
+            patterns = json.load(f)
+        for length, constraints in reversed(patterns):
+            constraints = tuple((pos, char) for pos, char in constraints)
+            self.put((length, constraints), self.index.mask(length, constraints))
+        return len(patterns)
+
+
+def entry_bytes(mask: int) -> int:
+    return sys.getsizeof(mask) + ENTRY_OVERHEAD
+
+
+def shared_cache(clue_processor: ClueProcessor | WordIndex) -> PatternCache:
+    """Returns the pattern cache shared by all fills over a word index (or a clue processor's index),
+    creating it on first use. It is kept on the index, so it lives as long as the index."""
+    index = as_index(clue_processor)
+    if index.pattern_cache is None:
+        index.pattern_cache = PatternCache(index)
+    return index.pattern_cache
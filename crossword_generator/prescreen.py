@@ -0,0 +1,132 @@
+from __future__ import annotations
+import math
+import random
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+from crossword_generator.grid import Grid, as_rng
+from crossword_generator.word_index import ALPHABET, WordIndex, as_index
+
+if TYPE_CHECKING:
+    from crossword_generator.clue_processor import ClueProcessor
+
+
+@dataclass
+class Prescreen:
+    """
+    Fillability signals of a numbered grid, computed without searching.
+        initial_sizes: Number of words fitting each slot's length and preset letters.
+        domain_sizes: Number of words left for each slot after one arc-consistency pass.
+        crossing_letters: For each slot and offset, the number of letters possible at that cell from both
+            crossing slots (26 for unchecked cells).
+        reject: Whether the grid certainly cannot be filled, i.e. some domain is empty.
+        score: Mean log2 domain size over the slots after the pass, or 0 if rejected. Higher is easier.
+        weakest: Slot with the smallest domain after the pass.
+    """
+
+    initial_sizes: list[int]
+    domain_sizes: list[int]
+    crossing_letters: list[list[int]]
+    reject: bool
+    score: float
+    weakest: int
+
+    def __bool__(self):
+        return not self.reject
+
+
+def letter_mask(domain: int, buckets: dict[tuple[int, str], int], offset: int) -> int:
+    """Returns the bitmask (bit i for ALPHABET[i]) of the letters at offset of the words in domain."""
+    mask = 0
+    for i, c in enumerate(ALPHABET):
+        if domain & buckets.get((offset, c), 0):
+            mask |= 1 << i
+    return mask
+
+
+def prescreen(grid: Grid, index: WordIndex) -> Prescreen:
+    """Computes fillability signals of a numbered grid from a word index.
+
+    Each slot's domain is the set of words fitting its length and preset letters. For each crossing, the
+    letters possible from both slots are intersected; then every domain is narrowed once to the words
+    with a possible letter at each of its crossings (one arc-consistency pass, not run to a fixpoint).
+    This takes a few milliseconds, so hopeless layouts can be rejected before `Grid.fill`.
+
+    Args:
+        grid: The numbered grid.
+        index: The word index.
+
+    Returns:
+        The signals.
+    """
+    slots = grid.slots
+    num_slots = len(slots.cells)
+    lengths = [len(cells) for cells in slots.cells]
+    buckets = [index.buckets.get(length, {}) for length in lengths]
+    domains = [index.mask(lengths[slot], slots.constraints(grid.letters, slot)) for slot in range(num_slots)]
+    initial_sizes = [domain.bit_count() for domain in domains]
+
+    letters = [[letter_mask(domains[slot], buckets[slot], offset) for offset in range(lengths[slot])]
+               for slot in range(num_slots)]
+    common = [[letters[slot][offset] & letters[crossing][crossing_offset] if crossing != -1 else letters[slot][offset]
+               for offset, (crossing, crossing_offset) in enumerate(slots.crossings[slot])]
+              for slot in range(num_slots)]
+
+    narrowed = []
+    for slot in range(num_slots):
+        domain = domains[slot]
+        for offset, (crossing, _) in enumerate(slots.crossings[slot]):
+            if crossing == -1 or not domain:
+                continue
+            if common[slot][offset] == letters[slot][offset]:
+                continue  # the crossing rules nothing out
+            allowed = 0
+            for i, c in enumerate(ALPHABET):
+                if common[slot][offset] >> i & 1:
+                    allowed |= buckets[slot].get((offset, c), 0)
+            domain &= allowed
+        narrowed.append(domain)
+
+    domain_sizes = [domain.bit_count() for domain in narrowed]
+    reject = 0 in domain_sizes
+    score = 0.0 if reject else sum(math.log2(size) for size in domain_sizes) / max(num_slots, 1)
+    return Prescreen(
+        initial_sizes=initial_sizes,
+        domain_sizes=domain_sizes,
+        crossing_letters=[[mask.bit_count() for mask in row] for row in common],
+        reject=reject,
+        score=score,
+        weakest=min(range(num_slots), key=domain_sizes.__getitem__) if num_slots else -1,
+    )
+
+
+def screened_grid(n: int, clue_processor: ClueProcessor | WordIndex, min_score=0.0, max_tries=100,
+                  rng: random.Random | int | None = None) -> tuple[Grid, Prescreen]:
+    """Generates layouts until one passes the pre-screen with at least min_score.
+
+    Args:
+        n: The size.
+        clue_processor: The clue processor, or a word index.
+        min_score: Minimum `Prescreen.score`.
+        max_tries: Number of layouts to generate before giving up.
+        rng: Random number generator or seed. Defaults to the global random module.
+
+    Returns:
+        The first grid that passed and its signals, or else the best-scoring grid generated.
+
+    Raises:
+        ValueError: If max_tries is less than 1.
+    """
+    if max_tries < 1:
+        raise ValueError(f'max_tries must be at least 1, not {max_tries}')
+    index = as_index(clue_processor)
+    rng = as_rng(rng)
+    best: tuple[Grid, Prescreen] | None = None
+    for _ in range(max_tries):
+        g = Grid(n, rng=rng)
+        signals = prescreen(g, index)
+        if signals and signals.score >= min_score:
+            return g, signals
+        if best is None or (not signals.reject, signals.score) > (not best[1].reject, best[1].score):
+            best = g, signals
+    return best
@@ -1,4 +1,8 @@
-from .grid_generator import off_or_black
+def off_or_black(grid, r, c):
+    """
+    Checks if (r, c) is off the grid or a black square
+    """
+    return r < 0 or c < 0 or r >= len(grid) or c >= len(grid[0]) or grid[r][c] == '#'
 
 
 def grid_to_string(grid):
@@ -26,31 +30,25 @@ def extract_words(grid):
     """
     words = {"across": {}, "down": {}}
     contains_words = {}
+    rows = [''.join(row) for row in grid]
+    cols = [''.join(col) for col in zip(*grid)]
+    down_ids = [None] * len(cols)  # id of the down word running through each column at the current row
     id = 1
-    for r in range(len(grid)):
-        for c in range(len(grid[0])):
-            if grid[r][c] != '#':
-                contains_words[(r, c)] = {"across": None, "down": None}
-
-    for r in range(len(grid)):
-        for c in range(len(grid[0])):
-            if grid[r][c] == '#':
+    for r, row in enumerate(rows):
+        across_id = None
+        for c, char in enumerate(row):
+            if char == '#':
                 continue
             word = False
             if off_or_black(grid, r, c-1):
-                word, x, s = True, c, ""
-                while(x < len(grid[0]) and grid[r][x] != '#'):
-                    s += grid[r][x]
-                    contains_words[(r, x)]["across"] = id
-                    x += 1
-                words["across"][id] = s
+                word, across_id = True, id
+                end = row.find('#', c)
+                words["across"][id] = row[c:end if end != -1 else len(row)]
             if off_or_black(grid, r-1, c):
-                word, x, s = True, r, ""
-                while(x < len(grid) and grid[x][c] != '#'):
-                    s += grid[x][c]
-                    contains_words[(x, c)]["down"] = id
-                    x += 1
-                words["down"][id] = s
+                word, down_ids[c] = True, id
+                end = cols[c].find('#', r)
+                words["down"][id] = cols[c][r:end if end != -1 else len(rows)]
+            contains_words[(r, c)] = {"across": across_id, "down": down_ids[c]}
             id += word
 
     return words, contains_words
@@ -0,0 +1,127 @@
+from __future__ import annotations
+import random
+from typing import TYPE_CHECKING, Iterable, Mapping
+
+from crossword_generator.fill import ENGINES, FillResult, FillStats
+from crossword_generator.grid import BLANK_CODE, Grid, as_rng
+from crossword_generator.word_index import as_index
+
+if TYPE_CHECKING:
+    from crossword_generator.clue_processor import ClueProcessor
+    from crossword_generator.word_index import WordIndex
+
+
+def place(grid: Grid, slot: int, word: str) -> None:
+    """Writes word into a slot of the grid."""
+    cells = grid.slots.cells[slot]
+    if len(word) != len(cells):
+        raise ValueError(f'{word!r} does not fit slot {slot} of length {len(cells)}')
+    for cell, c in zip(cells, word.upper()):
+        grid.letters[cell] = ord(c)
+
+
+def affected_region(grid: Grid, seeds: Iterable[int], pinned: Iterable[int] = (), depth: int | None = None) -> list[int]:
+    """Returns the unpinned slots within depth crossings of the seed slots, going through unpinned slots only.
+
+    Args:
+        grid: The numbered grid.
+        seeds: Slots to start from, e.g. entries that changed. Unpinned seeds are part of the region.
+        pinned: Slots that are not part of the region and are not gone through.
+        depth: Maximum number of crossings from a seed, or None for the whole connected region.
+
+    Returns:
+        The sorted slots of the region.
+    """
+    crossings = grid.slots.crossings
+    pinned = set(pinned)
+    seeds = set(seeds)
+    region = seeds - pinned
+    frontier = list(seeds)
+    distance = 0
+    while frontier and (depth is None or distance < depth):
+        distance += 1
+        next_frontier = []
+        for slot in frontier:
+            for crossing, _ in crossings[slot]:
+                if crossing != -1 and crossing not in pinned and crossing not in region:
+                    region.add(crossing)
+                    next_frontier.append(crossing)
+        frontier = next_frontier
+    return sorted(region)
+
+
+def refill(grid: Grid, clue_processor: ClueProcessor | WordIndex, presets: Mapping[int, str] | None = None,
+           pinned: Iterable[int] = (), pinned_cells: Iterable[int] = (), engine='mrv', max_depth: int | None = None,
+           rng: random.Random | int | None = None, **options) -> FillResult:
+    """Writes preset words into the grid and re-fills only what they affect, keeping pinned entries and cells.
+
+    The region to re-solve starts from the preset entries that changed and the unpinned entries with blank
+    cells, and grows one crossing at a time (through unpinned entries only) until it can be filled. Each
+    try blanks the region's cells except those shared with an entry outside it or pinned, which stay as
+    constraints, so a small edit to a filled grid is re-solved locally, from the cached patterns of the
+    fill engines, rather than from scratch. On a blank grid, presets are seeded theme entries and the
+    rest of the grid is filled around them.
+
+    Args:
+        grid: The numbered grid. It is only modified if the re-fill succeeds.
+        clue_processor: The clue processor, or a word index.
+        presets: Dictionary mapping slots to words to write into them. Preset slots are pinned.
+        pinned: Slots whose letters must not change.
+        pinned_cells: Cells (indices into `Grid.letters`) whose letters must not change.
+        engine: Name of the engine in `fill.ENGINES`. 'mrv' proves a region unfillable quickly, by propagation.
+        max_depth: Maximum number of crossings the region grows from the changed entries, or None for no limit.
+            The crossings of changed entries are always re-filled.
+        rng: Random number generator or seed. Defaults to the global random module.
+        **options: Options for the engine, e.g. num_sample_strings or time_limit (per try).
+
+    Returns:
+        The result of the last try, with the time and statistics of all tries.
+    """
+    index = as_index(clue_processor)
+    rng = as_rng(rng)
+    presets = dict(presets or {})
+    pinned = set(pinned) | set(presets)
+    pinned_cells = set(pinned_cells)
+    slots = grid.slots
+    original = bytes(grid.letters)
+
+    for slot, word in presets.items():
+        for cell, c in zip(slots.cells[slot], word.upper()):
+            if cell in pinned_cells and grid.letters[cell] != ord(c):
+                raise ValueError(f'{word!r} clashes with a pinned cell of slot {slot}')
+        place(grid, slot, word)
+    for slot in pinned:
+        pinned_cells.update(slots.cells[slot])
+
+    changed = [slot for slot in presets if slots.word(original, slot) != slots.word(grid.letters, slot)]
+    blank = [slot for slot in range(len(slots.cells))
+             if slot not in pinned and BLANK_CODE in (grid.letters[cell] for cell in slots.cells[slot])]
+    preset = bytes(grid.letters)
+
+    stats = FillStats()
+    elapsed = 0.0
+    region: list[int] = []
+    depth = 1 if changed else 0
+    while True:
+        region = affected_region(grid, changed + blank, pinned, depth)
+        members = set(region)
+        grid.letters[:] = preset
+        for slot in region:
+            for offset, cell in enumerate(slots.cells[slot]):
+                crossing = slots.crossings[slot][offset][0]
+                if cell not in pinned_cells and (crossing == -1 or crossing in members):
+                    grid.letters[cell] = BLANK_CODE
+
+        res = ENGINES[engine](grid, index, rng=rng, region=region, **options)
+        stats.merge(res.stats)
+        elapsed += res.elapsed
+        if res.success or res.stopped or (max_depth is not None and depth >= max_depth):
+            break
+        if affected_region(grid, changed + blank, pinned, depth + 1) == region:
+            break  # the region cannot grow any further
+        depth += 1
+
+    grid.letters[:] = res.letters if res.success else original
+    res.stats = stats
+    res.elapsed = elapsed
+    return res
@@ -0,0 +1,42 @@
+from __future__ import annotations
+import random
+from typing import Sequence
+
+
+class AliasTable:
+    """
+    Walker/Vose alias table for O(1) sampling from a discrete distribution.
+        probability: For each bucket, the probability of keeping the bucket's own outcome.
+        alias: For each bucket, the outcome taken otherwise.
+
+    Building the table is O(n); each sample takes one random number.
+    """
+
+    def __init__(self, weights: Sequence[float]):
+        n = len(weights)
+        total = float(sum(weights))
+        if n == 0 or total <= 0:
+            raise ValueError('weights must be nonempty with a positive sum')
+
+        scaled = [weight * n / total for weight in weights]
+        self.probability = [1.0] * n
+        self.alias = list(range(n))
+        small = [i for i, p in enumerate(scaled) if p < 1]
+        large = [i for i, p in enumerate(scaled) if p >= 1]
+        while small and large:
+            less, more = small.pop(), large.pop()
+            self.probability[less] = scaled[less]
+            self.alias[less] = more
+            scaled[more] -= 1 - scaled[less]
+            (small if scaled[more] < 1 else large).append(more)
+        # leftovers are 1 up to rounding error, and keep probability 1
+
+    def __len__(self):
+        return len(self.alias)
+
+    def sample(self, rng: random.Random | None = None) -> int:
+        """Returns an outcome i with probability proportional to weights[i]."""
+        rng = rng or random
+        u = rng.random() * len(self.alias)
+        i = min(int(u), len(self.alias) - 1)
+        return i if u - i < self.probability[i] else self.alias[i]
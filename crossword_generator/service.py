@@ -0,0 +1,287 @@
+"""Asyncio HTTP service handing out generated puzzles from warm per-size pools.
+
+A local stand-in for the Node API with the same routes and response shapes:
+
+    GET /api/size/:size          {"_id": "size_<size>", "puzzle_id_list": [<id>]}, a fresh puzzle from the pool
+    GET /api/id/:id              the puzzle document, with its "_id"
+    GET /api/daily/:type/:date   the daily mini (size 5) or maxi (size 11 or 13) of a YYYY-MM-DD date
+    GET /metrics                 pool depths, generation latencies, failures and request counts
+
+Requests are answered from puzzles that are already generated, so their latency never depends on a
+fill; a background process pool keeps every pool at its target depth. After consecutive failed
+generations of a size, its refills back off exponentially, up to MAX_BACKOFF seconds. E.g.
+
+    python -m crossword_generator.service clues.csv --port 5001 --sizes 5 11 13 --target 8
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import random
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Sequence
+
+from crossword_generator.batch import STAGES, BatchStats, generate_puzzle, init_worker
+from crossword_generator.clue_index import ClueIndex
+from crossword_generator.word_index import WordIndex
+
+SIZES = (5, 11, 13)
+DAILY_SIZES = {'mini': (5,), 'maxi': (11, 13)}  # as in the Node API's /api/daily route
+LATENCY_WINDOW = 1000  # number of recent generations that latency metrics are computed over
+BACKOFF = 0.5  # seconds before resubmitting after a failed generation, doubled per consecutive failure
+MAX_BACKOFF = 60.0
+REASONS = {200: 'OK', 204: 'No Content', 404: 'Not Found', 405: 'Method Not Allowed', 503: 'Service Unavailable'}
+
+
+class PuzzleService:
+    """
+    Warm pools of generated puzzles per size, refilled in the background by a process pool.
+        sizes: Grid sizes served.
+        target: Number of ready puzzles to keep per size.
+        concurrency: Maximum number of puzzles of one size being generated at once.
+        pools: Dictionary mapping sizes to the ready puzzles.
+        pending: Dictionary mapping sizes to the number of puzzles being generated.
+        stats: Dictionary mapping sizes to generation statistics over the last LATENCY_WINDOW puzzles.
+        consecutive_failures: Dictionary mapping sizes to the number of failed generations since the last success.
+        retries: Dictionary mapping sizes backing off after a failure to the scheduled call that resumes their refills.
+        puzzles: Puzzles handed out, by id; the least recently used are evicted beyond max_puzzles.
+        dailies: Dictionary mapping (type, date) pairs to daily puzzles, which are never evicted.
+        requests: Number of requests per route.
+    """
+
+    def __init__(self, index: WordIndex, clues: ClueIndex, sizes: Sequence[int] = SIZES, target=4, concurrency=2,
+                 workers: int | None = None, max_puzzles=10_000, max_layouts=20, title='Crossword',
+                 author='crossword-generator', **options):
+        self.index = index
+        self.clues = clues
+        self.sizes = tuple(sizes)
+        self.target = target
+        self.concurrency = concurrency
+        self.workers = workers
+        self.max_puzzles = max_puzzles
+        self.options = dict(options, max_layouts=max_layouts, title=title, author=author, publish_type='Free')
+        self.pools: dict[int, deque[dict]] = {n: deque() for n in self.sizes}
+        self.pending = dict.fromkeys(self.sizes, 0)
+        self.stats = {n: BatchStats(stages={stage: deque(maxlen=LATENCY_WINDOW) for stage in (*STAGES, 'total')})
+                      for n in self.sizes}
+        self.consecutive_failures = dict.fromkeys(self.sizes, 0)
+        self.retries: dict[int, asyncio.TimerHandle] = {}
+        self.puzzles: OrderedDict[str, dict] = OrderedDict()
+        self.dailies: dict[tuple[str, str], dict] = {}
+        self.daily_ids: dict[str, dict] = {}
+        self.requests: dict[str, int] = {}
+        self.executor: ProcessPoolExecutor | None = None
+        self.started = time.monotonic()
+
+    def start(self) -> None:
+        """Starts the process pool and the refills. Must be called from the event loop."""
+        if self.index.path is None:  # publish the index once, for the workers to map rather than copy
+            self.index = self.index.share()
+        self.executor = ProcessPoolExecutor(self.workers, initializer=init_worker, initargs=(self.index, self.clues))
+        self.started = time.monotonic()
+        for n in self.sizes:
+            self.refill(n)
+
+    def close(self) -> None:
+        """Stops the refills and, if the index was shared by `start`, removes it."""
+        executor, self.executor = self.executor, None
+        for handle in self.retries.values():
+            handle.cancel()
+        self.retries.clear()
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+        if self.index.shared:
+            self.index.unlink()
+
+    def refill(self, n: int) -> None:
+        """Submits generations until the pool of size n, counting puzzles in progress, reaches the target.
+        Does nothing while the size is backing off after failures, or once the service is closed."""
+        if self.executor is None or n in self.retries:
+            return
+        loop = asyncio.get_running_loop()
+        while len(self.pools[n]) + self.pending[n] < self.target and self.pending[n] < self.concurrency:
+            task = (n, datetime.date.today().isoformat(), 0, str(random.getrandbits(64)), self.options)
+            self.pending[n] += 1
+            future = loop.run_in_executor(self.executor, generate_puzzle, task)
+            future.add_done_callback(
+                lambda future, n=n, submitted=time.monotonic(): self.generated(n, submitted, future))
+
+    def generated(self, n: int, submitted: float, future: asyncio.Future) -> None:
+        self.pending[n] -= 1
+        stats = self.stats[n]
+        if future.cancelled():
+            return
+        document = None
+        if future.exception() is None:
+            _, document, timings = future.result()
+            for stage, seconds in timings.items():
+                stats.stages[stage].append(seconds)
+            stats.stages['total'].append(time.monotonic() - submitted)
+        if n in self.retries:  # a failure backs off from now on, and a success ends the backoff
+            self.retries.pop(n).cancel()
+        if document is None:
+            stats.failures += 1
+            self.consecutive_failures[n] += 1
+            if self.executor is not None:
+                delay = min(MAX_BACKOFF, BACKOFF * 2 ** (self.consecutive_failures[n] - 1))
+                self.retries[n] = asyncio.get_running_loop().call_later(delay, self.retry, n)
+        else:
+            stats.puzzles += 1
+            self.consecutive_failures[n] = 0
+            self.pools[n].append(document)
+            self.refill(n)
+
+    def retry(self, n: int) -> None:
+        """Ends the backoff of size n and refills its pool."""
+        del self.retries[n]
+        self.refill(n)
+
+    def take(self, n: int) -> dict | None:
+        """Hands out a ready puzzle of size n, with a new id, or None if the pool is empty."""
+        pool = self.pools.get(n)
+        if not pool:
+            return None
+        document = pool.popleft()
+        self.refill(n)
+        document['_id'] = os.urandom(12).hex()  # shaped like a Mongo ObjectId
+        self.puzzles[document['_id']] = document
+        if len(self.puzzles) > self.max_puzzles:
+            self.puzzles.popitem(last=False)
+        return document
+
+    def get(self, puzzle_id: str) -> dict | None:
+        document = self.daily_ids.get(puzzle_id) or self.puzzles.get(puzzle_id)
+        if document is not None and puzzle_id in self.puzzles:
+            self.puzzles.move_to_end(puzzle_id)
+        return document
+
+    def daily(self, kind: str, date: str) -> dict | None:
+        """Returns the daily puzzle of a type ('mini' or 'maxi') and date, taking it from a pool the first time
+        it is requested, or None if no pool of a matching size has a puzzle ready."""
+        key = (kind, date)
+        if key not in self.dailies:
+            for n in DAILY_SIZES.get(kind, ()):
+                document = self.take(n)
+                if document is not None:
+                    document['puzzle_meta'].update(publishType='Daily', dailyDate=date, printDate=date)
+                    self.dailies[key] = self.daily_ids[document['_id']] = document
+                    break
+        return self.dailies.get(key)
+
+    def metrics(self) -> dict:
+        elapsed = time.monotonic() - self.started
+        now = asyncio.get_running_loop().time()
+        sizes = {}
+        for n in self.sizes:
+            self.stats[n].elapsed = elapsed
+            sizes[n] = dict(depth=len(self.pools[n]), target=self.target, pending=self.pending[n],
+                            consecutive_failures=self.consecutive_failures[n],
+                            retry_in=max(0.0, self.retries[n].when() - now) if n in self.retries else 0.0,
+                            **self.stats[n].summary())
+        return {'uptime': elapsed, 'sizes': sizes, 'requests': self.requests, 'puzzles': len(self.puzzles),
+                'dailies': len(self.dailies)}
+
+    def route(self, path: str) -> tuple[int, dict | None]:
+        """Returns the status and JSON body of a GET request."""
+        parts = path.split('?', 1)[0].strip('/').split('/')
+        name = '/'.join(parts[:2])
+        self.requests[name] = self.requests.get(name, 0) + 1
+        if parts == ['metrics']:
+            return 200, self.metrics()
+        if len(parts) == 3 and parts[:2] == ['api', 'size'] and parts[2].isdigit():
+            n = int(parts[2])
+            if n not in self.pools:
+                return 404, None
+            document = self.take(n)
+            return (200, {'_id': f'size_{n}', 'puzzle_id_list': [document['_id']]}) if document else (503, None)
+        if len(parts) == 3 and parts[:2] == ['api', 'id']:
+            document = self.get(parts[2])
+            return (200, document) if document else (404, None)
+        if len(parts) == 4 and parts[:2] == ['api', 'daily'] and parts[2] in DAILY_SIZES:
+            if not any(n in self.pools for n in DAILY_SIZES[parts[2]]):
+                return 404, None
+            document = self.daily(parts[2], parts[3])
+            return (200, document) if document else (503, None)
+        return 404, None
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Serves one HTTP/1.1 request per connection."""
+        try:
+            request = await reader.readuntil(b'\r\n\r\n')
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+            writer.close()
+            return
+        method, path, *_ = request.split(b'\r\n', 1)[0].decode('latin-1').split(' ') + ['', '']
+        if method == 'OPTIONS':
+            status, body = 204, None
+        elif method == 'GET':
+            status, body = self.route(path)
+        else:
+            status, body = 405, None
+
+        payload = json.dumps(body).encode() if body is not None else b''
+        headers = [
+            f'HTTP/1.1 {status} {REASONS[status]}',
+            'Content-Type: application/json',
+            f'Content-Length: {len(payload)}',
+            'Access-Control-Allow-Origin: *',
+            'Access-Control-Allow-Headers: Origin, X-Requested-With, Content-Type, Accept',
+            'Connection: close',
+        ]
+        if status == 503:
+            headers.append('Retry-After: 1')
+        writer.write(('\r\n'.join(headers) + '\r\n\r\n').encode() + payload)
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+        writer.close()
+
+    async def serve(self, host='127.0.0.1', port=5001) -> asyncio.Server:
+        """Starts the refills and listens for requests. Returns the server."""
+        self.start()
+        return await asyncio.start_server(self.handle, host, port)
+
+
+async def serve_forever(service: PuzzleService, host: str, port: int) -> None:
+    server = await service.serve(host, port)
+    print(f'Serving on {", ".join(str(sock.getsockname()) for sock in server.sockets)}')
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.close()
+
+
+def main(argv: Sequence[str] | None = None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('clues', help='clue csv with clue and answer columns')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5001)
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES)
+    parser.add_argument('--target', type=int, default=4, help='ready puzzles to keep per size')
+    parser.add_argument('--concurrency', type=int, default=2, help='puzzles of one size generated at once')
+    parser.add_argument('--workers', type=int, default=None, help='generator processes; defaults to the CPUs')
+    parser.add_argument('--engine', default='dfs')
+    parser.add_argument('--time-limit', type=float, default=30.0, help='seconds per fill')
+    parser.add_argument('--num-sample-strings', type=int, default=100)
+    args = parser.parse_args(argv)
+
+    from crossword_generator.clue_processor import ClueProcessor  # pandas is only needed here
+
+    clue_processor = ClueProcessor(args.clues)
+    service = PuzzleService(clue_processor.index, clue_processor.clue_index, args.sizes, args.target,
+                            args.concurrency, args.workers, engine=args.engine, time_limit=args.time_limit,
+                            num_sample_strings=args.num_sample_strings)
+    try:
+        asyncio.run(serve_forever(service, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
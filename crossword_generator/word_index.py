@@ -0,0 +1,541 @@
+from __future__ import annotations
+import hashlib
+import io
+import math
+import mmap
+import os
+import random
+import struct
+import tempfile
+import uuid
+from typing import TYPE_CHECKING, BinaryIO, Iterable, Iterator, Mapping, Sequence
+
+import numpy as np
+
+from crossword_generator.sampling import AliasTable
+
+if TYPE_CHECKING:
+    from crossword_generator.clue_processor import ClueProcessor
+
+ALPHABET = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+MIN_LENGTH = 3
+MAX_LENGTH = 15
+
+# compiled index file layout (little-endian):
+#   header:       magic, format version, sha256 of the source file(s), number of lengths
+#   length table: (length, word count, words offset, buckets offset, weights offset) per length
+#   words:        word count * length ASCII bytes, in id order
+#   buckets:      for pos in range(length), for char in ALPHABET: ceil(word count / 8) bytes
+#   weights:      word count float32s, in id order
+MAGIC = b'CWIX'
+VERSION = 2
+HEADER = struct.Struct('<4sI32sI')
+LENGTH_ENTRY = struct.Struct('<IIQQQ')
+
+# directory of indexes published with WordIndex.share; /dev/shm is memory-backed on Linux
+SHARED_DIR = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+
+# approximate cost of one rejection-sampling draw relative to decoding one candidate, used to choose
+# between drawing from a precomputed alias table and decoding the candidates
+DRAW_COST = 32
+# candidate counts up to which exact weighted sampling is done in Python rather than numpy
+SMALL_SAMPLE = 256
+
+
+class WordIndex:
+    """
+    Bitset index over a word list.
+        words: Dictionary mapping lengths to sorted sequences of words. The position of a
+            word in its sequence is its id.
+        buckets: Dictionary mapping lengths to dictionaries, which map (pos, char) pairs to
+            bitmaps (Python ints) whose i-th bit is set iff word i has char at pos.
+        weights: Dictionary mapping lengths to arrays of word weights (e.g. how many clues a word has),
+            in id order, or None to weigh all words equally.
+        full: Dictionary mapping lengths to the bitmap of all words of that length.
+
+    A pattern lookup is a chain of ANDs over buckets, and counting matches is a popcount,
+    so no intermediate collection of words is ever built unless explicitly asked for.
+    """
+
+    def __init__(self, words: dict[int, Sequence[str]], buckets: dict[int, dict[tuple[int, str], int]],
+                 weights: dict[int, np.ndarray] | None = None):
+        self.words = words
+        self.buckets = buckets
+        self.weights = weights
+        self.full = {length: (1 << len(words[length])) - 1 for length in words}
+        # alias tables over all words of a length (key: length) or of a bucket (key: (length, pos, char)),
+        # with the ids they sample from (None for all words); built on first use
+        self.alias_tables: dict[int | tuple[int, int, str], tuple[AliasTable, np.ndarray | None]] = {}
+        self.buffer = None  # backing buffer of a compiled index, if any
+        self.path = None  # path of the compiled index file, if memory-mapped
+        self.shared = False  # whether the file was published with `share` and is removed by `unlink`
+        self.pattern_cache = None  # shared by fills, see pattern_cache.shared_cache
+
+    @classmethod
+    def from_words(cls, words: Iterable[str], weights: Iterable[float] | None = None) -> WordIndex:
+        """Builds an index from uppercase words. Words outside [MIN_LENGTH, MAX_LENGTH] are ignored.
+
+        Args:
+            words: The words to index. Duplicates are allowed, and add up their weights.
+            weights: Weight of each word. Defaults to 1 per occurrence.
+
+        Returns:
+            The index.
+        """
+        builder = WordIndexBuilder()
+        builder.add(words, weights)
+        return builder.build()
+
+    def packed(self) -> WordIndex:
+        """Returns an index over the same words and buckets whose words are PackedWords over one buffer of
+        ASCII bytes, as in a compiled index, rather than a string object per word."""
+        view = memoryview(b''.join(''.join(self.words[length]).encode('ascii') for length in self.words))
+        words, offset = {}, 0
+        for length in self.words:
+            words[length] = PackedWords(view, offset, length, len(self.words[length]))
+            offset += length * len(words[length])
+        return WordIndex(words, self.buckets, self.weights)
+
+    @classmethod
+    def from_buffer(cls, buffer) -> WordIndex:
+        """Builds an index backed by a compiled index buffer (see `save`) without copying or parsing it.
+
+        Words are decoded and buckets converted to ints lazily, on first access.
+
+        Args:
+            buffer: A bytes-like object, e.g. an mmap.
+
+        Returns:
+            The index.
+        """
+        view = memoryview(buffer)
+        magic, version, _, num_lengths = HEADER.unpack_from(view, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f'Not a version {VERSION} compiled word index')
+
+        words = {}
+        buckets = {}
+        weights = {}
+        for i in range(num_lengths):
+            length, count, words_offset, buckets_offset, weights_offset = LENGTH_ENTRY.unpack_from(
+                view, HEADER.size + i * LENGTH_ENTRY.size)
+            words[length] = PackedWords(view, words_offset, length, count)
+            buckets[length] = PackedBuckets(view, buckets_offset, length, count)
+            weights[length] = np.frombuffer(view, dtype='<f4', count=count, offset=weights_offset)
+        index = cls(words, buckets, weights)
+        index.buffer = buffer
+        return index
+
+    @classmethod
+    def load(cls, path: str) -> WordIndex:
+        """Memory-maps a compiled index file written by `save`."""
+        with open(path, 'rb') as f:
+            index = cls.from_buffer(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+        index.path = path
+        return index
+
+    @classmethod
+    def attach(cls, name: str) -> WordIndex:
+        """Memory-maps an index published with `share`, given its name."""
+        return cls.load(os.path.join(SHARED_DIR, name))
+
+    def share(self, name: str | None = None) -> WordIndex:
+        """Publishes the compiled index as a file in SHARED_DIR (memory-backed where available) and
+        memory-maps it.
+
+        Processes that map the file, e.g. workers the returned index is pickled to (which only pickles
+        its path), share one copy of it in memory, and attaching takes no copying or parsing. The file
+        stays until `unlink` is called, normally by the process that shared it, once its workers are done.
+
+        Args:
+            name: File name. Defaults to a unique name.
+
+        Returns:
+            The index backed by the file.
+        """
+        name = name or f'crossword-index-{uuid.uuid4().hex}.idx'
+        path = os.path.join(SHARED_DIR, name)
+        if self.buffer is not None:  # already compiled
+            tmp_path = f'{path}.tmp'
+            with open(tmp_path, 'wb') as f:
+                f.write(self.buffer)
+            os.replace(tmp_path, path)
+        else:
+            self.save(path)
+        index = WordIndex.attach(name)
+        index.shared = True
+        return index
+
+    def unlink(self) -> None:
+        """Removes the file of an index published with `share`. Processes that mapped it keep their
+        mapping until they exit."""
+        if not self.shared:
+            raise ValueError('Only an index published with share can be unlinked')
+        os.remove(self.path)
+
+    def to_bytes(self, source_hash: bytes = bytes(32)) -> bytes:
+        """Returns the index in the compiled index format (see `save`)."""
+        f = io.BytesIO()
+        self.write(f, source_hash)
+        return f.getvalue()
+
+    def save(self, path: str, source_hash: bytes = bytes(32)) -> None:
+        """Writes the index to a compiled index file, which can be memory-mapped with `load`.
+
+        Args:
+            path: The output path.
+            source_hash: sha256 digest of the data the index was built from.
+        """
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'wb') as f:
+            self.write(f, source_hash)
+        os.replace(tmp_path, path)  # never leave a truncated index behind
+
+    def write(self, f: BinaryIO, source_hash: bytes = bytes(32)) -> None:
+        """Writes the index in the compiled index format to a binary file object."""
+        lengths = sorted(self.words)
+        offset = HEADER.size + len(lengths) * LENGTH_ENTRY.size
+        table = []
+        for length in lengths:
+            count = len(self.words[length])
+            buckets_offset = offset + count * length
+            weights_offset = buckets_offset + length * len(ALPHABET) * ((count + 7) // 8)
+            table.append((length, count, offset, buckets_offset, weights_offset))
+            offset = weights_offset + 4 * count
+
+        f.write(HEADER.pack(MAGIC, VERSION, source_hash, len(lengths)))
+        for entry in table:
+            f.write(LENGTH_ENTRY.pack(*entry))
+        for length in lengths:
+            count = len(self.words[length])
+            f.write(''.join(self.words[length]).encode('ascii'))
+            for pos in range(length):
+                for c in ALPHABET:
+                    f.write(self.buckets[length].get((pos, c), 0).to_bytes((count + 7) // 8, 'little'))
+            f.write(self.word_weights(length).astype('<f4').tobytes())
+
+    def __reduce__(self):
+        if self.path:  # e.g. for worker processes: map the file again rather than copying its contents
+            return WordIndex.load, (self.path,)
+        return WordIndex, ({length: tuple(words) for length, words in self.words.items()},
+                           {length: dict(buckets) for length, buckets in self.buckets.items()},
+                           None if self.weights is None else {length: np.array(weights)
+                                                              for length, weights in self.weights.items()})
+
+    def __len__(self):
+        return sum(len(words) for words in self.words.values())
+
+    def mask(self, length: int, constraints: tuple[tuple[int, str], ...]) -> int:
+        """Returns the bitmap of words of the given length satisfying all constraints.
+
+        Args:
+            length: The word length.
+            constraints: (pos, char) pairs that matching words must satisfy.
+
+        Returns:
+            The bitmap of matching word ids.
+        """
+        if length not in self.buckets:
+            return 0
+        buckets = self.buckets[length]
+        res = self.full[length]
+        for constraint in constraints:
+            res &= buckets.get(constraint, 0)
+            if not res:
+                break
+        return res
+
+    def count(self, length: int, constraints: tuple[tuple[int, str], ...]) -> int:
+        """Returns the number of words of the given length satisfying all constraints."""
+        return self.mask(length, constraints).bit_count()
+
+    def candidates(self, length: int, constraints: tuple[tuple[int, str], ...]) -> tuple[str, ...]:
+        """Returns a tuple of all words of the given length satisfying all constraints."""
+        return self.decode(length, self.mask(length, constraints))
+
+    def decode(self, length: int, mask: int) -> tuple[str, ...]:
+        """Returns the words whose ids are set in mask."""
+        return tuple(self.lookup(length, mask_ids(mask)))
+
+    def lookup(self, length: int, ids: Sequence[int]) -> list[str]:
+        """Returns the words with the given ids."""
+        words = self.words[length]
+        if isinstance(words, PackedWords) and len(ids) > 1:
+            return words.decode(ids)
+        return [words[i] for i in ids]
+
+    def word_weights(self, length: int) -> np.ndarray:
+        """Returns the weights of the words of a length, in id order."""
+        if self.weights is None:
+            return np.ones(len(self.words[length]), dtype=np.float32)
+        return self.weights[length]
+
+    def sample(self, length: int, mask: int, k: int, rng: random.Random | None = None,
+               constraints: tuple[tuple[int, str], ...] = ()) -> list[str]:
+        """Returns the words of `sample_ids`."""
+        return self.lookup(length, self.sample_ids(length, mask, k, rng, constraints))
+
+    def sample_ids(self, length: int, mask: int, k: int, rng: random.Random | None = None,
+                   constraints: tuple[tuple[int, str], ...] = ()) -> list[int]:
+        """Returns the ids of up to k distinct words sampled from the words whose ids are set in mask, each draw
+        picking a remaining word with probability proportional to its weight.
+
+        When the candidates make up a large enough share of all words of the length, or of the words with
+        one of the constraints' letters, they are not decoded: words are drawn in O(1) each from a
+        precomputed alias table over those words, and rejected if they are not candidates. Otherwise
+        (e.g. for heavily constrained patterns), the candidates are decoded and sampled exactly.
+
+        Args:
+            length: The word length.
+            mask: Bitmap of candidate word ids.
+            k: Number of words to sample.
+            rng: Random number generator. Defaults to the global random module.
+            constraints: (pos, char) pairs satisfied by all candidates, if known, to draw from smaller tables.
+
+        Returns:
+            A list of min(k, popcount(mask)) word ids.
+        """
+        rng = rng or random
+        words = self.words[length]
+        count = mask.bit_count()
+        chosen: dict[int, None] = {}
+        if count > k:
+            key, population = length, len(words)
+            for pos, c in constraints:
+                bucket_count = self.buckets[length].get((pos, c), 0).bit_count()
+                if bucket_count < population:
+                    key, population = (length, pos, c), bucket_count
+            # expected draws are about k * population / count, against count candidates to decode
+            if count >= 4 * k and count * count >= DRAW_COST * k * population:
+                table, ids = self.alias_table(key)
+                probability, alias, size = table.probability, table.alias, len(table)
+                uniform = rng.random
+                candidates = mask.to_bytes((len(words) + 7) // 8, 'little')  # for O(1) bit tests
+                for _ in range(4 * k * population // count):
+                    u = uniform() * size
+                    i = min(int(u), size - 1)
+                    if u - i >= probability[i]:
+                        i = alias[i]
+                    word_id = i if ids is None else int(ids[i])
+                    if candidates[word_id >> 3] >> (word_id & 7) & 1 and word_id not in chosen:
+                        chosen[word_id] = None
+                        if len(chosen) == k:
+                            break
+
+        if len(chosen) < k:  # exact: decode the remaining candidates
+            for word_id in chosen:
+                mask &= ~(1 << word_id)
+            ids = mask_ids(mask)
+            k -= len(chosen)
+            # weighted sampling without replacement keeps the k largest log(u) / weight, u uniform in (0, 1]
+            if self.weights is None:
+                sampled = [int(ids[i]) for i in rng.sample(range(len(ids)), min(k, len(ids)))]
+            elif len(ids) <= SMALL_SAMPLE:
+                weights = np.maximum(self.weights[length][ids], 1e-12).tolist()
+                keys = sorted(((math.log(1 - rng.random()) / weight, word_id)
+                               for word_id, weight in zip(ids.tolist(), weights)), reverse=True)
+                sampled = [word_id for _, word_id in keys[:k]]
+            else:
+                generator = np.random.default_rng(rng.getrandbits(64))
+                keys = np.log1p(-generator.random(len(ids))) / np.maximum(self.weights[length][ids], 1e-12)
+                top = np.argpartition(-keys, k - 1)[:k] if k < len(ids) else np.arange(len(ids))
+                sampled = ids[top].tolist()
+            chosen.update(dict.fromkeys(sampled))
+        return list(chosen)
+
+    def alias_table(self, key: int | tuple[int, int, str]) -> tuple[AliasTable, np.ndarray | None]:
+        """Returns the alias table over the words of a length, or over the words of a (length, pos, char)
+        bucket together with their ids, building it on first use."""
+        if key not in self.alias_tables:
+            if isinstance(key, int):
+                ids = None
+                weights = self.word_weights(key)
+            else:
+                length, pos, c = key
+                ids = mask_ids(self.buckets[length][(pos, c)])
+                weights = self.word_weights(length)[ids]
+            self.alias_tables[key] = AliasTable(weights.tolist()), ids
+        return self.alias_tables[key]
+
+
+class WordIndexBuilder:
+    """Accumulates words incrementally (e.g. chunk by chunk) and builds a WordIndex from them.
+
+    Only the distinct words and their total weights are kept, so memory is bounded by the
+    vocabulary rather than by the size of the input.
+    """
+
+    def __init__(self):
+        self.words: dict[int, dict[str, float]] = {i: {} for i in range(MIN_LENGTH, MAX_LENGTH + 1)}
+
+    def add(self, words: Iterable[str], weights: Iterable[float] | None = None) -> None:
+        """Adds uppercase words, each with a weight (default 1). Words outside [MIN_LENGTH, MAX_LENGTH]
+        are ignored."""
+        for word, weight in zip(words, weights) if weights is not None else ((word, 1) for word in words):
+            if MIN_LENGTH <= len(word) <= MAX_LENGTH:
+                totals = self.words[len(word)]
+                totals[word] = totals.get(word, 0) + weight
+
+    def build(self) -> WordIndex:
+        sorted_words = {length: tuple(sorted(self.words[length])) for length in self.words}
+        buckets = {length: build_buckets(length, sorted_words[length]) for length in sorted_words}
+        weights = {length: np.array([self.words[length][word] for word in sorted_words[length]], dtype=np.float32)
+                   for length in sorted_words}
+        return WordIndex(sorted_words, buckets, weights)
+
+
+def build_buckets(length: int, words: Sequence[str]) -> dict[tuple[int, str], int]:
+    """Builds the (pos, char) bitmaps for a sorted sequence of words of one length.
+
+    Bits are set in bytearrays first, as OR-ing single bits into a growing int is quadratic.
+    """
+    size = (len(words) + 7) // 8
+    arrays = {(pos, c): bytearray(size) for pos in range(length) for c in ALPHABET}
+    for i, word in enumerate(words):
+        byte, bit = i >> 3, 1 << (i & 7)
+        for pos, c in enumerate(word):
+            arrays[(pos, c)][byte] |= bit
+    return {key: int.from_bytes(array, 'little') for key, array in arrays.items()}
+
+
+def mask_ids(mask: int) -> np.ndarray:
+    """Returns the sorted indices of the set bits of mask."""
+    if not mask:
+        return np.empty(0, dtype=np.intp)
+    data = np.frombuffer(mask.to_bytes((mask.bit_length() + 7) // 8, 'little'), dtype=np.uint8)
+    return np.flatnonzero(np.unpackbits(data, bitorder='little'))
+
+
+class PackedWords(Sequence[str]):
+    """Read-only view of count fixed-width ASCII words stored contiguously in a buffer, in sorted order.
+
+    The words are viewed as a numpy array of fixed-width byte strings, so ids are decoded in bulk by
+    `decode` and words are found by binary search in `index`, without a string object per word.
+    """
+
+    def __init__(self, view: memoryview, offset: int, length: int, count: int):
+        self.view = view
+        self.offset = offset
+        self.length = length
+        self.count = count
+        self.array = np.frombuffer(view, dtype=f'S{length}', count=count, offset=offset)
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(self.count))]
+        if i < 0:
+            i += self.count
+        if not 0 <= i < self.count:
+            raise IndexError('word id out of range')
+        return self.array[i].decode('ascii')
+
+    def decode(self, ids: Sequence[int]) -> list[str]:
+        """Returns the words with the given ids."""
+        text = self.array[np.asarray(ids, dtype=np.intp)].tobytes().decode('ascii')
+        return [text[i:i + self.length] for i in range(0, len(text), self.length)]
+
+    def index(self, word, start=0, stop=None) -> int:
+        stop = self.count if stop is None else stop
+        if isinstance(word, str) and len(word) == self.length and word.isascii():
+            i = int(self.array.searchsorted(word.encode('ascii')))
+            if start <= i < stop and self.array[i] == word.encode('ascii'):
+                return i
+        raise ValueError(f'{word!r} is not in the index')
+
+
+class PackedBuckets(Mapping[tuple[int, str], int]):
+    """Read-only (pos, char) -> bitmap mapping stored in a buffer. Bitmaps are converted to ints on first access."""
+
+    def __init__(self, view: memoryview, offset: int, length: int, count: int):
+        self.view = view
+        self.offset = offset
+        self.length = length
+        self.size = (count + 7) // 8
+        self.cache: dict[tuple[int, str], int] = {}
+
+    def __getitem__(self, key):
+        if key in self.cache:
+            return self.cache[key]
+        pos, c = key
+        if not 0 <= pos < self.length or c not in ALPHABET:
+            raise KeyError(key)
+        start = self.offset + (pos * len(ALPHABET) + ALPHABET.index(c)) * self.size
+        res = self.cache[key] = int.from_bytes(self.view[start:start + self.size], 'little')
+        return res
+
+    def __iter__(self) -> Iterator[tuple[int, str]]:
+        return ((pos, c) for pos in range(self.length) for c in ALPHABET)
+
+    def __len__(self):
+        return self.length * len(ALPHABET)
+
+
+def as_index(source: ClueProcessor | WordIndex) -> WordIndex:
+    """Returns the word index of a ClueProcessor, or source itself if it already is one."""
+    return source if isinstance(source, WordIndex) else source.index
+
+
+def source_hash(paths: str | Sequence[str]) -> bytes:
+    """Returns the sha256 digest of the contents of one or more files."""
+    digest = hashlib.sha256()
+    for path in [paths] if isinstance(paths, str) else paths:
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+    return digest.digest()
+
+
+def compiled_hash(path: str) -> bytes | None:
+    """Returns the source hash recorded in a compiled index file, or None if it is missing or not compatible."""
+    try:
+        with open(path, 'rb') as f:
+            magic, version, digest, _ = HEADER.unpack(f.read(HEADER.size))
+    except (OSError, struct.error):
+        return None
+    return digest if magic == MAGIC and version == VERSION else None
+
+
+def default_compiled_path(sources: str | Sequence[str]) -> str:
+    return f'{sources if isinstance(sources, str) else sources[0]}.idx'
+
+
+def compile_index(sources: str | Sequence[str], path: str | None = None) -> str:
+    """Builds the word index of one or more clue csvs / word lists and writes it to a compiled index file.
+
+    Args:
+        sources: Path(s) to clue csvs or word lists (see `clue_processor.read_answers`).
+        path: Output path. Defaults to the first source + '.idx'.
+
+    Returns:
+        The output path.
+    """
+    from crossword_generator.clue_processor import build_index  # pandas is only needed to compile
+
+    path = path or default_compiled_path(sources)
+    build_index(sources).save(path, source_hash(sources))
+    return path
+
+
+def load_index(sources: str | Sequence[str], path: str | None = None) -> WordIndex:
+    """Memory-maps the compiled index of one or more sources, (re)compiling it first if it is missing or stale.
+
+    Args:
+        sources: Path(s) to clue csvs or word lists.
+        path: Path of the compiled index. Defaults to the first source + '.idx'.
+
+    Returns:
+        The index, which can be passed to Grid.fill in place of a ClueProcessor.
+    """
+    path = path or default_compiled_path(sources)
+    if compiled_hash(path) != source_hash(sources):
+        compile_index(sources, path)
+    return WordIndex.load(path)
+
+
+if __name__ == '__main__':
+    import sys
+
+    print(compile_index(sys.argv[1:]))
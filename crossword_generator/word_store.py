@@ -0,0 +1,221 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING, Iterable, Iterator, Mapping, Sequence
+
+import numpy as np
+
+from crossword_generator.word_index import MAX_LENGTH, MIN_LENGTH
+
+if TYPE_CHECKING:
+    from crossword_generator.word_index import WordIndex
+
+WILDCARD = '.'  # matches any letter in a pattern, as Cell.BLANK does in a grid
+CHUNK = 4096  # words decoded at a time by WordTrie.match
+
+
+class WordTrie(Sequence[str]):
+    """
+    Trie over the sorted words of one length, in flat arrays.
+        length: Length of the words.
+        labels: Letter of each node (ASCII), in breadth-first order; the root (node 0) has none.
+        first: Node of the first child of each node. The children of node i are first[i] to first[i + 1] - 1,
+            sorted by letter, and the last level's nodes are the leaves.
+        levels: Node of the first node at each depth, plus the number of nodes.
+
+    Breadth-first order lists the leaves in sorted order, so a word's id (its position among the sorted
+    words, as in `WordIndex.words`) is its leaf's position in the last level, and every node covers a
+    contiguous range of ids. A trie costs 5 bytes per node and shares prefixes, instead of a string
+    object per word plus a hash set entry per word per letter.
+
+    Pattern queries work on those id ranges (see `query`), so matches are counted without visiting them
+    and enumerated lazily, a chunk at a time.
+    """
+
+    def __init__(self, length: int, labels: bytes, first: np.ndarray, levels: Sequence[int]):
+        self.length = length
+        self.labels = labels
+        self.first = first
+        self.levels = tuple(levels)
+        self.label_array = np.frombuffer(labels, dtype=np.uint8)
+
+    @classmethod
+    def from_words(cls, length: int, words: Sequence[str]) -> WordTrie:
+        """Builds a trie from sorted, distinct uppercase words of one length."""
+        count = len(words)
+        if not count:
+            return cls(length, bytes(1), np.ones(1, dtype=np.uint32), [0] + [1] * (length + 1))
+        letters = np.frombuffer(''.join(words).encode('ascii'), dtype=np.uint8).reshape(count, length)
+        # lcp[i]: length of the common prefix of words i - 1 and i; word i starts a node at depth d iff lcp[i] < d
+        lcp = np.zeros(count, dtype=np.intp)
+        lcp[1:] = np.argmin(letters[1:] == letters[:-1], axis=1)
+
+        labels = [np.zeros(1, dtype=np.uint8)]
+        first = []
+        levels = [0, 1]
+        starts = np.zeros(count, dtype=bool)  # words starting a node at the previous depth
+        starts[:1] = True
+        for depth in range(1, length + 1):
+            new = lcp < depth
+            new[:1] = True
+            node = levels[-1] + np.cumsum(new) - 1  # node of each word at this depth
+            first.append(node[starts])
+            labels.append(letters[new, depth - 1])
+            starts = new
+            levels.append(levels[-1] + int(new.sum()))
+        first.append(np.full(int(starts.sum()), levels[-1]))  # leaves have no children
+        return cls(length, np.concatenate(labels).tobytes(), np.concatenate(first).astype(np.uint32), levels)
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes used by the arrays."""
+        return len(self.labels) + self.first.nbytes
+
+    def __len__(self):
+        return self.levels[-1] - self.levels[-2]
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return self.decode(np.arange(len(self))[i])
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError('word id out of range')
+        return self.decode(np.array([i]))[0]
+
+    def decode(self, ids: np.ndarray) -> list[str]:
+        """Returns the words with the given ids, walking up from their leaves a level at a time."""
+        nodes = (self.levels[-2] + ids).astype(self.first.dtype)  # searchsorted would cast the levels otherwise
+        letters = np.empty((len(ids), self.length), dtype=np.uint8)
+        for depth in range(self.length, 0, -1):
+            letters[:, depth - 1] = self.label_array[nodes]
+            # the parents are the nodes of the level above with the last first child at or before each node
+            level = self.levels[depth - 1]
+            nodes = (level - 1 + np.searchsorted(self.first[level:self.levels[depth]], nodes, side='right')).astype(
+                self.first.dtype)
+        text = letters.tobytes().decode('ascii')
+        return [text[i:i + self.length] for i in range(0, len(text), self.length)]
+
+    def rank(self, word: str) -> int | None:
+        """Returns the id of word, or None if it is not in the trie."""
+        if len(word) != self.length or not len(self):
+            return None
+        node = 0
+        for c in word.encode('ascii'):
+            node = self.labels.find(c, int(self.first[node]), int(self.first[node + 1]))
+            if node == -1:
+                return None
+        return node - self.levels[-2]
+
+    def __contains__(self, word) -> bool:
+        return isinstance(word, str) and self.rank(word) is not None
+
+    def index(self, word, start=0, stop=None) -> int:
+        i = self.rank(word) if isinstance(word, str) else None
+        if i is None or i < start or (stop is not None and i >= stop):
+            raise ValueError(f'{word!r} is not in the trie')
+        return i
+
+    def nodes(self, depth: int, c: int) -> np.ndarray:
+        """Returns the nodes at a depth whose letter is c (an ASCII code)."""
+        start, stop = self.levels[depth], self.levels[depth + 1]
+        return start + np.flatnonzero(self.label_array[start:stop] == c)
+
+    def spans(self, nodes: np.ndarray, depth: int) -> tuple[np.ndarray, np.ndarray]:
+        """Returns the (start, stop) ranges of the ids of the words below nodes at a depth."""
+        lo, hi = nodes, nodes
+        for _ in range(depth, self.length):
+            lo = self.first[lo].astype(np.intp)
+            hi = self.first[hi + 1].astype(np.intp) - 1
+        return lo - self.levels[-2], hi + 1 - self.levels[-2]
+
+    def query(self, pattern: str) -> tuple[np.ndarray, np.ndarray]:
+        """Returns the (start, stop) id ranges of the words matching pattern (e.g. 'P..Y'), in order.
+
+        The nodes of the pattern's last letter are found with one scan of their level, and every other
+        letter keeps only the nodes below a node of that letter: ranges of deeper nodes nest in those of
+        their ancestors, so this is a binary search rather than a walk over the subtrees in between.
+        """
+        if len(pattern) != self.length:
+            raise ValueError(f'pattern {pattern!r} is not of length {self.length}')
+        letters = [(depth, c) for depth, c in enumerate(pattern.upper().encode('ascii')) if c != ord(WILDCARD)]
+        if not letters:
+            whole = np.zeros(1 if len(self) else 0, dtype=np.intp)
+            return whole, whole + len(self)
+        depth, c = letters[-1]
+        starts, stops = self.spans(self.nodes(depth + 1, c), depth + 1)
+        for depth, c in letters[:-1]:
+            outer_starts, outer_stops = self.spans(self.nodes(depth + 1, c), depth + 1)
+            if not len(outer_starts):
+                return outer_starts, outer_stops
+            outer = np.searchsorted(outer_starts, starts, side='right') - 1
+            keep = (outer >= 0) & (starts < outer_stops[np.maximum(outer, 0)])
+            starts, stops = starts[keep], stops[keep]
+        return starts, stops
+
+    def ids(self, pattern: str) -> np.ndarray:
+        """Returns the sorted ids of the words matching pattern."""
+        starts, stops = self.query(pattern)
+        counts = stops - starts
+        # concatenate the ranges by offsetting one arange
+        return np.arange(counts.sum()) + np.repeat(starts - np.cumsum(counts) + counts, counts)
+
+    def match(self, pattern: str, chunk=CHUNK) -> Iterator[str]:
+        """Lazily yields the words matching pattern (e.g. 'P..Y'), in order, decoding chunk words at a time."""
+        ids = self.ids(pattern)
+        for start in range(0, len(ids), chunk):
+            yield from self.decode(ids[start:start + chunk])
+
+    def count(self, pattern: str) -> int:
+        """Returns the number of words matching pattern, without enumerating them."""
+        starts, stops = self.query(pattern)
+        return int((stops - starts).sum())
+
+
+class WordStore(Mapping[int, WordTrie]):
+    """
+    Compact word list: a WordTrie per length.
+        tries: Dictionary mapping lengths to tries.
+
+    Pattern queries (`match`, `count`) dispatch on the pattern's length. Word ids agree with a
+    `WordIndex` built from the same words, so the bitmaps of one can be decoded with the other.
+    """
+
+    def __init__(self, tries: dict[int, WordTrie]):
+        self.tries = tries
+
+    @classmethod
+    def from_words(cls, words: Iterable[str]) -> WordStore:
+        """Builds a store from uppercase words. Duplicates and words outside [MIN_LENGTH, MAX_LENGTH] are
+        ignored."""
+        by_length: dict[int, set[str]] = {length: set() for length in range(MIN_LENGTH, MAX_LENGTH + 1)}
+        for word in words:
+            if MIN_LENGTH <= len(word) <= MAX_LENGTH:
+                by_length[len(word)].add(word)
+        return cls({length: WordTrie.from_words(length, sorted(length_words))
+                    for length, length_words in by_length.items()})
+
+    @classmethod
+    def from_index(cls, index: WordIndex) -> WordStore:
+        """Builds a store over the words of an index."""
+        return cls({length: WordTrie.from_words(length, words) for length, words in index.words.items()})
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes used by the tries' arrays."""
+        return sum(trie.nbytes for trie in self.tries.values())
+
+    def __getitem__(self, length: int) -> WordTrie:
+        return self.tries[length]
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self.tries)
+
+    def __len__(self):
+        return len(self.tries)
+
+    def match(self, pattern: str) -> Iterator[str]:
+        """Lazily yields the words matching pattern, e.g. 'P..Y'."""
+        return self.tries[len(pattern)].match(pattern) if len(pattern) in self.tries else iter(())
+
+    def count(self, pattern: str) -> int:
+        """Returns the number of words matching pattern."""
+        return self.tries[len(pattern)].count(pattern) if len(pattern) in self.tries else 0
@@ -0,0 +1,52 @@
+import random
+
+import pytest
+
+from benchmarks.synthetic import PATH as WORDS_PATH
+from crossword_generator.clue_index import ClueIndex
+from crossword_generator.grid import Cell, Grid
+from crossword_generator.word_index import WordIndex
+
+
+def planted(n: int, seed: int = 0, num_noise_words: int = 5000) -> tuple[Grid, WordIndex]:
+    """Returns a blank grid with a random layout and an index that is guaranteed to fill it:
+    the words of a random letter assignment plus random noise words."""
+    rng = random.Random(seed)
+    g = Grid(n, rng=rng)
+    letters = 'EATRSLN'
+    for r in range(1, n + 1):
+        for c in range(1, n + 1):
+            if not g.cell(r, c).is_wall():
+                g.cell(r, c).label = rng.choice(letters)
+    words = [g.slots.word(g.letters, slot) for slot in range(len(g.entries))]
+    for r in range(1, n + 1):
+        for c in range(1, n + 1):
+            if not g.cell(r, c).is_wall():
+                g.cell(r, c).label = Cell.BLANK
+    noise = [''.join(rng.choice(letters) for _ in range(rng.randint(3, n))) for _ in range(num_noise_words)]
+    return g, WordIndex.from_words(words + noise)
+
+
+def assert_valid_fill(g: Grid, index: WordIndex) -> None:
+    """Asserts that the grid is filled and that every entry is a word of the index."""
+    assert g.is_filled()
+    for slot, cells in enumerate(g.slots.cells):
+        assert index.count(len(cells), tuple(enumerate(g.slots.word(g.letters, slot)))) == 1
+
+
+@pytest.fixture
+def planted_grid():
+    return planted
+
+
+@pytest.fixture
+def check_fill():
+    return assert_valid_fill
+
+
+@pytest.fixture(scope='session')
+def words() -> tuple[WordIndex, ClueIndex]:
+    """The synthetic word list's index, and a clue index with a clue 'Clue for WORD' per word."""
+    with open(WORDS_PATH) as f:
+        words = f.read().split()
+    return WordIndex.from_words(words), ClueIndex.from_pairs((word, f'Clue for {word}') for word in words)
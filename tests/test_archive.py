@@ -0,0 +1,88 @@
+import datetime
+import json
+import os
+from array import array
+
+import pytest
+
+from crossword_generator.archive import ArchiveWriter, PuzzleArchive
+from crossword_generator.batch import finished_puzzles, run
+from crossword_generator.clue_index import ClueIndex
+
+
+def filled_grids(planted_grid, count):
+    grids = []
+    for seed in range(count):
+        g, index = planted_grid(5, seed=seed)
+        g.fill(index, num_attempts=3, num_sample_strings=50)
+        grids.append(g)
+    return grids
+
+
+def test_archive_round_trips_grids(tmp_path, planted_grid):
+    grids = filled_grids(planted_grid, 3)
+    grids[2].letters[grids[2].slots.cells[0][0]] = ord('.')  # a partial fill
+    path = str(tmp_path / 'puzzles.cwpa')
+    with ArchiveWriter(path) as writer:
+        for i, g in enumerate(grids):
+            assert writer.append(g, {0: i}, date=f'2024-01-0{i + 1}', publish_type='Free') == i
+
+    with PuzzleArchive(path) as archive:
+        assert len(archive) == 3
+        for i, g in enumerate(grids):
+            assert bytes(archive.grid(i).letters) == bytes(g.letters)
+            record = archive.record(i)
+            assert record.date == f'2024-01-0{i + 1}' and not record.daily
+            assert record.clue_ids[0] == i and len(record.clue_ids) == len(g.entries)
+        assert bytes(archive.grid(-1).letters) == bytes(grids[-1].letters)
+        with pytest.raises(IndexError):
+            archive.record(3)
+
+
+def test_archive_documents_match_batch_documents(tmp_path, words):
+    index, clues = words
+    jsonl, archived = str(tmp_path / 'puzzles.jsonl'), str(tmp_path / 'puzzles.cwpa')
+    options = dict(sizes=(5,), count=2, workers=1, num_sample_strings=50, start=datetime.date(2024, 1, 1))
+    run(index, clues, jsonl, **options)
+    run(index, clues, archived, **options)
+    with open(jsonl) as f:
+        documents = [json.loads(line) for line in f]
+    with PuzzleArchive(archived, clues) as archive:
+        assert list(archive) == documents
+    with pytest.raises(ValueError):
+        PuzzleArchive(archived, ClueIndex.from_pairs([('ABC', 'Clue')]))
+
+
+def test_archive_resumes_after_a_crash(tmp_path, planted_grid):
+    grids = filled_grids(planted_grid, 3)
+    path = str(tmp_path / 'puzzles.cwpa')
+    writer = ArchiveWriter(path)
+    for number, g in enumerate(grids[:2]):
+        writer.append(g, {}, date='2024-01-01', number=number)
+    writer.flush()
+    writer.file.write(b'\x40\x00')  # a crash while writing the third puzzle, before the index is written
+    writer.file.flush()
+    size = os.path.getsize(path)
+
+    assert finished_puzzles(path) == {(grids[0].n, '2024-01-01', 0), (grids[1].n, '2024-01-01', 1)}
+    assert os.path.getsize(path) == size  # reading leaves the archive as it is
+    with ArchiveWriter(path) as resumed:
+        assert len(resumed) == 2
+        resumed.append(grids[2], {})
+    writer.file.close()
+    with PuzzleArchive(path) as archive:
+        assert [bytes(archive.grid(i).letters) for i in range(len(archive))] == [bytes(g.letters) for g in grids]
+
+
+def test_archive_with_an_index_but_no_header_is_scanned(tmp_path, planted_grid):
+    grids = filled_grids(planted_grid, 2) * 10  # an index longer than the offset of the first record
+    path = str(tmp_path / 'puzzles.cwpa')
+    writer = ArchiveWriter(path)
+    for g in grids:
+        writer.append(g, {})
+    assert 8 * len(grids) > writer.offsets[0]
+    writer.file.write(array('Q', writer.offsets).tobytes())  # a crash after writing the index, before the header
+    writer.file.close()
+
+    with PuzzleArchive(path) as archive:
+        assert [bytes(archive.grid(i).letters) for i in range(len(archive))] == [bytes(g.letters) for g in grids]
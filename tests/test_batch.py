@@ -0,0 +1,49 @@
+import datetime
+import json
+
+from crossword_generator.batch import finished_puzzles, run
+
+
+def read(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+
+def test_batch_documents(tmp_path, words):
+    index, clues = words
+    path = str(tmp_path / 'puzzles.jsonl')
+    stats = run(index, clues, path, sizes=(5,), count=2, workers=1, num_sample_strings=50)
+    assert stats.puzzles == 2 and stats.failures == 0 and stats.puzzles_per_second() > 0
+    assert set(stats.summary()['stages']) == {'layout', 'fill', 'clues'}
+
+    for document in read(path):
+        meta, data = document['puzzle_meta'], document['puzzle_data']
+        assert meta['height'] == meta['width'] == 5 and meta['publishType'] == 'Daily'
+        assert len(data['layout']) == len(data['answers']) == 25
+        for direction, step in (('A', 1), ('D', 5)):
+            for clue in data['clues'][direction]:
+                cells = range(clue['clueStart'], clue['clueEnd'] + 1, step)
+                answer = ''.join(data['answers'][cell] for cell in cells)
+                assert all(data['layout'][cell] for cell in cells)
+                assert clue['value'] == f'Clue for {answer}'
+
+
+def test_batch_resumes(tmp_path, words):
+    index, clues = words
+    options = dict(sizes=(5,), count=2, workers=1, num_sample_strings=50, max_nodes=2000)
+    dates = {'start': datetime.date(2024, 1, 1), 'end': datetime.date(2024, 1, 2)}
+    complete = str(tmp_path / 'complete.jsonl')
+    run(index, clues, complete, **dates, **options)
+
+    resumed = str(tmp_path / 'resumed.jsonl')
+    with open(complete) as f:
+        lines = f.readlines()
+    with open(resumed, 'w') as f:
+        # puzzle 1 of the first date finished before puzzle 0, then a crash while writing another puzzle
+        f.write(lines[1] + lines[2][:20])
+    assert finished_puzzles(resumed) == {(5, '2024-01-01', 1)}
+
+    stats = run(index, clues, resumed, **dates, **options)
+    assert stats.skipped == 1 and stats.puzzles == 3
+    key = lambda document: (document['puzzle_meta']['dailyDate'], document['puzzle_data']['answers'])
+    assert sorted(read(resumed), key=key) == sorted(read(complete), key=key)
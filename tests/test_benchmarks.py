@@ -0,0 +1,19 @@
+import json
+
+from benchmarks.run import run
+
+
+def test_benchmarks_are_reproducible():
+    first = run(sizes=(5,), seeds=(0, 1), engines=('mrv',), max_nodes=500)
+    second = run(sizes=(5,), seeds=(0, 1), engines=('mrv',), max_nodes=500)
+    json.dumps(first)
+
+    assert first['index']['words'] > 0
+    for key in ('layout', 'fill'):
+        assert len(first[key]) == 2
+    for a, b in zip(first['layout'], second['layout']):
+        assert (a['walls'], a['entries']) == (b['walls'], b['entries'])
+    for a, b in zip(first['fill'], second['fill']):
+        assert (a['success'], a['filled_slots']) == (b['success'], b['filled_slots'])
+        assert a['stats']['nodes'] == b['stats']['nodes']
+    assert first['summary']['fill'][0]['runs'] == 2
@@ -0,0 +1,64 @@
+import random
+from collections import Counter
+
+import pytest
+
+from crossword_generator.catalog import LayoutCatalog, canonical_mask, layout_mask, transform
+from crossword_generator.fill import FillResult, FillStats
+from crossword_generator.grid import Grid
+from crossword_generator.sampling import AliasTable
+
+
+def test_alias_table():
+    rng = random.Random(0)
+    table = AliasTable([1, 0, 3])
+    counts = Counter(table.sample(rng) for _ in range(20_000))
+    assert counts[1] == 0
+    assert 2.7 < counts[2] / counts[0] < 3.3
+    with pytest.raises(ValueError):
+        AliasTable([0, 0])
+
+
+def test_canonical_mask_is_invariant_under_symmetries():
+    g = Grid(7, rng=1)
+    mask = layout_mask(g)
+    assert {canonical_mask(7, transform(7, mask, symmetry)) for symmetry in range(8)} == {canonical_mask(7, mask)}
+
+
+def test_catalog_dedups_and_round_trips(tmp_path):
+    catalog = LayoutCatalog()
+    g = Grid(7, rng=1)
+    layout = catalog.add(g)
+    assert layout.num_words == len(g.entries) and layout.num_walls == layout.mask.bit_count()
+
+    flipped = Grid(7, set_layout=False)
+    for r in range(1, 8):
+        for c in range(1, 8):
+            if g.cell(r, c).is_wall():
+                flipped.cell(r, 8 - c).make_wall()
+    flipped.number_cells()
+    assert catalog.add(flipped) is layout and len(catalog) == 1
+
+    catalog.generate(11, 5, rng=0)
+    catalog.record(g, FillResult(True, bytes(g.letters), 0, 0, 0.5, FillStats()))
+    path = str(tmp_path / 'layouts.cat')
+    catalog.save(path)
+    loaded = LayoutCatalog.load(path)
+    assert loaded.layouts == catalog.layouts
+    assert loaded.get(flipped).successes == 1
+
+
+def test_from_catalog_favors_layouts_that_fill():
+    catalog = LayoutCatalog()
+    catalog.generate(11, 2, rng=0)
+    good, bad = catalog.layouts[11]
+    for _ in range(20):
+        catalog.record(good.grid(), FillResult(True, b'', 0, 0, 0.1, FillStats()))
+        catalog.record(bad.grid(), FillResult(False, b'', 0, 0, 5.0, FillStats()))
+
+    rng = random.Random(0)
+    sampled = Counter(catalog.get(Grid.from_catalog(11, rng, catalog)) is good for _ in range(200))
+    assert sampled[True] > 180
+
+    g = Grid.from_catalog(11, rng, catalog)
+    assert g.slots is not None and not g.is_filled()
@@ -0,0 +1,33 @@
+import random
+
+import pandas as pd
+
+from crossword_generator.clue_index import ClueIndex, assign_clues, extract_words
+from crossword_generator.grid import Direction, Grid
+
+
+def test_clue_index():
+    clues = pd.DataFrame({'clue': ['Feline', 'Pet', 'Canine', 'Tabby'], 'answer': ['CAT', 'DOG', 'DOG', 'CAT']})
+    index = ClueIndex.from_clues(clues)
+    assert len(index) == 4 and 'CAT' in index and 'EMU' not in index
+    assert index.lookup('CAT') == ['Feline', 'Tabby'] and index.lookup('DOG') == ['Pet', 'Canine']
+    assert index.lookup('EMU') == [] and index.choose('EMU') is None
+    assert {index.choose('DOG', random.Random(seed)) for seed in range(20)} == {'Pet', 'Canine'}
+
+    pairs = ClueIndex.from_pairs(zip(clues['answer'], clues['clue']))
+    assert pairs.lookup('CAT') == index.lookup('CAT')
+
+
+def test_assign_clues():
+    g = Grid(3, set_layout=False)
+    g.number_cells()
+    for r, row in enumerate(('CAT', 'ARE', 'BED'), 1):
+        for c, char in enumerate(row, 1):
+            g.cell(r, c).label = char
+    assert extract_words(g) == {Direction.ACROSS: {1: 'CAT', 4: 'ARE', 5: 'BED'},
+                                Direction.DOWN: {1: 'CAB', 2: 'ARE', 3: 'TED'}}
+
+    index = ClueIndex.from_pairs([('CAT', 'Feline'), ('ARE', 'Exist'), ('TED', 'Talk host')])
+    clues = assign_clues(g, index, random.Random(0))
+    assert {g.slots.word(g.letters, slot): clue for slot, clue in clues.items()} == {
+        'CAT': 'Feline', 'ARE': 'Exist', 'TED': 'Talk host'}
@@ -0,0 +1,34 @@
+from crossword_generator.clue_processor import ClueProcessor, build_index
+
+
+def write_sources(tmp_path):
+    clues = tmp_path / 'clues.csv'
+    clues.write_text('rowid,clue,answer,definition\n'
+                     '1,Feline (3),cat,x\n'
+                     '2,Way out (4),EX-IT,x\n'
+                     '3,Too short (2),ab,x\n'
+                     '4,Missing answer (3),,x\n'
+                     '5,Has digits (4),r2d2,x\n'
+                     '6,Dog (6),cat dog,x\n')
+    wordlist = tmp_path / 'wordlist.txt'
+    wordlist.write_text('cat;50\nzebra;40\nnull;30\nlonglonglonglonglong;20\n')
+    return str(clues), str(wordlist)
+
+
+def test_clue_processor_normalization(tmp_path):
+    clues, _ = write_sources(tmp_path)
+    clue_processor = ClueProcessor(clues)
+    assert list(clue_processor.clues['answer']) == ['CAT', 'EXIT', 'CATDOG']
+    assert list(clue_processor.clues['clue']) == ['Feline', 'Way out', 'Dog']
+    assert list(clue_processor.words[4]) == ['EXIT']
+    assert list(clue_processor.words.match('E..T')) == ['EXIT']
+    assert clue_processor.index.candidates(3, ()) == ('CAT',)
+
+
+def test_build_index_merges_sources_in_chunks(tmp_path):
+    clues, wordlist = write_sources(tmp_path)
+    index = build_index([clues, wordlist], chunksize=2)
+    assert index.candidates(3, ()) == ('CAT',)
+    assert index.candidates(4, ()) == ('EXIT', 'NULL')
+    assert index.candidates(5, ()) == ('ZEBRA',)
+    assert len(index) == 5
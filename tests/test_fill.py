@@ -0,0 +1,146 @@
+import pytest
+
+from crossword_generator.fill import FillStats, NogoodStore, crossing_counts
+from crossword_generator.grid import Grid
+
+
+@pytest.mark.parametrize('engine', ['dfs', 'mrv', 'local'])
+@pytest.mark.parametrize('n', [5, 7])
+def test_fill(planted_grid, check_fill, engine, n):
+    g, index = planted_grid(n)
+    g.fill(index, num_attempts=3, num_sample_strings=50, engine=engine)
+    check_fill(g, index)
+
+
+def test_mrv_respects_preset_letters(planted_grid, check_fill):
+    g, index = planted_grid(7, seed=1)
+    solution = g.copy()
+    assert solution.fill(index, num_attempts=3, num_sample_strings=50, engine='mrv', rng=0)
+    slot = 0
+    word = solution.slots.word(solution.letters, slot)
+    for cell, c in zip(g.slots.cells[slot], word):
+        g.letters[cell] = ord(c)
+    res = g.fill(index, num_attempts=3, num_sample_strings=50, engine='mrv', rng=1)
+    assert res.success
+    assert g.slots.word(g.letters, slot) == word
+    check_fill(g, index)
+
+
+def test_local_search_respects_preset_letters(planted_grid, check_fill):
+    g, index = planted_grid(5, seed=2)
+    solution = g.copy()
+    solution.fill(index, num_attempts=3, num_sample_strings=50)
+    slot = 0
+    for cell in g.slots.cells[slot]:
+        g.letters[cell] = solution.letters[cell]
+    res = g.fill(index, num_attempts=3, engine='local', rng=0)
+    assert res.success and res.nodes_per_second > 0
+    assert g.slots.word(g.letters, slot) == solution.slots.word(solution.letters, slot)
+    check_fill(g, index)
+
+
+def test_crossing_counts_match_placing_each_word(planted_grid):
+    g, index = planted_grid(7, seed=5)
+    slot = 0
+    cells = g.slots.cells[slot]
+    words = index.sample(len(cells), index.full[len(cells)], 200)
+    crossings = [(i, index.full[len(g.slots.cells[crossing])], index.buckets[len(g.slots.cells[crossing])], offset)
+                 for i, (crossing, offset) in enumerate(g.slots.crossings[slot]) if crossing != -1]
+    counts = crossing_counts(words, len(cells), crossings)
+    for word, row in zip(words, counts):
+        for cell, c in zip(cells, word):
+            g.letters[cell] = ord(c)
+        expected = [index.count(len(g.slots.cells[crossing]), g.slots.constraints(g.letters, crossing))
+                    for crossing, _ in g.slots.crossings[slot] if crossing != -1]
+        assert row.tolist() == expected
+    assert crossing_counts([], len(cells), crossings).shape == (0, len(crossings))
+
+
+@pytest.mark.parametrize('engine', ['dfs', 'mrv'])
+def test_fill_with_thousands_of_samples(planted_grid, check_fill, engine):
+    g, index = planted_grid(7, seed=2)
+    g.fill(index, num_attempts=3, num_sample_strings=2000, engine=engine)
+    check_fill(g, index)
+
+
+def test_nogood_store_evicts_least_recently_used():
+    nogoods = NogoodStore(maxsize=2)
+    nogoods.add((3, ((0, 'A'),)))
+    nogoods.add((3, ((0, 'B'),)))
+    assert (3, ((0, 'A'),)) in nogoods
+    nogoods.add((3, ((0, 'C'),)))
+    assert len(nogoods) == 2
+    assert (3, ((0, 'B'),)) not in nogoods
+    assert (3, ((0, 'A'),)) in nogoods
+
+
+def test_dfs_records_nogoods_and_skips_them_on_the_next_fill(planted_grid, check_fill):
+    blank, index = planted_grid(7, seed=0)
+    nogoods = NogoodStore()
+    blank.copy().fill(index, num_attempts=1, nogoods=nogoods, rng=0)
+    assert len(nogoods) > 0
+    g = blank.copy()
+    res = g.fill(index, num_attempts=1, nogoods=nogoods, rng=0)
+    assert res.stats.nogood_hits > 0
+    check_fill(g, index)
+
+
+def test_dfs_shares_nogoods_across_fills(planted_grid, check_fill):
+    nogoods = NogoodStore()
+    blank, index = planted_grid(7, seed=4)
+    for _ in range(3):
+        g = blank.copy()
+        g.fill(index, num_attempts=3, num_sample_strings=50, nogoods=nogoods)
+        check_fill(g, index)
+
+
+@pytest.mark.parametrize('engine', ['dfs', 'mrv'])
+def test_fill_result(planted_grid, engine):
+    g, index = planted_grid(5)
+    res = g.fill(index, num_attempts=3, num_sample_strings=50, engine=engine)
+    assert res.success and res.stopped is None
+    assert res.letters == bytes(g.letters)
+    assert res.filled_slots == res.num_slots == len(g.entries)
+    assert res.nodes > 0 and res.attempts >= 1
+
+
+@pytest.mark.parametrize('engine', ['dfs', 'mrv'])
+def test_fill_node_budget_returns_partial_fill(planted_grid, engine):
+    g, index = planted_grid(7)
+    blank = bytes(g.letters)
+    res = g.fill(index, num_attempts=3, num_sample_strings=50, engine=engine, max_nodes=3)
+    assert not res.success and res.stopped == 'nodes'
+    assert res.nodes == 4
+    assert bytes(g.letters) == blank
+    assert 0 < res.filled_slots < res.num_slots
+    assert not Grid.from_letters(7, res.letters).is_filled()
+
+
+def test_fill_time_budget(planted_grid):
+    g, index = planted_grid(7)
+    res = g.fill(index, time_limit=0)
+    assert not res and res.stopped == 'time'
+
+
+@pytest.mark.parametrize('engine', ['dfs', 'mrv'])
+def test_fill_stats(planted_grid, engine):
+    g, index = planted_grid(7)
+    snapshots = []
+    res = g.fill(index, num_attempts=3, num_sample_strings=50, engine=engine, max_nodes=2500,
+                 on_progress=lambda stats: snapshots.append(stats.nodes))
+    stats = res.stats
+    assert stats.nodes == res.nodes and stats.restarts == res.attempts
+    assert stats.candidates_sampled >= stats.candidates_pruned
+    assert sum(stats.backtracks) <= stats.nodes
+    assert stats.heuristic_time >= 0 and stats.search_time >= 0
+    assert snapshots == list(range(1000, stats.nodes + 1, 1000))
+    if engine == 'dfs':
+        assert stats.cache_misses == stats.cache_size > 0
+
+
+def test_fill_stats_merge():
+    stats = FillStats(nodes=3, restarts=1, backtracks=[1], cache_size=5)
+    stats.merge(FillStats(nodes=4, restarts=1, backtracks=[0, 2], cache_hits=1, cache_misses=3, cache_size=2))
+    assert stats.nodes == 7 and stats.restarts == 2
+    assert stats.backtracks == [1, 2]
+    assert stats.cache_size == 5 and stats.cache_hit_rate() == 0.25
@@ -1,5 +1,7 @@
+import pytest
+
 from crossword_generator.clue_processor import ClueProcessor
-from crossword_generator.grid import Grid
+from crossword_generator.grid import Grid, ring_separators
 
 
 def test_grid_layout_generation(size, verbose=True):
@@ -28,6 +30,67 @@ def test_clues(verbose=True):
     return clue_processor
 
 
+
+def test_slot_table():
+    g = Grid(4, set_layout=False)
+    g.cell(1, 4).make_wall()
+    g.cell(4, 1).make_wall()
+    g.number_cells()
+
+    width = g.n + 2
+    for slot, entry in enumerate(g.entries):
+        assert g.slots.cells[slot] == tuple(r * width + c for r, c in ((p.row, p.col) for p in entry.positions()))
+        for offset, cell in enumerate(g.slots.cells[slot]):
+            crossing, crossing_offset = g.slots.crossings[slot][offset]
+            assert g.slots.cells[crossing][crossing_offset] == cell
+            assert g.entries[crossing].direction is entry.direction.opposite()
+
+    g.cell(2, 1).label = 'A'
+    assert g.letters[2 * width + 1] == ord('A')
+    slot = g.slots.across[2 * width + 1]
+    assert g.slots.constraints(g.letters, slot) == ((0, 'A'),)
+    assert g.slots.word(g.letters, slot) == 'A...'
+    assert not g.is_filled()
+
+
+def test_seeded_layout_and_fill_are_reproducible(planted_grid):
+    assert Grid(11, rng=3).letters == Grid(11, rng=3).letters
+    assert Grid(11, rng=3).letters != Grid(11, rng=4).letters
+
+    g, index = planted_grid(7)
+    fills = [g.copy().fill(index, num_sample_strings=50, rng=1) for _ in range(2)]
+    assert fills[0].letters == fills[1].letters and fills[0].nodes == fills[1].nodes
+
+
+@pytest.mark.parametrize('n', [4, 5, 7, 11, 12, 13, 15])
+def test_generated_layouts_are_valid(n):
+    for seed in range(20):
+        g = Grid(n, rng=seed)
+        assert all(entry.length >= 3 for entry in g.entries)
+
+        white = [(r, c) for r in range(1, n + 1) for c in range(1, n + 1) if not g.cell(r, c).is_wall()]
+        seen = {white[0]}
+        stack = [white[0]]
+        while stack:
+            r, c = stack.pop()
+            for neighbor in ((r - 1, c), (r + 1, c), (r, c - 1), (r, c + 1)):
+                if neighbor not in seen and not g.cell(*neighbor).is_wall():
+                    seen.add(neighbor)
+                    stack.append(neighbor)
+        assert len(seen) == len(white)
+
+        if n >= 11:
+            assert all(g.cell(r, c).is_wall() == g.cell(n + 1 - r, n + 1 - c).is_wall()
+                       for r in range(1, n + 1) for c in range(1, n + 1))
+
+
+def test_ring_separators():
+    assert ring_separators(0) == ()  # no walls: the white neighbors are linked through the diagonals
+    assert ring_separators(0b10101010) == (1, 3, 5, 7)  # diagonal walls separate all four neighbors
+    assert ring_separators(0b00010001) == (4, 0)  # north and south walls separate east from west
+    assert ring_separators(0b00011111) == ()  # one white run around the cell
+
+
 def main():
     import cProfile
     import pstats
@@ -0,0 +1,26 @@
+import pickle
+
+import pytest
+
+from crossword_generator.parallel import parallel_fill
+from crossword_generator.word_index import WordIndex
+
+
+def test_parallel_fill(planted_grid, check_fill):
+    g, index = planted_grid(7, seed=2)
+    g.fill_parallel(index, num_attempts=4, workers=2, timeout=30, seed=0, num_sample_strings=50)
+    check_fill(g, index)
+
+
+def test_parallel_fill_needs_an_attempt(planted_grid):
+    g, index = planted_grid(5)
+    with pytest.raises(ValueError):
+        parallel_fill(g, index, num_attempts=0)
+
+
+def test_compiled_index_pickles_by_path(tmp_path):
+    path = str(tmp_path / 'words.idx')
+    WordIndex.from_words(['CAT', 'DOG']).save(path)
+    data = pickle.dumps(WordIndex.load(path))
+    assert len(data) < 200
+    assert pickle.loads(data).candidates(3, ()) == ('CAT', 'DOG')
@@ -0,0 +1,45 @@
+from crossword_generator.pattern_cache import PatternCache, entry_bytes, shared_cache
+from crossword_generator.word_index import WordIndex
+
+WORDS = ['PENNY', 'PARTY', 'PASTY', 'PESKY', 'HAPPY', 'CAT', 'COT', 'DOG']
+
+
+def test_hits_misses_and_byte_eviction():
+    index = WordIndex.from_words(WORDS)
+    cache = PatternCache(index, max_bytes=2 * entry_bytes(index.full[5]))
+    assert cache.mask(5, ((0, 'P'),)) == index.mask(5, ((0, 'P'),))
+    cache.mask(5, ((0, 'P'),))
+    cache.mask(3, ((0, 'C'),))
+    assert (cache.hits, cache.misses, len(cache)) == (1, 2, 2)
+
+    cache.mask(5, ((0, 'P'),))  # refresh, so (3, C) is the least recently used
+    cache.mask(5, ())
+    assert (3, ((0, 'C'),)) not in cache and (5, ((0, 'P'),)) in cache
+    assert cache.evictions == 1 and cache.bytes <= cache.max_bytes
+
+
+def test_save_and_load_warm_up_a_new_cache(tmp_path):
+    index = WordIndex.from_words(WORDS)
+    cache = PatternCache(index)
+    for constraints in (((0, 'P'),), ((0, 'P'), (4, 'Y')), ((1, 'A'),)):
+        cache.mask(5, constraints)
+    path = str(tmp_path / 'patterns.json')
+    cache.save(path, limit=2)
+
+    warm = PatternCache(WordIndex.from_words(WORDS))
+    assert warm.load(path) == 2
+    assert list(warm.entries) == list(cache.entries)[1:]
+    warm.mask(5, ((1, 'A'),))
+    assert (warm.hits, warm.misses) == (1, 0)
+
+
+def test_shared_cache_is_reused_across_fills(planted_grid):
+    g, index = planted_grid(5)
+    cache = shared_cache(index)
+    assert shared_cache(index) is cache
+
+    first = g.copy().fill(index, num_sample_strings=50, rng=0)
+    second = g.copy().fill(index, num_sample_strings=50, rng=0)
+    assert first.success and second.success
+    assert second.stats.cache_misses == 0 and second.stats.cache_hits > 0
+    assert cache.misses == first.stats.cache_misses
@@ -0,0 +1,39 @@
+import pytest
+
+from crossword_generator.grid import Grid
+from crossword_generator.prescreen import screened_grid
+from crossword_generator.word_index import WordIndex
+
+
+def test_planted_grid_passes(planted_grid):
+    g, index = planted_grid(7)
+    signals = g.prescreen(index)
+    assert signals and not signals.reject and signals.score > 0
+    assert all(size > 0 for size in signals.domain_sizes)
+    assert all(after <= before for after, before in zip(signals.domain_sizes, signals.initial_sizes))
+
+
+def test_incompatible_crossings_are_rejected():
+    g = Grid(3, set_layout=False)
+    g.number_cells()
+    # every slot has words, but e.g. cell (1, 2) needs B or E across and A or D down
+    signals = g.prescreen(WordIndex.from_words(['ABC', 'DEF']))
+    assert signals.initial_sizes == [2] * 6
+    assert signals.reject and signals.domain_sizes == [0] * 6
+    assert 0 in signals.crossing_letters[0]
+
+
+def test_empty_domain_is_rejected():
+    g = Grid(4, set_layout=False)
+    g.number_cells()
+    signals = g.prescreen(WordIndex.from_words(['CAT', 'DOG']))
+    assert signals.reject and signals.score == 0
+    assert signals.domain_sizes[signals.weakest] == 0
+
+
+def test_screened_grid(planted_grid):
+    _, index = planted_grid(5)
+    g, signals = screened_grid(5, index, rng=0)
+    assert g.n == 5 and signals.score > 0
+    with pytest.raises(ValueError):
+        screened_grid(5, index, max_tries=0)
@@ -1,5 +1,3 @@
-from operator import contains
-from more_itertools import sample
 from crossword_generator.processor import extract_words, string_to_grid
 
 sample_grid = """ABC#
@@ -7,6 +5,15 @@ EFGH
 IJKL
 #MNO"""
 
+
+def test_extract_words():
+    words, contains_words = extract_words(string_to_grid(sample_grid))
+    assert words == {'across': {1: 'ABC', 4: 'EFGH', 6: 'IJKL', 7: 'MNO'},
+                     'down': {1: 'AEI', 2: 'BFJM', 3: 'CGKN', 5: 'HLO'}}
+    assert contains_words[(1, 3)] == {'across': 4, 'down': 5}
+    assert (0, 3) not in contains_words
+
+
 if __name__ == '__main__':
     words, contains_words = extract_words(string_to_grid(sample_grid))
     print(words)
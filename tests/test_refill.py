@@ -0,0 +1,84 @@
+import random
+
+import pytest
+
+from crossword_generator.grid import BLANK_CODE, Direction
+from crossword_generator.refill import affected_region, refill
+
+
+def test_affected_region_stops_at_pinned_slots(planted_grid):
+    g, _ = planted_grid(7)
+    slot = 0
+    crossings = {crossing for crossing, _ in g.slots.crossings[slot] if crossing != -1}
+    assert affected_region(g, [slot], depth=0) == [slot]
+    assert set(affected_region(g, [slot], depth=1)) == crossings | {slot}
+    pinned = next(iter(crossings))
+    assert pinned not in affected_region(g, [slot], [pinned])
+    assert affected_region(g, [slot], [slot], depth=1) == sorted(crossings)
+
+
+@pytest.mark.parametrize('engine', ['dfs', 'mrv'])
+def test_refill_changes_only_the_affected_region(planted_grid, check_fill, engine):
+    g, index = planted_grid(7, seed=3)
+    g.fill(index, num_attempts=3, num_sample_strings=50)
+    rng = random.Random(0)
+    slot = rng.randrange(len(g.entries))
+    length = len(g.slots.cells[slot])
+    word = index.sample(length, index.full[length], 1, rng)[0]
+    crossings = {crossing for crossing, _ in g.slots.crossings[slot]}
+    pinned = [s for s in range(len(g.entries)) if s != slot and s not in crossings][:1]
+    before = g.copy()
+
+    res = g.refill(index, {slot: word}, pinned, engine=engine, num_attempts=3, num_sample_strings=50, rng=0)
+    assert res.success
+    check_fill(g, index)
+    assert g.slots.word(g.letters, slot) == word
+    for s in pinned:
+        assert g.slots.word(g.letters, s) == before.slots.word(before.letters, s)
+    region = set(affected_region(g, [slot], pinned))
+    for s, cells in enumerate(g.slots.cells):
+        if s not in region and s != slot:
+            assert g.slots.word(g.letters, s) == before.slots.word(before.letters, s)
+
+
+def test_refill_seeds_theme_entries_on_a_blank_grid(planted_grid, check_fill):
+    g, index = planted_grid(7, seed=1)
+    solution = g.copy()
+    solution.fill(index, num_attempts=3, num_sample_strings=50)
+    theme = g.find_slot(1, Direction.ACROSS)
+    word = solution.slots.word(solution.letters, theme)
+
+    res = g.refill(index, {theme: word}, num_attempts=3, num_sample_strings=50, rng=0)
+    assert res.success
+    assert g.slots.word(g.letters, theme) == word
+    check_fill(g, index)
+
+
+def test_refill_failure_leaves_grid_unchanged(planted_grid):
+    g, index = planted_grid(5)
+    g.fill(index, num_attempts=3, num_sample_strings=50)
+    before = bytes(g.letters)
+    slot = 0
+    crossings = {crossing for crossing, _ in g.slots.crossings[slot] if crossing != -1}
+    pinned = [s for s in range(len(g.entries)) if s != slot and s not in crossings]
+    # a word that leaves some crossing entry, whose other cells are all pinned, without a fit
+    trial = g.copy()
+    for word in index.words[len(g.slots.cells[slot])]:
+        trial.letters[:] = before
+        for cell, c in zip(g.slots.cells[slot], word):
+            trial.letters[cell] = ord(c)
+        if any(index.count(len(g.slots.cells[s]), tuple(enumerate(trial.slots.word(trial.letters, s)))) == 0
+               for s in crossings):
+            break
+    res = refill(g, index, {slot: word}, pinned, num_attempts=3)
+    assert not res.success
+    assert bytes(g.letters) == before
+
+
+def test_refill_rejects_presets_clashing_with_pinned_cells(planted_grid):
+    g, index = planted_grid(5)
+    cell = g.slots.cells[0][0]
+    g.letters[cell] = ord('A')
+    with pytest.raises(ValueError):
+        refill(g, index, {0: 'B' * len(g.slots.cells[0])}, pinned_cells=[cell])
+    assert g.letters[cell] == ord('A') and BLANK_CODE in g.letters
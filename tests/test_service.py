@@ -0,0 +1,80 @@
+import asyncio
+import json
+
+from benchmarks.synthetic import PATH as WORDS_PATH
+from crossword_generator.clue_index import ClueIndex
+from crossword_generator.service import BACKOFF, PuzzleService
+from crossword_generator.word_index import WordIndex
+
+
+async def get(port, path):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(f'GET {path} HTTP/1.1\r\nHost: localhost\r\n\r\n'.encode())
+    response = await reader.read()
+    writer.close()
+    head, body = response.split(b'\r\n\r\n', 1)
+    return int(head.split()[1]), json.loads(body) if body else None
+
+
+async def exercise(service):
+    server = await service.serve(port=0)
+    port = server.sockets[0].getsockname()[1]
+    try:
+        async with asyncio.timeout(60):
+            while len(service.pools[5]) < service.target:
+                await asyncio.sleep(0.05)
+
+        status, body = await get(port, '/api/size/5')
+        assert status == 200 and body['_id'] == 'size_5'
+        status, puzzle = await get(port, f'/api/id/{body["puzzle_id_list"][0]}')
+        assert status == 200 and puzzle['puzzle_meta']['height'] == 5
+        assert len(puzzle['puzzle_data']['layout']) == 25
+
+        status, daily = await get(port, '/api/daily/mini/2024-01-01')
+        assert status == 200 and daily['puzzle_meta']['dailyDate'] == '2024-01-01'
+        assert (await get(port, '/api/daily/mini/2024-01-01'))[1]['_id'] == daily['_id']
+
+        assert (await get(port, '/api/size/7'))[0] == 404
+        assert (await get(port, '/api/id/unknown'))[0] == 404
+        assert (await get(port, '/api/daily/maxi/2024-01-01'))[0] == 404
+
+        status, metrics = await get(port, '/metrics')
+        assert status == 200 and metrics['sizes']['5']['puzzles'] >= 2
+        assert set(metrics['sizes']['5']['stages']) == {'layout', 'fill', 'clues', 'total'}
+    finally:
+        server.close()
+        service.close()
+
+
+def test_service():
+    with open(WORDS_PATH) as f:
+        words = f.read().split()
+    service = PuzzleService(WordIndex.from_words(words), ClueIndex.from_pairs((word, word.lower()) for word in words),
+                            sizes=(5,), target=2, workers=2, num_sample_strings=50)
+    asyncio.run(exercise(service))
+
+
+async def exercise_failures(service):
+    server = await service.serve(port=0)
+    port = server.sockets[0].getsockname()[1]
+    try:
+        async with asyncio.timeout(60):
+            while service.consecutive_failures[5] < 2:
+                await asyncio.sleep(0.05)
+
+        status, metrics = await get(port, '/metrics')
+        size = metrics['sizes']['5']
+        assert status == 200 and size['consecutive_failures'] == size['failures'] == 2
+        # the second failure backs off for 2 * BACKOFF, with nothing resubmitted in the meantime
+        assert 0 < size['retry_in'] <= 2 * BACKOFF and size['pending'] == 0
+        assert (await get(port, '/api/size/5'))[0] == 503
+    finally:
+        server.close()
+        service.close()
+    assert not service.retries
+
+
+def test_service_backs_off_after_failures(words):
+    index, clues = words
+    service = PuzzleService(index, clues, sizes=(5,), target=1, concurrency=1, workers=1, engine='missing')
+    asyncio.run(exercise_failures(service))
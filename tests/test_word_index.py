@@ -0,0 +1,108 @@
+import os
+import pickle
+import random
+
+import pytest
+
+from crossword_generator.word_index import ALPHABET, PackedWords, WordIndex, load_index
+
+WORDS = ['PENNY', 'PARTY', 'PASTY', 'PESKY', 'HAPPY', 'CAT', 'COT', 'DOG', 'CAT']
+
+
+def test_ids_are_sorted_and_deduplicated():
+    index = WordIndex.from_words(WORDS)
+    assert index.words[3] == ('CAT', 'COT', 'DOG')
+    assert len(index) == 8
+
+
+def test_pattern_queries():
+    index = WordIndex.from_words(WORDS)
+    constraints = ((0, 'P'), (4, 'Y'))
+    assert index.candidates(5, constraints) == ('PARTY', 'PASTY', 'PENNY', 'PESKY')
+    assert index.count(5, constraints) == 4
+    assert index.count(5, ((0, 'P'), (1, 'A'))) == 2
+    assert index.count(5, ()) == 5
+    assert index.count(3, ((1, 'Z'),)) == 0
+    assert index.candidates(4, ()) == ()
+
+
+def test_sample():
+    index = WordIndex.from_words(WORDS)
+    mask = index.mask(5, ((0, 'P'),))
+    sample = index.sample(5, mask, 3)
+    assert len(set(sample)) == 3
+    assert all(word.startswith('P') for word in sample)
+    assert sorted(index.sample(5, mask, 10)) == ['PARTY', 'PASTY', 'PENNY', 'PESKY']
+
+
+def test_compiled_round_trip(tmp_path):
+    index = WordIndex.from_words(WORDS)
+    path = str(tmp_path / 'words.idx')
+    index.save(path)
+    loaded = WordIndex.load(path)
+    assert list(loaded.words[5]) == list(index.words[5])
+    assert loaded.candidates(5, ((0, 'P'), (4, 'Y'))) == index.candidates(5, ((0, 'P'), (4, 'Y')))
+    assert loaded.count(3, ((0, 'C'),)) == 2
+    assert len(loaded) == len(index)
+
+
+def test_packed_index():
+    index = WordIndex.from_words(WORDS, [1, 2, 3, 4, 5, 6, 7, 8, 9])
+    packed = index.packed()
+    assert isinstance(packed.words[5], PackedWords)
+    assert list(packed.words[5]) == list(index.words[5])
+    assert packed.words[5].index('PESKY') == index.words[5].index('PESKY')
+    with pytest.raises(ValueError):
+        packed.words[5].index('PUPPY')
+    assert packed.candidates(5, ((0, 'P'),)) == index.candidates(5, ((0, 'P'),))
+    assert packed.sample(5, packed.full[5], 3, random.Random(0)) == index.sample(5, index.full[5], 3, random.Random(0))
+
+
+def test_load_index_recompiles_stale_source(tmp_path):
+    source = tmp_path / 'clues.csv'
+    source.write_text('clue,answer\nFeline (3),cat\nCanine (3),dog\n')
+    assert list(load_index(str(source)).words[3]) == ['CAT', 'DOG']
+
+    source.write_text('clue,answer\nBed (3),cot\n')
+    assert list(load_index(str(source)).words[3]) == ['COT']
+
+
+def test_weighted_sample():
+    rng = random.Random(0)
+    words = [a + b + c for a in ALPHABET for b in ALPHABET for c in ALPHABET]
+    index = WordIndex.from_words(words + ['AAA'] * 99_999)
+    assert index.weights[3][0] == 100_000
+
+    # alias table over all words, alias table over a bucket, and exact sampling
+    for constraints in ((), ((0, 'A'),), ((0, 'A'), (1, 'A'))):
+        mask = index.mask(3, constraints)
+        samples = [index.sample(3, mask, 5, rng, constraints) for _ in range(100)]
+        assert all(len(set(sample)) == 5 for sample in samples)
+        assert all(index.mask(3, constraints) >> index.words[3].index(word) & 1 for sample in samples for word in sample)
+        assert sum('AAA' in sample for sample in samples) > 75
+    assert set(index.alias_tables) == {3, (3, 0, 'A')}
+
+
+def test_compiled_weights(tmp_path):
+    index = WordIndex.from_words(WORDS, [1, 2, 3, 4, 5, 6, 7, 8, 9])
+    path = str(tmp_path / 'words.idx')
+    index.save(path)
+    loaded = WordIndex.load(path)
+    assert list(loaded.weights[3]) == [15, 7, 8]  # CAT appears twice
+    assert list(loaded.weights[5]) == list(index.weights[5])
+
+
+def test_shared_index():
+    index = WordIndex.from_words(WORDS)
+    shared = index.share()
+    try:
+        data = pickle.dumps(shared)
+        assert len(data) < 200
+        attached = pickle.loads(data)
+        assert attached.candidates(5, ((0, 'P'),)) == index.candidates(5, ((0, 'P'),))
+        assert list(attached.weights[3]) == list(index.weights[3])
+        with pytest.raises(ValueError):
+            attached.unlink()  # only the publisher removes the file
+    finally:
+        shared.unlink()
+    assert not os.path.exists(shared.path)
@@ -0,0 +1,48 @@
+import random
+import re
+
+import pytest
+
+from crossword_generator.word_index import WordIndex
+from crossword_generator.word_store import WordStore, WordTrie
+
+
+@pytest.fixture(scope='module')
+def words():
+    rng = random.Random(0)
+    return sorted({''.join(rng.choice('EATRSLN') for _ in range(5)) for _ in range(3000)})
+
+
+@pytest.mark.parametrize('pattern', ['.....', 'E....', '....S', '.A..E', 'EAT..', 'E.S.N', 'ZZZZZ', 'z....'])
+def test_trie_matches_patterns(words, pattern):
+    trie = WordTrie.from_words(5, words)
+    expected = [word for word in words if re.fullmatch(pattern.upper(), word)]
+    assert list(trie.match(pattern, chunk=7)) == expected
+    assert trie.count(pattern) == len(expected)
+    assert [words[i] for i in trie.ids(pattern)] == expected
+
+
+def test_trie_ranks_like_the_sorted_words(words):
+    trie = WordTrie.from_words(5, words)
+    assert len(trie) == len(words) and list(trie) == words
+    assert trie[-1] == words[-1] and trie[10:13] == words[10:13]
+    assert all(trie.rank(word) == i for i, word in enumerate(words))
+    assert trie.rank('EEEEZ') is None and 'EEEEZ' not in trie
+    with pytest.raises(IndexError):
+        trie[len(words)]
+
+
+def test_empty_trie():
+    trie = WordTrie.from_words(4, [])
+    assert len(trie) == 0 and list(trie.match('....')) == [] and trie.count('A...') == 0
+
+
+def test_store_agrees_with_index(words):
+    index = WordIndex.from_words(words + ['CAT', 'COT', 'DOG'])
+    store = WordStore.from_index(index)
+    assert list(store.match('C.T')) == list(index.candidates(3, ((0, 'C'), (2, 'T'))))
+    assert list(store[5]) == list(index.words[5])
+    assert store.count('....') == 0 and list(store.match('.' * 20)) == []
+    assert WordStore.from_words(['DOG', 'CAT', 'CAT', 'AB']).count('...') == 2
+    with pytest.raises(ValueError):
+        store[5].count('...')